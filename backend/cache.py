@@ -0,0 +1,193 @@
+# backend/cache.py
+"""
+Cache à deux niveaux:
+
+- L1: LRU borné en mémoire du processus, durée de vie courte (L1_TIMEOUT)
+- L2: cache partagé par tous les workers (autre alias de settings.CACHES:
+  Redis si REDIS_URL ; fichiers par défaut, pour le développement seulement:
+  voir verifier_cache_partage)
+
+Lecture: L1, sinon L2 (et remplissage de L1). Écriture / suppression /
+incr: L2 d'abord, puis L1 du processus. Une invalidation faite par un autre
+worker est donc vue au plus tard après L1_TIMEOUT secondes.
+
+Comme LocMemCache, l'état L1 est partagé par les threads du processus
+(Django crée une instance de backend par thread).
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+_etats = {}
+_etats_lock = threading.Lock()
+
+
+class _Niveau1:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.donnees = OrderedDict()  # clé -> (expiration, valeur picklée)
+        self.lock = threading.Lock()
+        self.stats = {"l1_hits": 0, "l1_misses": 0, "l2_hits": 0, "l2_misses": 0, "l1_evictions": 0}
+
+    def lire(self, cle):
+        with self.lock:
+            entree = self.donnees.get(cle)
+            if entree is not None and entree[0] > time.monotonic():
+                self.donnees.move_to_end(cle)
+                self.stats["l1_hits"] += 1
+                return entree[1]
+            if entree is not None:
+                del self.donnees[cle]
+            self.stats["l1_misses"] += 1
+            return None
+
+    def ecrire(self, cle, valeur, duree):
+        with self.lock:
+            self.donnees[cle] = (time.monotonic() + duree, valeur)
+            self.donnees.move_to_end(cle)
+            while len(self.donnees) > self.max_entries:
+                self.donnees.popitem(last=False)
+                self.stats["l1_evictions"] += 1
+
+    def supprimer(self, cle):
+        with self.lock:
+            self.donnees.pop(cle, None)
+
+    def vider(self):
+        with self.lock:
+            self.donnees.clear()
+
+    def compter(self, nom):
+        with self.lock:
+            self.stats[nom] += 1
+
+
+class CacheDeuxNiveaux(BaseCache):
+    """
+    OPTIONS:
+    - L2: alias du cache partagé (obligatoire)
+    - L1_MAX_ENTRIES: taille du LRU (défaut 1000)
+    - L1_TIMEOUT: durée de vie maximale en L1, secondes (défaut 5)
+    """
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, name, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self.alias_l2 = options["L2"]
+        self.l1_timeout = options.get("L1_TIMEOUT", 5)
+        with _etats_lock:
+            if name not in _etats:
+                _etats[name] = _Niveau1(options.get("L1_MAX_ENTRIES", 1000))
+            self.l1 = _etats[name]
+
+    @property
+    def l2(self):
+        return caches[self.alias_l2]
+
+    def _duree_l1(self, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        if timeout is None:
+            return self.l1_timeout
+        return max(0, min(self.l1_timeout, timeout - time.time()))
+
+    # --- lecture
+
+    def get(self, key, default=None, version=None):
+        cle = self.make_and_validate_key(key, version=version)
+        brut = self.l1.lire(cle)
+        if brut is not None:
+            return pickle.loads(brut)
+
+        absent = object()
+        valeur = self.l2.get(key, absent, version=version)
+        if valeur is absent:
+            self.l1.compter("l2_misses")
+            return default
+        self.l1.compter("l2_hits")
+        self.l1.ecrire(cle, pickle.dumps(valeur, self.pickle_protocol), self.l1_timeout)
+        return valeur
+
+    def has_key(self, key, version=None):
+        cle = self.make_and_validate_key(key, version=version)
+        return self.l1.lire(cle) is not None or self.l2.has_key(key, version=version)
+
+    # --- écriture (L2 puis L1)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        cle = self.make_and_validate_key(key, version=version)
+        self.l2.set(key, value, timeout=self._timeout_l2(timeout), version=version)
+        self._ecrire_l1(cle, value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        cle = self.make_and_validate_key(key, version=version)
+        ajoute = self.l2.add(key, value, timeout=self._timeout_l2(timeout), version=version)
+        if ajoute:
+            self._ecrire_l1(cle, value, timeout)
+        return ajoute
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l1.supprimer(self.make_and_validate_key(key, version=version))
+        return self.l2.touch(key, timeout=self._timeout_l2(timeout), version=version)
+
+    def delete(self, key, version=None):
+        self.l1.supprimer(self.make_and_validate_key(key, version=version))
+        return self.l2.delete(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self.l1.supprimer(self.make_and_validate_key(key, version=version))
+        return self.l2.incr(key, delta, version=version)
+
+    def clear(self):
+        self.l1.vider()
+        self.l2.clear()
+
+    def _timeout_l2(self, timeout):
+        # DEFAULT_TIMEOUT de ce cache, pas celui du L2
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def _ecrire_l1(self, cle, value, timeout):
+        duree = self._duree_l1(timeout)
+        if duree > 0:
+            self.l1.ecrire(cle, pickle.dumps(value, self.pickle_protocol), duree)
+        else:
+            self.l1.supprimer(cle)
+
+    # --- statistiques
+
+    def statistiques(self):
+        """Compteurs du processus par niveau (hits / misses / évictions L1) et taille du L1."""
+        with self.l1.lock:
+            stats = dict(self.l1.stats)
+            stats["l1_entrees"] = len(self.l1.donnees)
+        stats["l2_backend"] = type(self.l2).__name__
+        return stats
+
+
+# L2 dont incr / add sont des lire-modifier-écrire (non atomiques entre processus)
+BACKENDS_L2_DEVELOPPEMENT = (
+    "django.core.cache.backends.filebased.FileBasedCache",
+    "django.core.cache.backends.locmem.LocMemCache",
+)
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def verifier_cache_partage(app_configs, **kwargs):
+    avertissements = []
+    for alias, config in settings.CACHES.items():
+        if config.get("BACKEND") != "backend.cache.CacheDeuxNiveaux":
+            continue
+        l2 = settings.CACHES.get(config.get("OPTIONS", {}).get("L2"), {}).get("BACKEND")
+        if l2 in BACKENDS_L2_DEVELOPPEMENT:
+            avertissements.append(checks.Warning(
+                f"Le cache '{alias}' utilise {l2} comme niveau partagé (L2).",
+                hint="Réservé au développement (incr / add non atomiques entre processus): définir REDIS_URL.",
+                id="main.W001",
+            ))
+    return avertissements
@@ -2,6 +2,8 @@ from pathlib import Path
 import os
 from datetime import timedelta
 
+from corsheaders.defaults import default_headers
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = 'django-insecure-)em7o1ual^r7-$4hwpe8r_c@hdau75=6sa5(bdz64!wj67yyy1'
@@ -17,6 +19,7 @@ INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
+    'django.contrib.postgres',
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
@@ -55,7 +58,7 @@ TEMPLATES = [
 # ==========================
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'main.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -88,7 +91,15 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
+    'TOKEN_REFRESH_SERIALIZER': 'main.serializers.CustomTokenRefreshSerializer',
 }
+# hachage des mots de passe (connexion / inscription asynchrones): calculs simultanés + file d'attente
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 4))
+PASSWORD_HASH_FILE_MAX = int(os.environ.get("PASSWORD_HASH_FILE_MAX", 100))
+# filtre de Bloom de la liste noire: rattrapé au plus toutes les N secondes
+JWT_BLACKLIST_FILTRE_FRAICHEUR = 10
+# utilisateur + entreprise en cache pour l'authentification JWT (invalidé à chaque modification)
+AUTH_CACHE_TIMEOUT = 60
 
 # ==========================
 # DATABASE (PostgreSQL)
@@ -118,6 +129,7 @@ CORS_ALLOWED_ORIGINS = [
     "http://127.0.0.1:3000",
 ]
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key")
 
 # ==========================
 # FILES & STATIC
@@ -131,9 +143,66 @@ FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# ==========================
+# CACHE (L1 par processus + L2 partagé)
+# ==========================
+# L2 partagé entre workers: Redis si REDIS_URL, sinon fichiers (aucun service externe).
+# Le cache fichiers est réservé au développement: incr / add n'y sont pas atomiques
+# entre processus et chaque lecture L2 est une lecture de fichier (pas moins chère que
+# la requête évitée, ex. utilisateur JWT). En production: REDIS_URL obligatoire
+# (`manage.py check --deploy` le signale, main.W001).
+REDIS_URL = os.environ.get('REDIS_URL')
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
-    }
-}
\ No newline at end of file
+        'BACKEND': 'backend.cache.CacheDeuxNiveaux',
+        'LOCATION': 'default',
+        'OPTIONS': {
+            'L2': 'partage',
+            'L1_MAX_ENTRIES': 1000,
+            'L1_TIMEOUT': 5,  # invalidations des autres workers vues sous 5 s
+        },
+    },
+    'partage': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    } if REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'var', 'cache'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+# ==========================
+# RECHERCHE D'OFFRES
+# ==========================
+# "postgres": plein texte (search_vector + GIN) ; "memoire": index inversé par processus
+OFFRE_SEARCH_BACKEND = os.environ.get("OFFRE_SEARCH_BACKEND", "postgres")
+# reconstruction périodique de l'index mémoire (prend en compte les autres workers)
+OFFRE_INDEX_MEMOIRE_TTL = 300
+
+# ==========================
+# RECOMMANDATIONS (TF-IDF)
+# ==========================
+# matrice persistée, reconstruite par `manage.py construire_recommandations` (jamais pendant une requête)
+RECOMMANDATION_DIR = os.path.join(BASE_DIR, 'var', 'recommandation')
+
+# ==========================
+# OFFRES SIMILAIRES (plus proches voisins)
+# ==========================
+# index persisté, construit par `manage.py construire_similaires` (jamais pendant une requête)
+SIMILARITE_DIR = os.path.join(BASE_DIR, 'var', 'similarite')
+
+# ==========================
+# EXTRACTION DU TEXTE DES CV
+# ==========================
+# processus d'extraction PDF/DOCX en parallèle (les uploads au-delà attendent en file)
+CV_EXTRACTION_WORKERS = int(os.environ.get("CV_EXTRACTION_WORKERS", 2))
+
+# ==========================
+# IDEMPOTENCE (en-tête Idempotency-Key)
+# ==========================
+# réponses conservées 24 h, purgées par `manage.py purger_idempotence`
+IDEMPOTENCE_TTL = 24 * 3600
+# attente maximale d'une requête concurrente portant la même clé
+IDEMPOTENCE_LOCK_TIMEOUT = "5s"
@@ -17,13 +17,13 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path,include
 from rest_framework_simplejwt.views import TokenRefreshView
-from main.views import CustomTokenObtainPairView
+from main.views import connexion
 from django.conf import settings
 from django.conf.urls.static import static
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('',include('main.urls')),
-    path('api/accessToken/',CustomTokenObtainPairView.as_view(),name='tokenAccess'),
+    path('api/accessToken/',connexion,name='tokenAccess'),
     path('api/refreshToken/',TokenRefreshView.as_view(),name='tokenRefresh')
 ]+ static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -6,4 +6,11 @@ class MainConfig(AppConfig):
     name = 'main'
 
     def ready(self):
-        import main.models  # <-- ceci importe les signaux
\ No newline at end of file
+        import main.models  # <-- ceci importe les signaux
+        import main.index_memoire  # noqa: F401  index de recherche en mémoire (abonné aux signaux d'offres)
+        import main.recommandation  # noqa: F401  moteur de recommandation (idem)
+        import main.similarite  # noqa: F401  index des offres similaires (idem)
+        import main.cache_catalogue  # noqa: F401  version du catalogue (caches d'offres)
+        import main.authentication  # noqa: F401  invalidation du cache des utilisateurs authentifiés
+        import main.relances  # noqa: F401  délai de ré-envoi recalculé à la suppression d'un envoi
+        import backend.cache  # noqa: F401  contrôle du cache partagé (check --deploy)
@@ -0,0 +1,141 @@
+# main/authentication.py
+"""
+Authentification JWT avec l'utilisateur (et son entreprise) en cache.
+
+JWTAuthentication relit `Utilisateur` à chaque requête, puis
+`request.user.entreprise` coûte une seconde requête sur les endpoints
+entreprise. Ici, l'utilisateur est lu une fois avec select_related("entreprise")
+puis servi par le cache pendant AUTH_CACHE_TIMEOUT secondes.
+
+Clé: "auth:utilisateur:<id>:v<version>". La version de l'utilisateur vient
+d'une séquence PostgreSQL (nextval atomique, comme la version du catalogue)
+et est reprise à chaque enregistrement / suppression de l'utilisateur ou de
+son entreprise (désactivation du compte et changement de mot de passe
+compris), après commit. Elle est lue et écrite directement dans le cache
+partagé (pas de copie L1 par processus): la requête suivante, sur n'importe
+quel worker, relit la base.
+
+L'entrée ne contient que les colonnes de l'utilisateur et de l'entreprise,
+sans le hash du mot de passe (seulement son empreinte md5, celle que porte le
+jeton): `password` est un champ différé de l'instance reconstruite.
+
+Les contrôles de JWTAuthentication (compte actif, révocation après
+changement de mot de passe) restent faits à chaque requête.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.db import DEFAULT_DB_ALIAS, connection, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .models import Entreprise
+
+Utilisateur = get_user_model()
+
+
+SEQUENCE_VERSION = "main_auth_version_seq"
+# colonnes mises en cache (le hash du mot de passe reste en base)
+CHAMPS_UTILISATEUR = [f.attname for f in Utilisateur._meta.concrete_fields if f.attname != "password"]
+CHAMPS_ENTREPRISE = [f.attname for f in Entreprise._meta.concrete_fields]
+
+
+def _partage():
+    return caches[settings.CACHES["default"]["OPTIONS"]["L2"]]
+
+
+def _cle_version(user_id):
+    return f"auth:utilisateur:{user_id}:version"
+
+
+def version_utilisateur(user_id):
+    cle = _cle_version(user_id)
+    version = _partage().get(cle)
+    if version is None:
+        # version évincée (ou jamais attribuée): la dernière valeur de la séquence
+        # n'a pu être attribuée à cet utilisateur que si c'est encore la sienne
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT last_value FROM {SEQUENCE_VERSION}")
+            version = cursor.fetchone()[0]
+        _partage().add(cle, version, None)
+        version = _partage().get(cle, version)
+    return version
+
+
+def invalider_utilisateur(user_id):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT nextval(%s)", [SEQUENCE_VERSION])
+        version = cursor.fetchone()[0]
+    _partage().set(_cle_version(user_id), version, None)
+
+
+def _entree(user):
+    entreprise = getattr(user, "entreprise", None)
+    return {
+        "utilisateur": [getattr(user, nom) for nom in CHAMPS_UTILISATEUR],
+        "entreprise": [getattr(entreprise, nom) for nom in CHAMPS_ENTREPRISE] if entreprise else None,
+        "empreinte_mdp": get_md5_hash_password(user.password),
+    }
+
+
+def _utilisateur(entree):
+    """Instance reconstruite: `password` différé (relu en base si on y accède, jamais écrasé par save())."""
+    user = Utilisateur.from_db(DEFAULT_DB_ALIAS, CHAMPS_UTILISATEUR, entree["utilisateur"])
+    relation = Utilisateur._meta.get_field("entreprise")
+    if entree["entreprise"] is None:
+        relation.set_cached_value(user, None)
+    else:
+        entreprise = Entreprise.from_db(DEFAULT_DB_ALIAS, CHAMPS_ENTREPRISE, entree["entreprise"])
+        relation.set_cached_value(user, entreprise)
+        Entreprise._meta.get_field("user").set_cached_value(entreprise, user)
+    return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        cle = f"auth:utilisateur:{user_id}:v{version_utilisateur(user_id)}"
+        entree = cache.get(cle)
+        if entree is None:
+            try:
+                user = (
+                    Utilisateur.objects
+                    .select_related("entreprise")
+                    .get(**{api_settings.USER_ID_FIELD: user_id})
+                )
+            except Utilisateur.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            entree = _entree(user)
+            cache.set(cle, entree, settings.AUTH_CACHE_TIMEOUT)
+        else:
+            user = _utilisateur(entree)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != entree["empreinte_mdp"]:
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
+
+
+@receiver([post_save, post_delete], sender=Utilisateur)
+def utilisateur_modifie(sender, instance, **kwargs):
+    user_id = instance.pk
+    transaction.on_commit(lambda: invalider_utilisateur(user_id))
+
+
+@receiver([post_save, post_delete], sender=Entreprise)
+def entreprise_modifiee(sender, instance, **kwargs):
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalider_utilisateur(user_id))
@@ -0,0 +1,63 @@
+# main/cache_catalogue.py
+"""
+Version globale du catalogue d'offres pour les caches dérivés (listes,
+facettes, tags, histogrammes).
+
+Chaque clé de cache embarque la version courante ; toute écriture sur
+Offre / Entreprise / compétences / langues incrémente la version (après
+commit). Les anciennes entrées ne sont plus jamais lues et expirent d'elles-
+mêmes: aucune suppression de clé.
+
+La version vient d'une séquence PostgreSQL (nextval atomique entre
+processus, quel que soit le backend de cache: cache.incr n'est qu'un
+lire-modifier-écrire avec le cache fichiers) ; le cache n'en garde qu'une
+copie, relue dans la séquence si elle est évincée.
+"""
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Competence, Entreprise, Langue, Offre
+
+CLE_VERSION = "offres:catalogue:version"
+SEQUENCE_VERSION = "main_catalogue_version_seq"
+
+
+def version_catalogue():
+    version = cache.get(CLE_VERSION)
+    if version is None:
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT last_value FROM {SEQUENCE_VERSION}")
+            version = cursor.fetchone()[0]
+        cache.add(CLE_VERSION, version, None)
+    return version
+
+
+def cle_catalogue(prefixe, *parties):
+    """"prefixe:v<version>:parties..." ; change à chaque écriture du catalogue."""
+    return ":".join([prefixe, f"v{version_catalogue()}", *map(str, parties)])
+
+
+def invalider_catalogue():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT nextval(%s)", [SEQUENCE_VERSION])
+        version = cursor.fetchone()[0]
+    # deux invalidations concurrentes peuvent écrire dans le désordre: la version
+    # la plus basse n'a alors été lue qu'après les deux commits, ses entrées sont à jour
+    cache.set(CLE_VERSION, version, None)
+
+
+@receiver([post_save, post_delete], sender=Offre)
+@receiver([post_save, post_delete], sender=Entreprise)
+@receiver([post_save, post_delete], sender=Competence)
+@receiver([post_save, post_delete], sender=Langue)
+def catalogue_modifie(sender, **kwargs):
+    transaction.on_commit(invalider_catalogue)
+
+
+@receiver(m2m_changed, sender=Offre.competences.through)
+@receiver(m2m_changed, sender=Offre.langues.through)
+def relations_offre_modifiees(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        transaction.on_commit(invalider_catalogue)
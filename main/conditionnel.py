@@ -0,0 +1,88 @@
+# main/conditionnel.py
+"""
+Requêtes conditionnelles des vues de détail (ETag / Last-Modified).
+
+La version d'une ressource = ses dates de modification et celles des lignes
+dont le sérialiseur affiche des champs (ex: nom de l'entreprise d'une
+offre), lues en une requête values_list, sans charger ni sérialiser l'objet.
+
+- GET: If-None-Match / If-Modified-Since -> 304 sans corps
+- PUT/PATCH: If-Match / If-Unmodified-Since vérifiés sous SELECT ... FOR
+  UPDATE (transaction de la requête), après le contrôle d'accès: 412 au
+  lieu d'écraser une version modifiée entre-temps
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
+
+ENTETES_PRECONDITION = ("HTTP_IF_MATCH", "HTTP_IF_UNMODIFIED_SINCE")
+
+
+def calculer_etag(pk, dates):
+    brut = f"{pk}:" + ":".join(d.isoformat() for d in dates)
+    return '"%s"' % hashlib.sha1(brut.encode()).hexdigest()[:24]
+
+
+class RequetesConditionnelles:
+    """
+    Mixin APIView (avant APIView dans les bases). À définir:
+    - queryset_version(request, pk): lignes accessibles à l'utilisateur (vide sinon)
+    - champs_version: colonnes de date lues (dateModification + relations affichées)
+    """
+    champs_version = ("dateModification",)
+
+    def queryset_version(self, request, pk):
+        raise NotImplementedError
+
+    def version(self, request, pk, verrouiller=False):
+        """(etag, last_modified) ou None si la ressource n'est pas accessible."""
+        qs = self.queryset_version(request, pk)
+        if verrouiller:
+            qs = qs.select_for_update(of=("self",))
+        dates = qs.values_list(*self.champs_version).first()
+        if dates is None:
+            return None
+        return calculer_etag(pk, dates), max(dates)
+
+    def _conditionnelle(self, request, version):
+        etag, last_modified = version
+        return get_conditional_response(request, etag=etag, last_modified=int(last_modified.timestamp()))
+
+    def non_modifie(self, request, pk):
+        """GET: réponse 304 si le client a déjà cette version, sinon None."""
+        self.version_lue = self.version(request, pk)
+        if self.version_lue is None:
+            return None  # le chemin normal renverra 403/404
+        return self._conditionnelle(request, self.version_lue)
+
+    def precondition_echouee(self, request, pk, instance):
+        """
+        PUT/PATCH, après le contrôle d'accès (un non-propriétaire reçoit 403 sans
+        verrouiller la ligne): verrouille la ligne et relit `instance` sous le
+        verrou ; réponse 412 si If-Match ne correspond plus, sinon None.
+        """
+        if not any(entete in request.META for entete in ENTETES_PRECONDITION):
+            return None
+        version = self.version(request, pk, verrouiller=True)
+        if version is None or self._conditionnelle(request, version) is None:
+            instance.refresh_from_db()
+            return None
+        return Response(
+            {"error": "La ressource a été modifiée entre-temps, rechargez-la avant de la modifier."},
+            status=status.HTTP_412_PRECONDITION_FAILED,
+        )
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        # ETag / Last-Modified des réponses 2xx (après PUT/PATCH: nouvelle version)
+        if request.method in ("GET", "PUT", "PATCH") and 200 <= response.status_code < 300 and "pk" in kwargs:
+            version = getattr(self, "version_lue", None) if request.method == "GET" else None
+            version = version or self.version(request, kwargs["pk"])
+            if version is not None:
+                etag, last_modified = version
+                response["ETag"] = etag
+                response["Last-Modified"] = http_date(last_modified.timestamp())
+        return response
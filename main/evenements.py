@@ -0,0 +1,62 @@
+# main/evenements.py
+"""
+Historique append-only des statuts des candidatures (EnvoiEvent).
+
+- une ligne par création d'Envoi et par changement de statut, insérée dans
+  la transaction qui modifie l'Envoi (envoi unitaire ou groupé, PATCH
+  unitaire ou groupé) ; jamais modifiée ni supprimée
+- table partitionnée par mois (RANGE sur dateEvenement) + partition DEFAULT
+  qui reçoit les lignes d'un mois pas encore créé ; les partitions des mois
+  à venir sont créées par `manage.py creer_partitions_evenements` (cron
+  mensuel) ; un mois ancien se détache / s'archive sans DELETE
+- chronologie d'une candidature: index (envoi, dateEvenement), borné par
+  dateEnvoi pour que PostgreSQL écarte les partitions antérieures
+- les statistiques (délais de réponse...) lisent cette table, sans
+  verrouiller les lignes Envoi modifiées par les entreprises
+"""
+from datetime import date
+
+from django.db import connection
+
+from .models import EnvoiEvent
+
+TABLE = EnvoiEvent._meta.db_table
+
+
+def journaliser(lignes, auteur=None):
+    """lignes: [(envoi_id, entreprise_id, ancien_statut, statut)] -> un seul INSERT."""
+    auteur_id = auteur.pk if auteur is not None and auteur.is_authenticated else None
+    EnvoiEvent.objects.bulk_create([
+        EnvoiEvent(
+            envoi_id=envoi_id, entreprise_id=entreprise_id, auteur_id=auteur_id,
+            ancien_statut=ancien, statut=statut,
+        )
+        for envoi_id, entreprise_id, ancien, statut in lignes
+    ])
+
+
+def _mois_suivant(mois):
+    return date(mois.year + mois.month // 12, mois.month % 12 + 1, 1)
+
+
+def nom_partition(mois):
+    return f"{TABLE}_{mois:%Y%m}"
+
+
+def creer_partitions(debut, nb_mois):
+    """Crée (si absentes) les partitions de nb_mois mois à partir du mois de debut ; retourne les noms créés."""
+    mois = date(debut.year, debut.month, 1)
+    crees = []
+    with connection.cursor() as cursor:
+        for _ in range(nb_mois):
+            fin = _mois_suivant(mois)
+            cursor.execute("SELECT to_regclass(%s)", [nom_partition(mois)])
+            if cursor.fetchone()[0] is None:
+                # échoue si la partition DEFAULT contient déjà des lignes de ce mois
+                cursor.execute(
+                    f"CREATE TABLE {nom_partition(mois)} PARTITION OF {TABLE} "
+                    f"FOR VALUES FROM ('{mois:%Y-%m-%d}') TO ('{fin:%Y-%m-%d}')"
+                )
+                crees.append(nom_partition(mois))
+            mois = fin
+    return crees
@@ -0,0 +1,72 @@
+# main/extracteurs.py
+"""
+Extraction du texte brut des fichiers CV (PDF, DOCX).
+
+Exécuté dans les processus du pool d'extraction: ce module n'importe pas
+Django et ne touche pas à la base.
+"""
+import re
+import zipfile
+from xml.etree import ElementTree
+
+import pypdf
+
+MAX_PAGES = 50
+MAX_CARACTERES = 200000
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+EP = "{http://schemas.openxmlformats.org/officeDocument/2006/extended-properties}"
+
+EXTENSIONS_SUPPORTEES = (".pdf", ".docx")
+
+
+class ExtractionNonSupportee(Exception):
+    pass
+
+
+def _nettoyer(texte):
+    texte = re.sub(r"[ \t\r\f\v]+", " ", texte)
+    texte = re.sub(r"\n\s*\n+", "\n\n", texte)
+    return texte.strip()[:MAX_CARACTERES]
+
+
+def extraire_pdf(chemin):
+    lecteur = pypdf.PdfReader(chemin)
+    pages = lecteur.pages
+    textes = [page.extract_text() or "" for page in pages[:MAX_PAGES]]
+    return _nettoyer("\n".join(textes)), len(pages)
+
+
+def extraire_docx(chemin):
+    with zipfile.ZipFile(chemin) as archive:
+        with archive.open("word/document.xml") as document:
+            paragraphes, courant = [], []
+            for _, element in ElementTree.iterparse(document):
+                if element.tag == W + "t":
+                    courant.append(element.text or "")
+                elif element.tag == W + "tab":
+                    courant.append("\t")
+                elif element.tag == W + "br":
+                    courant.append("\n")
+                elif element.tag == W + "p":
+                    paragraphes.append("".join(courant))
+                    courant = []
+                    element.clear()
+
+        nb_pages = None
+        if "docProps/app.xml" in archive.namelist():
+            pages = ElementTree.fromstring(archive.read("docProps/app.xml")).find(EP + "Pages")
+            if pages is not None and (pages.text or "").isdigit():
+                nb_pages = int(pages.text)
+
+    return _nettoyer("\n".join(paragraphes)), nb_pages
+
+
+def extraire_texte(chemin):
+    """(texte, nb_pages) du fichier ; ExtractionNonSupportee si le format n'est pas lu."""
+    extension = "." + chemin.rsplit(".", 1)[-1].lower()
+    if extension == ".pdf":
+        return extraire_pdf(chemin)
+    if extension == ".docx":
+        return extraire_docx(chemin)
+    raise ExtractionNonSupportee(f"format {extension} non supporté")
@@ -0,0 +1,99 @@
+# main/extraction.py
+"""
+Extraction du texte des CV après upload, hors du thread de la requête.
+
+- planifier_extraction(cv) remet le statut à "en_attente" et soumet le
+  fichier au pool après commit: la réponse d'upload n'attend jamais
+- pool de processus borné (settings.CV_EXTRACTION_WORKERS): une rafale
+  d'uploads s'accumule dans la file du pool au lieu de multiplier les processus
+- le résultat est écrit par le callback du pool, seulement si le fichier du
+  CV n'a pas changé entre-temps
+"""
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .extracteurs import EXTENSIONS_SUPPORTEES, ExtractionNonSupportee, extraire_texte
+from .models import CV
+from .search import cv_search_vector
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def pool_extraction():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=getattr(settings, "CV_EXTRACTION_WORKERS", 2))
+        return _executor
+
+
+def _reinitialiser_pool(pool):
+    # un processus mort (fichier malformé...) casse tout le pool: on le recrée au prochain envoi
+    global _executor
+    with _executor_lock:
+        if _executor is pool:
+            _executor = None
+
+
+def extraction_possible(cv):
+    return cv.type != "video" and cv.fichier.name.lower().endswith(EXTENSIONS_SUPPORTEES)
+
+
+def enregistrer_resultat(cv_pk, nom_fichier, future):
+    """Écrit texte / nb_pages / statut ; ignoré si le fichier du CV a changé entre-temps."""
+    try:
+        texte, nb_pages = future.result()
+        champs = {"texte": texte, "nb_pages": nb_pages, "extraction_statut": "terminee"}
+    except ExtractionNonSupportee:
+        champs = {"extraction_statut": "non_supporte"}
+    except Exception:
+        logger.exception("Extraction du CV %s échouée", cv_pk)
+        champs = {"extraction_statut": "echec"}
+
+    # update() ne passe pas par auto_now: dateModification explicite (ETag du CV)
+    cvs = CV.objects.filter(pk=cv_pk, fichier=nom_fichier)
+    if cvs.update(**champs, dateModification=timezone.now()) and champs["extraction_statut"] == "terminee":
+        cvs.update(search_vector=cv_search_vector())
+
+
+def _soumettre(cv_pk, chemin, nom_fichier):
+    pool = pool_extraction()
+    try:
+        future = pool.submit(extraire_texte, chemin)
+    except (BrokenProcessPool, RuntimeError):
+        _reinitialiser_pool(pool)
+        pool = pool_extraction()
+        future = pool.submit(extraire_texte, chemin)
+
+    def terminer(f):
+        if isinstance(f.exception(), BrokenProcessPool):
+            _reinitialiser_pool(pool)
+        try:
+            enregistrer_resultat(cv_pk, nom_fichier, f)
+        finally:
+            connection.close()  # thread du pool: pas de connexion persistante
+
+    future.add_done_callback(terminer)
+    return future
+
+
+def planifier_extraction(cv):
+    """Réinitialise les champs extraits du CV et lance l'extraction après commit."""
+    cv.texte, cv.nb_pages = "", None
+    cv.extraction_statut = "en_attente" if extraction_possible(cv) else "non_supporte"
+    CV.objects.filter(pk=cv.pk).update(
+        texte="", nb_pages=None, extraction_statut=cv.extraction_statut, search_vector=None
+    )
+
+    if cv.extraction_statut == "en_attente":
+        cv_pk, chemin, nom_fichier = cv.pk, cv.fichier.path, cv.fichier.name
+        transaction.on_commit(lambda: _soumettre(cv_pk, chemin, nom_fichier))
@@ -0,0 +1,157 @@
+# main/facettes.py
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import F, IntegerField
+from django.db.models.functions import Cast, Coalesce, Floor
+
+from .cache_catalogue import cle_catalogue
+from .filters import cle_filtres, filtrer_offres
+from .models import Offre
+
+# clés versionnées par le catalogue: le délai ne sert qu'à libérer les anciennes entrées
+FACETTES_CACHE_TIMEOUT = 300  # secondes
+
+# facette -> (colonne de regroupement, colonne affichée, libellés des choix)
+FACETTES = {
+    "type_contrat": ("type_contrat", "type_contrat", dict(Offre.TYPE_CONTRAT_CHOICES)),
+    "mode_travail": ("mode_travail", "mode_travail", dict(Offre.MODE_TRAVAIL_CHOICES)),
+    "niveau": ("niveau", "niveau", dict(Offre.NIVEAU_CHOICES)),
+    "etude_min": ("etude_min", "etude_min", dict(Offre.ETUDE_CHOICES)),
+    # ville/domaine regroupés sans accents ni casse, comme les filtres
+    "ville": ("ville_norm", "ville", {}),
+    "domaine": ("domaine_norm", "domaine", {}),
+}
+
+
+def calculer_facettes(qs):
+    """
+    Tous les comptes de facettes (+ total) en une requête:
+    GROUP BY GROUPING SETS ((type_contrat), (mode_travail), ..., ()).
+    """
+    connection = connections[qs.db]
+    qn = connection.ops.quote_name
+
+    noms = list(FACETTES)
+    groupes = [FACETTES[nom][0] for nom in noms]
+    affiches = [FACETTES[nom][1] for nom in noms]
+    colonnes = list(dict.fromkeys(groupes + affiches))
+
+    sous_requete, params = qs.values(*colonnes).order_by().query.sql_with_params()
+    select = ", ".join(
+        [f"GROUPING({qn(g)})" for g in groupes]
+        + [f"MIN({qn(a)})" for a in affiches]
+        + ["COUNT(*)"]
+    )
+    ensembles = ", ".join([f"({qn(g)})" for g in groupes] + ["()"])
+    sql = f"SELECT {select} FROM ({sous_requete}) AS f GROUP BY GROUPING SETS ({ensembles})"
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        lignes = cursor.fetchall()
+
+    n = len(noms)
+    facettes = {nom: [] for nom in noms}
+    total = 0
+    for ligne in lignes:
+        groupings, valeurs, count = ligne[:n], ligne[n:2 * n], ligne[-1]
+        if all(groupings):
+            total = count  # ensemble vide ()
+            continue
+        i = groupings.index(0)
+        libelles = FACETTES[noms[i]][2]
+        valeur = valeurs[i]
+        facettes[noms[i]].append({"valeur": valeur, "label": libelles.get(valeur, valeur), "count": count})
+
+    for valeurs in facettes.values():
+        valeurs.sort(key=lambda v: (-v["count"], str(v["valeur"])))
+
+    return {"total": total, "facettes": facettes}
+
+
+def calculer_nuage_tags(qs, limite):
+    """Tags les plus fréquents des offres de qs: [{"tag", "count"}] (une requête, unnest)."""
+    connection = connections[qs.db]
+    sous_requete, params = qs.values("tags_norm").order_by().query.sql_with_params()
+    sql = (
+        f"SELECT t.tag, COUNT(*) AS n FROM ({sous_requete}) AS f, unnest(f.tags_norm) AS t(tag) "
+        "GROUP BY t.tag ORDER BY n DESC, t.tag LIMIT %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, (*params, limite))
+        return [{"tag": tag, "count": n} for tag, n in cursor.fetchall()]
+
+
+def nuage_tags(params, limite=50):
+    """Nuage de tags des offres visibles pour un jeu de filtres, en cache."""
+    key = cle_catalogue("offres:tags", limite, cle_filtres(params))
+    data = cache.get(key)
+    if data is None:
+        data = {"tags": calculer_nuage_tags(filtrer_offres(params), limite)}
+        cache.set(key, data, FACETTES_CACHE_TIMEOUT)
+    return data
+
+
+def calculer_histogrammes(qs, pas_salaire, pas_experience):
+    """
+    Répartition par tranches du salaire (par devise) et de l'expérience, en une
+    requête: GROUP BY GROUPING SETS ((devise, tranche_salaire), (tranche_experience)).
+    Salaire d'une offre = milieu de [min, max] (ou la seule borne connue).
+    """
+    connection = connections[qs.db]
+    salaire = Coalesce((F("salaire_min") + F("salaire_max")) / 2, "salaire_min", "salaire_max")
+    experience = Coalesce("experience_min", "experience_max")
+    qs = qs.annotate(
+        tranche_salaire=Cast(Floor(salaire / pas_salaire), IntegerField()),
+        tranche_experience=Cast(Floor(experience / pas_experience), IntegerField()),
+    )
+    sous_requete, params = qs.values("devise", "tranche_salaire", "tranche_experience").order_by().query.sql_with_params()
+    sql = (
+        "SELECT GROUPING(tranche_experience), devise, tranche_salaire, tranche_experience, COUNT(*) "
+        f"FROM ({sous_requete}) AS f "
+        "GROUP BY GROUPING SETS ((devise, tranche_salaire), (tranche_experience))"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        lignes = cursor.fetchall()
+
+    salaires, experiences = [], []
+    sans_salaire = sans_experience = 0
+    for grouping_experience, devise, tranche_salaire, tranche_experience, count in lignes:
+        if grouping_experience == 0:
+            if tranche_experience is None:
+                sans_experience = count
+            else:
+                debut = tranche_experience * pas_experience
+                experiences.append({"min": debut, "max": debut + pas_experience, "count": count})
+        elif tranche_salaire is None:
+            sans_salaire += count
+        else:
+            debut = tranche_salaire * pas_salaire
+            salaires.append({"devise": devise, "min": debut, "max": debut + pas_salaire, "count": count})
+
+    salaires.sort(key=lambda t: (t["devise"], t["min"]))
+    experiences.sort(key=lambda t: t["min"])
+    return {
+        "salaire": {"pas": pas_salaire, "tranches": salaires, "non_renseigne": sans_salaire},
+        "experience": {"pas": pas_experience, "tranches": experiences, "non_renseigne": sans_experience},
+    }
+
+
+def histogrammes_offres(params, pas_salaire, pas_experience):
+    """Histogrammes salaire/expérience des offres visibles pour un jeu de filtres, en cache."""
+    key = cle_catalogue("offres:histogrammes", pas_salaire, pas_experience, cle_filtres(params))
+    data = cache.get(key)
+    if data is None:
+        data = calculer_histogrammes(filtrer_offres(params), pas_salaire, pas_experience)
+        cache.set(key, data, FACETTES_CACHE_TIMEOUT)
+    return data
+
+
+def facettes_offres(params):
+    """Facettes des offres visibles pour un jeu de filtres, en cache par filtres normalisés."""
+    key = cle_catalogue("offres:facettes", cle_filtres(params))
+    data = cache.get(key)
+    if data is None:
+        data = calculer_facettes(filtrer_offres(params))
+        cache.set(key, data, FACETTES_CACHE_TIMEOUT)
+    return data
@@ -0,0 +1,298 @@
+# main/filters.py
+import hashlib
+import json
+
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, Q, Value
+from django.db.models.functions import Coalesce, Lower
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from .models import SALAIRE_ABSENT_ASC, SALAIRE_ABSENT_DESC, Envoi, Offre
+from .search import (
+    OFFRE_CHAMPS_NORMALISES,
+    filtrer_champs_normalises,
+    normaliser,
+    normaliser_tags,
+    requete_recherche,
+)
+
+# query params qui changent l'ensemble d'offres renvoyé par OffreList
+PARAMS_FILTRES_OFFRES = (
+    "q",
+    "domaine",
+    "specialite",
+    "ville",
+    "pays",
+    "type_contrat",
+    "mode_travail",
+    "fuzzy",
+    "tags",
+    "tags_mode",
+    "competences",
+    "competences_mode",
+    "langues",
+    "langues_mode",
+    "salaire_min",
+    "salaire_max",
+    "devise",
+    "experience_min",
+    "experience_max",
+)
+
+# filtre d'intervalle -> (colonne min, colonne max) de Offre
+FILTRES_INTERVALLES = {
+    "salaire": ("salaire_min", "salaire_max"),
+    "experience": ("experience_min", "experience_max"),
+}
+
+# param -> (table M2M, colonne cible)
+FILTRES_M2M = {
+    "competences": (Offre.competences.through, "competence"),
+    "langues": (Offre.langues.through, "langue"),
+}
+
+
+def champs_texte_offres(qs):
+    """
+    {offreId: {titre, poste, tags, description, missions, profil_recherche, competences}}
+    pour les offres de qs, noms des compétences concaténés (2 requêtes).
+    """
+    docs = {
+        o["offreId"]: o
+        for o in qs.values("offreId", "titre", "poste", "tags", "description", "missions", "profil_recherche")
+    }
+    liens = Offre.competences.through.objects.filter(offre_id__in=qs.values("offreId"))
+    for offre_id, nom in liens.values_list("offre_id", "competence__nom"):
+        if offre_id in docs:
+            docs[offre_id]["competences"] = f'{docs[offre_id].get("competences", "")} {nom}'
+    return docs
+
+
+def offres_visibles():
+    """Offres visibles pour candidats (publiée + recevoir ON + non archivée + entreprise active)."""
+    return Offre.objects.filter(est_visible=True)
+
+
+def _valeurs_liste(valeur):
+    """"3, Python,python" -> ({3}, {"python"}): ids numériques et noms en minuscules."""
+    ids, noms = set(), set()
+    for item in (valeur or "").split(","):
+        item = item.strip()
+        if item.isdigit():
+            ids.add(int(item))
+        elif item:
+            noms.add(item.lower())
+    return ids, noms
+
+
+def offres_avec_relations(through, cible, ids, noms, tous):
+    """
+    Sous-requête des offreId liés aux ids/noms demandés, sur la seule table M2M:
+    any -> semi-jointure ; all -> GROUP BY offre HAVING COUNT(DISTINCT cible) = n,
+    les noms étant d'abord résolus en ids (un même élément donné par id et par
+    nom ne compte qu'une fois ; un nom inconnu ne laisse aucune offre).
+    """
+    liens = through.objects.all()
+    if tous:
+        if noms:
+            modele = through._meta.get_field(cible).related_model
+            trouves = dict(
+                modele.objects.annotate(nom_l=Lower("nom")).filter(nom_l__in=noms).values_list("nom_l", "pk")
+            )
+            if len(trouves) < len(noms):
+                return liens.none().values("offre_id")
+            ids = set(ids) | set(trouves.values())
+        return (
+            liens.filter(**{f"{cible}_id__in": ids})
+            .values("offre_id")
+            .annotate(n=Count(f"{cible}_id", distinct=True))
+            .filter(n=len(ids))
+            .values("offre_id")
+        )
+
+    condition = Q(**{f"{cible}_id__in": ids}) if ids else Q()
+    if noms:
+        liens = liens.annotate(nom_l=Lower(f"{cible}__nom"))
+        condition = condition | Q(nom_l__in=noms) if ids else Q(nom_l__in=noms)
+    return liens.filter(condition).values("offre_id")
+
+
+def _entier(params, nom):
+    valeur = params.get(nom)
+    if valeur in (None, ""):
+        return None
+    try:
+        return int(valeur)
+    except (TypeError, ValueError):
+        raise ValidationError({nom: "Entier attendu."})
+
+
+def filtrer_intervalle(qs, colonne_min, colonne_max, bas, haut):
+    """
+    Offres dont [colonne_min, colonne_max] chevauche [bas, haut]; une borne
+    nulle côté offre est ouverte, mais au moins une des deux doit exister.
+    """
+    qs = qs.filter(Q(**{f"{colonne_min}__isnull": False}) | Q(**{f"{colonne_max}__isnull": False}))
+    if bas is not None:
+        qs = qs.filter(Q(**{f"{colonne_max}__gte": bas}) | Q(**{f"{colonne_max}__isnull": True}))
+    if haut is not None:
+        qs = qs.filter(Q(**{f"{colonne_min}__lte": haut}) | Q(**{f"{colonne_min}__isnull": True}))
+    return qs
+
+
+def trier_par_salaire(qs, desc):
+    """
+    Annote `salaire_tri` (salaire_min croissant / salaire_max décroissant)
+    et retourne (qs, ordering) compatible avec KeysetPagination.
+    """
+    if desc:
+        qs = qs.annotate(salaire_tri=Coalesce("salaire_max", "salaire_min", Value(SALAIRE_ABSENT_DESC)))
+        return qs, ("-salaire_tri", "-dateCreation", "-pk")
+    qs = qs.annotate(salaire_tri=Coalesce("salaire_min", "salaire_max", Value(SALAIRE_ABSENT_ASC)))
+    return qs, ("salaire_tri", "-dateCreation", "-pk")
+
+
+def filtrer_offres(params, plein_texte=True):
+    """
+    Offres visibles restreintes par les filtres de OffreList (sans tri).
+    plein_texte=False laisse `q` à l'appelant (index mémoire).
+    """
+    qs = offres_visibles()
+
+    # domaine / specialite / ville / pays: sans accents ni casse (fuzzy=1 tolère les fautes)
+    fuzzy = params.get("fuzzy") in ["1", "true"]
+    qs = filtrer_champs_normalises(qs, params, fuzzy=fuzzy)
+
+    type_contrat = params.get("type_contrat")
+    mode_travail = params.get("mode_travail")
+    q = params.get("q")
+
+    # tags=django,react ; tags_mode=all (tous) ou any (au moins un, défaut)
+    tags = normaliser_tags(params.get("tags"))
+    if tags:
+        if params.get("tags_mode") == "all":
+            qs = qs.filter(tags_norm__contains=tags)
+        else:
+            qs = qs.filter(tags_norm__overlap=tags)
+
+    # competences= / langues= : ids ou noms séparés par des virgules ; *_mode=all|any
+    for param, (through, cible) in FILTRES_M2M.items():
+        ids, noms = _valeurs_liste(params.get(param))
+        if ids or noms:
+            tous = params.get(f"{param}_mode") == "all"
+            qs = qs.filter(offreId__in=offres_avec_relations(through, cible, ids, noms, tous))
+
+    # salaire_min/max, experience_min/max: chevauchement d'intervalles
+    for nom, (colonne_min, colonne_max) in FILTRES_INTERVALLES.items():
+        bas, haut = _entier(params, f"{nom}_min"), _entier(params, f"{nom}_max")
+        if bas is not None or haut is not None:
+            qs = filtrer_intervalle(qs, colonne_min, colonne_max, bas, haut)
+
+    devise = (params.get("devise") or "").strip()
+    if devise:
+        qs = qs.filter(devise__iexact=devise)
+
+    if type_contrat:
+        qs = qs.filter(type_contrat=type_contrat)
+    if mode_travail:
+        qs = qs.filter(mode_travail=mode_travail)
+    if q and plein_texte:
+        qs = qs.filter(search_vector=requete_recherche(q))
+
+    return qs
+
+
+def cle_filtres(params, autres=()):
+    """
+    Empreinte stable d'un jeu de filtres: ordre des params, casse/accents
+    des champs normalisés et espaces n'en changent pas la valeur.
+    `autres`: params pris tels quels (présence comprise), ex: tri, cursor.
+    """
+    items = []
+    for nom in PARAMS_FILTRES_OFFRES:
+        valeur = (params.get(nom) or "").strip()
+        if not valeur:
+            continue
+        if nom in OFFRE_CHAMPS_NORMALISES:
+            valeur = normaliser(valeur)
+        elif nom == "q":
+            valeur = " ".join(valeur.lower().split())
+        elif nom == "tags":
+            valeur = ",".join(sorted(normaliser_tags(valeur)))
+        elif nom in FILTRES_M2M:
+            ids, noms = _valeurs_liste(valeur)
+            valeur = ",".join(sorted(map(str, ids)) + sorted(noms))
+        items.append([nom, valeur])
+    for nom in autres:
+        if nom in params:
+            items.append([nom, params.get(nom).strip()])
+    return hashlib.sha1(json.dumps(items).encode()).hexdigest()
+
+
+# ==========================
+# Candidatures reçues (boîte de réception entreprise)
+# ==========================
+def _date(params, nom, fin=False):
+    """
+    "2026-10-01" (journée entière) ou date-heure ISO -> datetime aware.
+    fin=True: borne exclusive juste après la valeur (lendemain 00:00 pour une date).
+    """
+    valeur = params.get(nom)
+    if not valeur:
+        return None
+    try:
+        # date seule d'abord: parse_datetime accepte aussi "AAAA-MM-JJ" (minuit)
+        jour = parse_date(valeur) if len(valeur) == 10 else None
+        moment = None if jour else parse_datetime(valeur)
+    except ValueError:
+        jour = moment = None
+    if jour is not None:
+        moment = datetime.combine(jour + timedelta(days=1) if fin else jour, time.min)
+    elif moment is None:
+        raise ValidationError({nom: "Date attendue (AAAA-MM-JJ ou date-heure ISO)."})
+    elif fin:
+        moment += timedelta(microseconds=1)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def filtrer_envois(qs, params):
+    """
+    ?statut=envoye,en_attente ?offre=<id> ?date_min= ?date_max= ?candidat=<nom>
+    Servis par les index (entreprise|offre, statut, -dateEnvoi) de Envoi.
+    """
+    statuts = [s.strip() for s in (params.get("statut") or "").split(",") if s.strip()]
+    if statuts:
+        valides = dict(Envoi.STATUT_CHOICES)
+        inconnus = [s for s in statuts if s not in valides]
+        if inconnus:
+            raise ValidationError({"statut": f"Statut invalide. Choix : {', '.join(valides)}"})
+        qs = qs.filter(statut__in=statuts)
+
+    offre_id = _entier(params, "offre")
+    if offre_id is not None:
+        qs = qs.filter(offre_id=offre_id)
+
+    debut = _date(params, "date_min")
+    if debut is not None:
+        qs = qs.filter(dateEnvoi__gte=debut)
+    fin = _date(params, "date_max", fin=True)
+    if fin is not None:
+        qs = qs.filter(dateEnvoi__lt=fin)
+
+    candidat = (params.get("candidat") or "").strip()
+    if candidat:
+        condition = Q()
+        for mot in candidat.split():
+            condition &= (
+                Q(cv__user__nom__icontains=mot)
+                | Q(cv__user__prenom__icontains=mot)
+                | Q(cv__user__username__icontains=mot)
+            )
+        qs = qs.filter(condition)
+
+    return qs
@@ -0,0 +1,103 @@
+# main/hachage.py
+"""
+Pool borné pour le hachage / la vérification des mots de passe (PBKDF2).
+
+Les vues asynchrones de connexion et d'inscription (ASGI) y déportent le
+calcul: la boucle d'événements continue de servir les autres requêtes.
+hashlib.pbkdf2_hmac relâche le GIL, des threads suffisent.
+
+- PASSWORD_HASH_WORKERS calculs simultanés au plus
+- PASSWORD_HASH_FILE_MAX demandes en attente au-delà: les suivantes sont
+  refusées (PoolSature -> 503) au lieu d'allonger la file indéfiniment
+- statistiques(): en cours / en attente / rejets / temps d'attente et de calcul
+- requête annulée (client déconnecté) avant le début du calcul: la demande
+  quitte la file sans être calculée
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+
+class PoolSature(Exception):
+    pass
+
+
+class PoolHachage:
+    def __init__(self, workers, file_max):
+        self.workers = workers
+        self.file_max = file_max
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hachage")
+        self._lock = threading.Lock()
+        self.en_attente = 0
+        self.en_cours = 0
+        self.stats = {"termines": 0, "rejets": 0, "attente_totale": 0.0, "calcul_total": 0.0, "file_max_observee": 0}
+
+    def _executer(self, soumis_a, fonction, args):
+        debut = time.monotonic()
+        with self._lock:
+            self.en_attente -= 1
+            self.en_cours += 1
+            self.stats["attente_totale"] += debut - soumis_a
+        try:
+            return fonction(*args)
+        finally:
+            with self._lock:
+                self.en_cours -= 1
+                self.stats["termines"] += 1
+                self.stats["calcul_total"] += time.monotonic() - debut
+
+    async def executer(self, fonction, *args):
+        """Exécute fonction(*args) dans le pool ; PoolSature si la file est pleine."""
+        with self._lock:
+            if self.en_attente >= self.file_max and self.en_cours >= self.workers:
+                self.stats["rejets"] += 1
+                raise PoolSature()
+            self.en_attente += 1
+            self.stats["file_max_observee"] = max(self.stats["file_max_observee"], self.en_attente)
+        try:
+            futur = self._executor.submit(self._executer, time.monotonic(), fonction, args)
+        except BaseException:
+            self._quitter_file()
+            raise
+        futur.add_done_callback(self._abandonne)
+        # annuler l'attente (client déconnecté) annule aussi `futur` s'il n'a pas démarré
+        return await asyncio.wrap_future(futur)
+
+    def _quitter_file(self):
+        with self._lock:
+            self.en_attente -= 1
+
+    def _abandonne(self, futur):
+        if futur.cancelled():
+            # annulé avant d'être pris par un worker: _executer n'a pas quitté la file
+            self._quitter_file()
+
+    def statistiques(self):
+        with self._lock:
+            termines = self.stats["termines"]
+            return {
+                "workers": self.workers,
+                "file_max": self.file_max,
+                "en_cours": self.en_cours,
+                "en_attente": self.en_attente,
+                "file_max_observee": self.stats["file_max_observee"],
+                "termines": termines,
+                "rejets": self.stats["rejets"],
+                "attente_moyenne_ms": round(1000 * self.stats["attente_totale"] / termines, 2) if termines else 0.0,
+                "calcul_moyen_ms": round(1000 * self.stats["calcul_total"] / termines, 2) if termines else 0.0,
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def pool_hachage():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PoolHachage(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_FILE_MAX)
+        return _pool
@@ -0,0 +1,132 @@
+# main/idempotence.py
+"""
+En-tête Idempotency-Key sur les POST de création (envois, upload de CV).
+
+- première requête: ligne (user, clé) insérée dans un savepoint en tête de
+  vue, dans la transaction de la requête (ATOMIC_REQUESTS) ; la réponse y
+  est enregistrée à la fin et commitée avec le travail lui-même
+- requête répétée: la réponse enregistrée est renvoyée telle quelle (en-tête
+  Idempotent-Replayed), sans validation, écriture ni fichier sur disque
+- doublon concurrent: l'insertion attend sur l'index unique le commit de la
+  première requête (au plus IDEMPOTENCE_LOCK_TIMEOUT), puis rejoue sa
+  réponse ; au-delà: 409
+- même clé pour une autre requête (méthode, chemin ou corps différents): 422
+- corps qui n'est pas un objet (ex: tableau JSON): 400
+- réponse 5xx: la ligne est supprimée, la clé reste utilisable
+- lignes de plus de IDEMPOTENCE_TTL secondes: ignorées, puis supprimées par
+  `manage.py purger_idempotence`
+"""
+import hashlib
+import json
+from collections.abc import Mapping
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import CleIdempotence
+
+ENTETE = "HTTP_IDEMPOTENCY_KEY"
+MAX_LONGUEUR_CLE = 255
+
+
+def empreinte_requete(request):
+    """sha256 de la méthode, du chemin et du corps (fichiers: nom + taille, contenu non relu)."""
+    h = hashlib.sha256(f"{request.method} {request.path}".encode())
+    donnees = request.data
+    for champ in sorted(donnees.keys()):
+        valeurs = donnees.getlist(champ) if hasattr(donnees, "getlist") else [donnees[champ]]
+        for valeur in valeurs:
+            if hasattr(valeur, "read"):
+                valeur = f"<fichier {valeur.name} {valeur.size}>"
+            h.update(f"\0{champ}=".encode())
+            h.update(json.dumps(valeur, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+def _reserver(user, cle, empreinte):
+    """(ligne créée, None) si la clé est libre, sinon (None, ligne existante)."""
+    limite = timezone.now() - timedelta(seconds=settings.IDEMPOTENCE_TTL)
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT set_config('lock_timeout', %s, true)", [settings.IDEMPOTENCE_LOCK_TIMEOUT])
+    try:
+        for _ in range(2):
+            try:
+                with transaction.atomic():
+                    return CleIdempotence.objects.create(user=user, cle=cle, empreinte=empreinte), None
+            except IntegrityError:
+                existante = CleIdempotence.objects.filter(user=user, cle=cle).first()
+                if existante is not None and existante.dateCreation >= limite:
+                    return None, existante
+                if existante is not None:
+                    existante.delete()  # expirée: la clé est réutilisable
+        raise IntegrityError("Clé d'idempotence disputée")
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL lock_timeout TO DEFAULT")
+
+
+class RequetesIdempotentes:
+    """
+    Mixin APIView (avant APIView dans les bases). En tête de post():
+
+        rejeu = self.rejouer_idempotent(request)
+        if rejeu is not None:
+            return rejeu
+    """
+    cle_idempotence = None
+
+    def rejouer_idempotent(self, request):
+        """Réponse déjà enregistrée pour cette clé (ou 409 / 422), sinon None après réservation de la clé."""
+        cle = request.META.get(ENTETE)
+        if not cle:
+            return None
+        if len(cle) > MAX_LONGUEUR_CLE:
+            return Response(
+                {"error": f"Idempotency-Key trop longue (max {MAX_LONGUEUR_CLE} caractères)."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        if not isinstance(request.data, Mapping):
+            return Response(
+                {"error": "Corps de requête invalide: objet JSON ou formulaire attendu."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        empreinte = empreinte_requete(request)
+        try:
+            self.cle_idempotence, existante = _reserver(request.user, cle, empreinte)
+        except (OperationalError, IntegrityError):
+            existante = None  # lock_timeout: la première requête n'a pas encore fini
+        if self.cle_idempotence is not None:
+            return None
+
+        if existante is None or existante.statut_http is None:
+            return Response(
+                {"error": "Une requête avec cette clé d'idempotence est en cours, réessayez plus tard."},
+                status=status.HTTP_409_CONFLICT,
+            )
+        if existante.empreinte != empreinte:
+            return Response(
+                {"error": "Cette clé d'idempotence a déjà été utilisée pour une autre requête."},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        reponse = Response(existante.reponse, status=existante.statut_http)
+        reponse["Idempotent-Replayed"] = "true"
+        return reponse
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        ligne, self.cle_idempotence = self.cle_idempotence, None
+        # exception gérée par DRF: la transaction (et la réservation) est annulée
+        if ligne is not None and not transaction.get_rollback():
+            if response.status_code >= 500:
+                ligne.delete()
+            else:
+                CleIdempotence.objects.filter(pk=ligne.pk).update(
+                    statut_http=response.status_code, reponse=response.data
+                )
+        return response
@@ -0,0 +1,265 @@
+# main/index_memoire.py
+"""
+Index inversé en mémoire (par processus) des offres visibles, utilisé par
+OffreList?q= quand settings.OFFRE_SEARCH_BACKEND == "memoire".
+
+- postings compacts: array('I') d'ids triés + array('H') de fréquences alignées
+- classement BM25, requêtes par préfixe avec "dev*"
+- tenu à jour après commit (signaux_offres), et reconstruit toutes les
+  OFFRE_INDEX_MEMOIRE_TTL secondes: les écritures faites par les autres
+  workers finissent donc par être vues
+- aucune construction pendant une requête: la requête lit le dernier index
+  publié ; construction et reconstruction tournent dans un thread de fond
+  (au plus un par processus). Tant que le premier n'est pas prêt, OffreList
+  utilise la recherche plein texte PostgreSQL
+
+Les ids trouvés sont toujours refiltrés en base (est_visible + filtres), un
+index en retard ne peut donc pas exposer une offre non visible.
+
+Au plus MAX_RESULTATS offres (les mieux classées) par recherche ; au-delà la
+réponse d'OffreList porte "tronque": true et "max_resultats".
+"""
+import logging
+import math
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.postgres.fields import ArrayField
+from django.db import connections
+from django.db.models import F, FloatField, Func, IntegerField, Value
+
+from .models import Offre
+from .filters import champs_texte_offres
+from .search import normaliser
+from .signaux_offres import abonner
+
+K1 = 1.2
+B = 0.75
+MAX_TF = 0xFFFF
+MAX_RESULTATS = 2000
+
+TOKEN_RE = re.compile(r"\w+")
+
+logger = logging.getLogger(__name__)
+
+# champ -> poids (répétition du terme)
+CHAMPS_PONDERES = {
+    "titre": 3,
+    "poste": 3,
+    "tags": 2,
+    "competences": 2,
+    "description": 1,
+    "missions": 1,
+    "profil_recherche": 1,
+}
+
+
+def tokeniser(texte):
+    return [t for t in TOKEN_RE.findall(normaliser(texte)) if len(t) > 1]
+
+
+class IndexInverse:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.postings = {}       # terme -> array('I') ids triés
+        self.frequences = {}     # terme -> array('H') tf alignés sur postings
+        self.vocabulaire = []    # termes triés (préfixes)
+        self.termes_doc = {}     # id -> termes du document (pour le retrait)
+        self.longueurs = {}      # id -> longueur pondérée
+        self.longueur_totale = 0
+
+    def __len__(self):
+        return len(self.longueurs)
+
+    # --- mise à jour
+
+    def ajouter(self, doc_id, champs):
+        """champs: {nom_champ: texte}; remplace le document s'il existe."""
+        tf = Counter()
+        for nom, poids in CHAMPS_PONDERES.items():
+            for terme in tokeniser(champs.get(nom)):
+                tf[terme] += poids
+
+        with self._lock:
+            self.retirer(doc_id)
+            if not tf:
+                return
+            for terme, n in tf.items():
+                ids = self.postings.get(terme)
+                if ids is None:
+                    ids = self.postings[terme] = array("I")
+                    self.frequences[terme] = array("H")
+                    self.vocabulaire.insert(bisect_left(self.vocabulaire, terme), terme)
+                pos = bisect_left(ids, doc_id)
+                ids.insert(pos, doc_id)
+                self.frequences[terme].insert(pos, min(n, MAX_TF))
+            self.termes_doc[doc_id] = tuple(tf)
+            self.longueurs[doc_id] = sum(tf.values())
+            self.longueur_totale += self.longueurs[doc_id]
+
+    def retirer(self, doc_id):
+        with self._lock:
+            termes = self.termes_doc.pop(doc_id, None)
+            if termes is None:
+                return
+            self.longueur_totale -= self.longueurs.pop(doc_id)
+            for terme in termes:
+                ids = self.postings[terme]
+                pos = bisect_left(ids, doc_id)
+                del ids[pos]
+                del self.frequences[terme][pos]
+                if not ids:
+                    del self.postings[terme]
+                    del self.frequences[terme]
+                    del self.vocabulaire[bisect_left(self.vocabulaire, terme)]
+
+    # --- recherche
+
+    def _expansions(self, terme):
+        if not terme.endswith("*"):
+            return [terme] if terme in self.postings else []
+        prefixe = terme.rstrip("*")
+        debut = bisect_left(self.vocabulaire, prefixe)
+        fin = bisect_left(self.vocabulaire, prefixe + "\uffff")
+        return self.vocabulaire[debut:fin]
+
+    def rechercher(self, q, limite=MAX_RESULTATS):
+        """
+        Tous les termes de `q` doivent apparaître ("dev*" = préfixe).
+        Retourne [(id, score BM25)] par score décroissant.
+        """
+        termes = [t + "*" if brut.endswith("*") else t
+                  for brut in q.split() for t in tokeniser(brut)]
+        if not termes:
+            return []
+
+        with self._lock:
+            n_docs = len(self.longueurs)
+            if not n_docs:
+                return []
+            moyenne = self.longueur_totale / n_docs
+
+            scores = None
+            for terme in dict.fromkeys(termes):
+                contributions = {}
+                for t in self._expansions(terme):
+                    ids, tfs = self.postings[t], self.frequences[t]
+                    idf = math.log(1 + (n_docs - len(ids) + 0.5) / (len(ids) + 0.5))
+                    for doc_id, tf in zip(ids, tfs):
+                        norme = K1 * (1 - B + B * self.longueurs[doc_id] / moyenne)
+                        contributions[doc_id] = contributions.get(doc_id, 0.0) + idf * tf * (K1 + 1) / (tf + norme)
+
+                if scores is None:
+                    scores = contributions
+                else:
+                    scores = {d: s + contributions[d] for d, s in scores.items() if d in contributions}
+                if not scores:
+                    return []
+
+        resultats = sorted(scores.items(), key=lambda x: (-x[1], -x[0]))
+        return resultats[:limite]
+
+
+# ==========================
+# Index du processus
+# ==========================
+_index = None
+_construit_a = 0.0
+_maintenance_lock = threading.Lock()  # une seule construction de fond par processus
+
+
+def backend_actif():
+    return getattr(settings, "OFFRE_SEARCH_BACKEND", "postgres") == "memoire"
+
+
+def construire_index():
+    index = IndexInverse()
+    for offre_id, champs in champs_texte_offres(Offre.objects.filter(est_visible=True)).items():
+        index.ajouter(offre_id, champs)
+    return index
+
+
+def _reconstruire():
+    """Tâche de fond: construit un nouvel index puis le publie (l'ancien sert jusque-là)."""
+    global _index, _construit_a
+    try:
+        _index = construire_index()
+    except Exception:
+        logger.exception("Construction de l'index de recherche en mémoire impossible")
+    finally:
+        _construit_a = time.monotonic()
+        connections.close_all()  # connexions de ce thread
+        _maintenance_lock.release()
+
+
+def planifier_reconstruction():
+    """Lance la (re)construction en arrière-plan si l'index manque ou a dépassé le TTL."""
+    ttl = getattr(settings, "OFFRE_INDEX_MEMOIRE_TTL", 300)
+    due = _index is None or time.monotonic() - _construit_a > ttl
+    if due and _maintenance_lock.acquire(blocking=False):
+        try:
+            threading.Thread(target=_reconstruire, name="index_memoire", daemon=True).start()
+        except Exception:
+            _maintenance_lock.release()
+            raise
+
+
+def index_offres():
+    """Dernier index publié du processus (None tant que le premier est en construction)."""
+    planifier_reconstruction()
+    return _index
+
+
+class ElementTableau(Func):
+    """tableau[indice] (indices SQL à partir de 1)."""
+    template = "((%(expressions)s])"
+    arg_joiner = ")["
+
+
+def classer_par_index(qs, q, index):
+    """
+    Restreint qs aux MAX_RESULTATS meilleures offres de `index` et annote `rank`
+    (score BM25). Retourne (qs, tronque): tronque=True si d'autres offres
+    correspondaient au-delà de MAX_RESULTATS.
+
+    Trier par ("-rank", "-pk"): le curseur porte le score de l'offre, pas sa
+    place dans la liste, une page suivante reste cohérente si l'index change
+    entre deux pages (les offres ajoutées entre-temps ne sont pas vues).
+    """
+    resultats = index.rechercher(q, limite=MAX_RESULTATS + 1)
+    tronque = len(resultats) > MAX_RESULTATS
+    resultats = resultats[:MAX_RESULTATS]
+    if not resultats:
+        return qs.none(), False
+    ids = [offre_id for offre_id, _ in resultats]
+    qs = qs.filter(pk__in=ids).annotate(
+        rank=ElementTableau(
+            Value([score for _, score in resultats], output_field=ArrayField(FloatField())),
+            Func(
+                Value(ids, output_field=ArrayField(IntegerField())),
+                F("offreId"),
+                function="array_position",
+                output_field=IntegerField(),
+            ),
+            output_field=FloatField(),
+        )
+    )
+    return qs, tronque
+
+
+def _reindexer(qs_offres, retirer_ids=()):
+    index = _index
+    if index is None:
+        return  # pas encore construit: la construction lira l'état à jour
+    for offre_id in retirer_ids:
+        index.retirer(offre_id)
+    for offre_id, champs in champs_texte_offres(qs_offres).items():
+        index.ajouter(offre_id, champs)
+
+
+abonner(_reindexer, actif=lambda: backend_actif() and _index is not None)
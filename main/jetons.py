@@ -0,0 +1,146 @@
+# main/jetons.py
+"""
+Liste noire des refresh tokens (rotation à chaque /api/refreshToken/).
+
+- filtre de Bloom par processus des JTI en liste noire: un JTI absent du
+  filtre n'est pas en liste noire, le contrôle en base est évité ; présent
+  (ou faux positif, ~1 %) -> requête habituelle
+- le filtre est rattrapé par incréments (BlacklistedToken.id > dernier lu)
+  au plus toutes les JWT_BLACKLIST_FILTRE_FRAICHEUR secondes, et reconstruit
+  (jetons non expirés uniquement) quand il dépasse sa capacité
+- la rotation reste sûre malgré ce délai: blacklist() insère la ligne
+  BlacklistedToken (contrainte unique) ; si elle existait déjà, le jeton a
+  été réutilisé et le rafraîchissement est refusé
+
+Les jetons expirés sont supprimés par lots: `manage.py purger_jetons`.
+"""
+import hashlib
+import math
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken as BaseRefreshToken
+
+CAPACITE_MIN = 10000
+TAUX_FAUX_POSITIFS = 0.01
+# les lignes sont relues sur cette marge: un id attribué avant une ligne déjà lue
+# mais commité après elle n'est pas manqué
+MARGE_COMMIT = 60  # secondes
+
+
+class FiltreBloom:
+    def __init__(self, capacite, taux_faux_positifs=TAUX_FAUX_POSITIFS):
+        self.capacite = capacite
+        self.m = max(8, math.ceil(-capacite * math.log(taux_faux_positifs) / math.log(2) ** 2))
+        self.k = max(1, round(self.m / capacite * math.log(2)))
+        self.bits = bytearray((self.m + 7) // 8)
+        self.n = 0
+
+    def _positions(self, cle):
+        empreinte = hashlib.blake2b(cle.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(empreinte[:8], "little")
+        h2 = int.from_bytes(empreinte[8:], "little") | 1
+        return [(h1 + i * h2) % self.m for i in range(self.k)]
+
+    def ajouter(self, cle):
+        nouveau = False
+        for p in self._positions(cle):
+            octet, bit = divmod(p, 8)
+            if not self.bits[octet] & (1 << bit):
+                self.bits[octet] |= 1 << bit
+                nouveau = True
+        if nouveau:
+            self.n += 1  # une relecture (marge de commit) ne compte pas double
+
+    def __contains__(self, cle):
+        for p in self._positions(cle):
+            octet, bit = divmod(p, 8)
+            if not self.bits[octet] & (1 << bit):
+                return False
+        return True
+
+    def sature(self):
+        return self.n > self.capacite
+
+
+class ListeNoire:
+    """Filtre du processus + position de lecture dans BlacklistedToken."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.filtre = None
+        self.reperes = deque()  # (instant, plus grand id lu) des synchronisations récentes
+        self.synchronise_a = 0.0
+
+    def _reconstruire(self):
+        maintenant = timezone.now()
+        actifs = BlacklistedToken.objects.filter(token__expires_at__gt=maintenant)
+        lignes = list(actifs.values_list("id", "token__jti", "blacklisted_at"))
+        filtre = FiltreBloom(max(CAPACITE_MIN, 2 * len(lignes)))
+        for _id, jti, _date in lignes:
+            filtre.ajouter(jti)
+        self.filtre = filtre
+        # comme après un rattrapage: les MARGE_COMMIT dernières secondes seront relues
+        # (une ligne d'id inférieur peut être commitée après cette lecture)
+        limite = maintenant - timedelta(seconds=MARGE_COMMIT)
+        instant = time.monotonic()
+        self.reperes = deque([
+            (instant - MARGE_COMMIT, max((i for i, _, d in lignes if d <= limite), default=0)),
+            (instant, max((i for i, _, _ in lignes), default=0)),
+        ])
+
+    def _rattraper(self):
+        maintenant = time.monotonic()
+        while len(self.reperes) > 1 and self.reperes[1][0] <= maintenant - MARGE_COMMIT:
+            self.reperes.popleft()
+        depuis = self.reperes[0][1]
+        dernier = self.reperes[-1][1]
+        for i, jti in BlacklistedToken.objects.filter(id__gt=depuis).values_list("id", "token__jti"):
+            self.filtre.ajouter(jti)
+            dernier = max(dernier, i)
+        self.reperes.append((maintenant, dernier))
+
+    def synchroniser(self, forcer=False):
+        with self._lock:
+            if not forcer and time.monotonic() - self.synchronise_a < settings.JWT_BLACKLIST_FILTRE_FRAICHEUR:
+                return
+            if self.filtre is None or self.filtre.sature():
+                self._reconstruire()
+            else:
+                self._rattraper()
+            self.synchronise_a = time.monotonic()
+
+    def peut_contenir(self, jti):
+        self.synchroniser()
+        with self._lock:
+            return jti in self.filtre
+
+    def ajouter(self, jti):
+        with self._lock:
+            if self.filtre is not None:
+                self.filtre.ajouter(jti)
+
+
+liste_noire = ListeNoire()
+
+
+class RefreshToken(BaseRefreshToken):
+    def check_blacklist(self):
+        if liste_noire.peut_contenir(self.payload[api_settings.JTI_CLAIM]):
+            super().check_blacklist()
+
+    def blacklist(self):
+        blacklisted, cree = super().blacklist()
+        if not cree:
+            # déjà en liste noire (réutilisation, ou rafraîchissement concurrent du même jeton)
+            raise TokenError(_("Token is blacklisted"))
+        liste_noire.ajouter(self.payload[api_settings.JTI_CLAIM])
+        return blacklisted, cree
@@ -0,0 +1,17 @@
+# main/management/commands/construire_recommandations.py
+from django.core.management.base import BaseCommand
+
+from main.recommandation import reconstruire
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruit la matrice TF-IDF des offres visibles (vocabulaire compris) et la publie sur disque ; "
+        "les processus web la rechargent en arrière-plan. À lancer au déploiement puis par cron."
+    )
+
+    def handle(self, *args, **options):
+        moteur = reconstruire()
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(moteur)} offres vectorisées, vocabulaire de {moteur.matrice.shape[1]} termes."
+        ))
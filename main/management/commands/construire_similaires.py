@@ -0,0 +1,18 @@
+# main/management/commands/construire_similaires.py
+from django.core.management.base import BaseCommand
+
+from main.similarite import reconstruire
+
+
+class Command(BaseCommand):
+    help = (
+        "Construit l'index des offres similaires (SVD, k-means) et le publie sur disque ; "
+        "les processus web le rechargent en arrière-plan. À lancer au déploiement puis par cron."
+    )
+
+    def handle(self, *args, **options):
+        index = reconstruire()
+        mode = "IVF" if index.centroides is not None else "exact"
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(index)} offres indexées, dimension {index.dimension}, recherche {mode}."
+        ))
@@ -0,0 +1,26 @@
+# main/management/commands/creer_partitions_evenements.py
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+from django.utils import timezone
+
+from main.evenements import creer_partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Crée les partitions mensuelles de l'historique des statuts (EnvoiEvent) "
+        "du mois en cours et des mois suivants. À planifier (cron), ex: chaque mois."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--mois", type=int, default=3, help="Nombre de mois à couvrir, mois en cours compris (défaut 3).")
+
+    def handle(self, *args, **options):
+        try:
+            crees = creer_partitions(timezone.now().date(), options["mois"])
+        except DatabaseError as e:
+            # la partition DEFAULT contient déjà des lignes du mois: à déplacer à la main
+            raise CommandError(f"Création des partitions impossible: {e}")
+        for nom in crees:
+            self.stdout.write(f"  {nom}")
+        self.stdout.write(self.style.SUCCESS(f"{len(crees)} partitions créées."))
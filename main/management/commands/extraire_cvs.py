@@ -0,0 +1,35 @@
+# main/management/commands/extraire_cvs.py
+from django.core.management.base import BaseCommand
+
+from main.extraction import enregistrer_resultat, extraction_possible, pool_extraction
+from main.extracteurs import extraire_texte
+from main.models import CV
+
+
+class Command(BaseCommand):
+    help = "Extrait le texte des CV en attente (ou de tous avec --tous) via le pool d'extraction."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tous", action="store_true", help="Réextraire aussi les CV déjà traités.")
+
+    def handle(self, *args, **options):
+        cvs = CV.objects.only("cvId", "fichier", "type")
+        if not options["tous"]:
+            cvs = cvs.filter(extraction_statut="en_attente")
+
+        pool = pool_extraction()
+        travaux = []
+        for cv in cvs.iterator():
+            if extraction_possible(cv):
+                travaux.append((cv, pool.submit(extraire_texte, cv.fichier.path)))
+            else:
+                CV.objects.filter(pk=cv.pk).update(extraction_statut="non_supporte")
+
+        # résultats écrits ici, dans l'ordre de soumission
+        for cv, future in travaux:
+            enregistrer_resultat(cv.pk, cv.fichier.name, future)
+
+        statuts = CV.objects.filter(pk__in=[cv.pk for cv, _ in travaux]).values_list("extraction_statut", flat=True)
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(travaux)} CV soumis: {sum(s == 'terminee' for s in statuts)} extraits."
+        ))
@@ -0,0 +1,36 @@
+# main/management/commands/purger_idempotence.py
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from main.models import CleIdempotence
+
+
+class Command(BaseCommand):
+    help = "Supprime par lots les clés d'idempotence plus anciennes que IDEMPOTENCE_TTL. À planifier (cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lot", type=int, default=5000, help="Lignes supprimées par requête (défaut 5000).")
+        parser.add_argument("--pause", type=float, default=0.0, help="Pause entre deux lots, en secondes.")
+
+    def handle(self, *args, **options):
+        limite = timezone.now() - timedelta(seconds=settings.IDEMPOTENCE_TTL)
+        total = 0
+        while True:
+            ids = list(
+                CleIdempotence.objects
+                .filter(dateCreation__lt=limite)
+                .order_by("dateCreation")
+                .values_list("pk", flat=True)[:options["lot"]]
+            )
+            if not ids:
+                break
+            supprimes, _ = CleIdempotence.objects.filter(pk__in=ids).delete()
+            total += supprimes
+            if options["pause"]:
+                time.sleep(options["pause"])
+
+        self.stdout.write(self.style.SUCCESS(f"{total} clés d'idempotence expirées supprimées."))
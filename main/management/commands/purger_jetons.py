@@ -0,0 +1,44 @@
+# main/management/commands/purger_jetons.py
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+
+class Command(BaseCommand):
+    help = (
+        "Supprime par lots les refresh tokens expirés (OutstandingToken + BlacklistedToken). "
+        "À planifier (cron), ex: toutes les heures."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lot", type=int, default=5000, help="Jetons supprimés par transaction (défaut 5000).")
+        parser.add_argument("--pause", type=float, default=0.0, help="Pause entre deux lots, en secondes.")
+
+    def handle(self, *args, **options):
+        limite = timezone.now()
+        total = 0
+        dernier_id = 0
+        while True:
+            # parcours par clé primaire: les jetons les plus anciens (expirés) sont en tête de l'index
+            ids = list(
+                OutstandingToken.objects
+                .filter(id__gt=dernier_id, expires_at__lte=limite)
+                .order_by("id")
+                .values_list("id", flat=True)[:options["lot"]]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                BlacklistedToken.objects.filter(token_id__in=ids).delete()
+                supprimes, _ = OutstandingToken.objects.filter(id__in=ids).delete()
+            total += supprimes
+            dernier_id = ids[-1]
+            if options["verbosity"] > 1:
+                self.stdout.write(f"{total} jetons supprimés...")
+            if options["pause"]:
+                time.sleep(options["pause"])
+
+        self.stdout.write(self.style.SUCCESS(f"{total} jetons expirés supprimés."))
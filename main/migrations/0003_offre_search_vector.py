@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-17 01:47
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+from main.search import offre_search_vector
+
+
+def remplir_search_vector(apps, schema_editor):
+    Offre = apps.get_model("main", "Offre")
+    Offre.objects.update(search_vector=offre_search_vector())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0002_add_date_naissance_photo_profil'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='offre',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='offre',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='offre_search_vector_gin'),
+        ),
+        migrations.RunPython(remplir_search_vector, migrations.RunPython.noop),
+    ]
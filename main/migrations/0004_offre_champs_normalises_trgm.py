@@ -0,0 +1,70 @@
+# Generated by Django 5.2.4 on 2026-10-17 01:48
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+from main.search import OFFRE_CHAMPS_NORMALISES, normaliser
+
+
+def remplir_champs_normalises(apps, schema_editor):
+    Offre = apps.get_model("main", "Offre")
+    champs = list(OFFRE_CHAMPS_NORMALISES.items())
+    lot = []
+    for offre in Offre.objects.only("pk", *OFFRE_CHAMPS_NORMALISES).iterator(chunk_size=1000):
+        for champ, champ_norm in champs:
+            setattr(offre, champ_norm, normaliser(getattr(offre, champ)))
+        lot.append(offre)
+        if len(lot) >= 1000:
+            Offre.objects.bulk_update(lot, [c for _, c in champs])
+            lot = []
+    if lot:
+        Offre.objects.bulk_update(lot, [c for _, c in champs])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0003_offre_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='offre',
+            name='domaine_norm',
+            field=models.CharField(blank=True, default='', editable=False, max_length=120),
+        ),
+        migrations.AddField(
+            model_name='offre',
+            name='pays_norm',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='offre',
+            name='specialite_norm',
+            field=models.CharField(blank=True, default='', editable=False, max_length=120),
+        ),
+        migrations.AddField(
+            model_name='offre',
+            name='ville_norm',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(remplir_champs_normalises, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='offre',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['domaine_norm'], name='offre_domaine_norm_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='offre',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['specialite_norm'], name='offre_specialite_norm_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='offre',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['ville_norm'], name='offre_ville_norm_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='offre',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['pays_norm'], name='offre_pays_norm_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
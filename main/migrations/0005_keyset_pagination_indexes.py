@@ -0,0 +1,42 @@
+# Generated by Django 5.2.4 on 2026-10-17 01:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('main', '0004_offre_champs_normalises_trgm'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='envoi',
+            name='main_envoi_dateEnv_2a91ad_idx',
+        ),
+        migrations.AddIndex(
+            model_name='cv',
+            index=models.Index(fields=['user', 'dateCreation', 'cvId'], name='main_cv_user_id_f8e5cb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='entreprise',
+            index=models.Index(fields=['nomEntreprise', 'entrepriseId'], name='main_entrep_nomEntr_485066_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='envoi',
+            index=models.Index(fields=['dateEnvoi', 'envoiId'], name='main_envoi_dateEnv_d8d30a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='offre',
+            index=models.Index(fields=['dateCreation', 'offreId'], name='main_offre_dateCre_dd519d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='offre',
+            index=models.Index(fields=['entreprise', 'dateCreation', 'offreId'], name='main_offre_entrepr_2b914c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='utilisateur',
+            index=models.Index(fields=['dateInscription', 'id'], name='main_utilis_dateIns_c699f1_idx'),
+        ),
+    ]
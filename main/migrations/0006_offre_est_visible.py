@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-17 01:51
+
+from django.db import migrations, models
+
+
+def remplir_est_visible(apps, schema_editor):
+    Offre = apps.get_model("main", "Offre")
+    Offre.objects.filter(
+        estPubliee=True,
+        recevoirCandidatures=True,
+        estArchivee=False,
+        entreprise__recevoirCandidatures=True,
+    ).update(est_visible=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0005_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='offre',
+            name='main_offre_estPubl_295eab_idx',
+        ),
+        migrations.AddField(
+            model_name='offre',
+            name='est_visible',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(remplir_est_visible, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='offre',
+            index=models.Index(condition=models.Q(('est_visible', True)), fields=['dateCreation', 'offreId'], name='offre_visible_date_idx'),
+        ),
+    ]
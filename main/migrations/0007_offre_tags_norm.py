@@ -0,0 +1,40 @@
+# Generated by Django 5.2.4 on 2026-10-17 01:53
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+from main.search import normaliser_tags
+
+
+def remplir_tags_norm(apps, schema_editor):
+    Offre = apps.get_model("main", "Offre")
+    lot = []
+    for offre in Offre.objects.exclude(tags__isnull=True).exclude(tags="").only("pk", "tags").iterator(chunk_size=1000):
+        offre.tags_norm = normaliser_tags(offre.tags)
+        lot.append(offre)
+        if len(lot) >= 1000:
+            Offre.objects.bulk_update(lot, ["tags_norm"])
+            lot = []
+    if lot:
+        Offre.objects.bulk_update(lot, ["tags_norm"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0006_offre_est_visible'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='offre',
+            name='tags_norm',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=100), blank=True, default=list, editable=False, size=None),
+        ),
+        migrations.RunPython(remplir_tags_norm, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='offre',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['tags_norm'], name='offre_tags_norm_gin'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-17 01:55
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0007_offre_tags_norm'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='offre',
+            index=models.Index(condition=models.Q(('est_visible', True)), fields=['salaire_min', 'salaire_max'], name='offre_visible_salaire_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='offre',
+            index=models.Index(condition=models.Q(('est_visible', True)), fields=['experience_min', 'experience_max'], name='offre_visible_experience_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='offre',
+            index=models.Index(django.db.models.functions.comparison.Coalesce('salaire_min', 'salaire_max', models.Value(2147483647)), models.F('dateCreation'), condition=models.Q(('est_visible', True)), name='offre_visible_tri_sal_asc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='offre',
+            index=models.Index(django.db.models.functions.comparison.Coalesce('salaire_max', 'salaire_min', models.Value(-1)), models.F('dateCreation'), condition=models.Q(('est_visible', True)), name='offre_visible_tri_sal_desc_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 01:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0008_offre_salaire_experience_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cv',
+            name='texte',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+    ]
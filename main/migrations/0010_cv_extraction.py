@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0009_cv_texte'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cv',
+            name='extraction_statut',
+            field=models.CharField(choices=[('en_attente', 'En attente'), ('terminee', 'Terminée'), ('echec', 'Échec'), ('non_supporte', 'Non supporté')], default='en_attente', editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='cv',
+            name='nb_pages',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:00
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+from main.search import cv_search_vector
+
+
+def remplir_search_vector(apps, schema_editor):
+    CV = apps.get_model("main", "CV")
+    CV.objects.exclude(texte="").update(search_vector=cv_search_vector())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0010_cv_extraction'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cv',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='cv',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='cv_search_vector_gin'),
+        ),
+        migrations.RunPython(remplir_search_vector, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:30
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+
+
+def remplir_date_modification(apps, schema_editor):
+    # point de départ: date de création (pas de date de migration partagée par toutes les lignes)
+    Utilisateur = apps.get_model("main", "Utilisateur")
+    Entreprise = apps.get_model("main", "Entreprise")
+    CV = apps.get_model("main", "CV")
+    Offre = apps.get_model("main", "Offre")
+
+    Utilisateur.objects.update(dateModification=F("dateInscription"))
+    Entreprise.objects.update(
+        dateModification=Subquery(
+            Utilisateur.objects.filter(pk=OuterRef("user_id")).values("dateInscription")[:1]
+        )
+    )
+    CV.objects.update(dateModification=F("dateCreation"))
+    Offre.objects.update(dateModification=F("dateCreation"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0011_cv_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='utilisateur',
+            name='dateModification',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='entreprise',
+            name='dateModification',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='cv',
+            name='dateModification',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='offre',
+            name='dateModification',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(remplir_date_modification, migrations.RunPython.noop),
+    ]
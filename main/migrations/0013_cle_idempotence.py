@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:23
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0012_date_modification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CleIdempotence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cle', models.CharField(max_length=255)),
+                ('empreinte', models.CharField(max_length=64)),
+                ('statut_http', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('reponse', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+                ('dateCreation', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['dateCreation'], name='main_cleide_dateCre_81694e_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'cle'), name='cle_idempotence_unique')],
+            },
+        ),
+    ]
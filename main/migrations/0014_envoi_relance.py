@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# une ligne par (cv, offre) déjà envoyé: dernier envoi + délai actuel de l'offre
+REMPLIR_RELANCES = """
+    INSERT INTO main_envoirelance (cv_id, offre_id, dernier_envoi, prochain_envoi)
+    SELECT e.cv_id, e.offre_id, MAX(e."dateEnvoi"),
+           MAX(e."dateEnvoi") + COALESCE(NULLIF(o.relance_days, 0), 7) * interval '1 day'
+    FROM main_envoi e
+    JOIN main_offre o ON o."offreId" = e.offre_id
+    GROUP BY e.cv_id, e.offre_id, o.relance_days
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0013_cle_idempotence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnvoiRelance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dernier_envoi', models.DateTimeField()),
+                ('prochain_envoi', models.DateTimeField()),
+                ('cv', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='main.cv')),
+                ('offre', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='main.offre')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('cv', 'offre'), name='envoi_relance_unique')],
+            },
+        ),
+        migrations.RunSQL(REMPLIR_RELANCES, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+REMPLIR_ENTREPRISE = """
+    UPDATE main_envoi e
+    SET entreprise_id = o.entreprise_id
+    FROM main_offre o
+    WHERE o."offreId" = e.offre_id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0014_envoi_relance'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='envoi',
+            name='entreprise',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='envois', to='main.entreprise'),
+        ),
+        migrations.RunSQL(REMPLIR_ENTREPRISE, migrations.RunSQL.noop),
+    ]
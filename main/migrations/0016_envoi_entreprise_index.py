@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # migration distincte du remplissage (0015): ALTER TABLE refusé après un UPDATE
+    # dans la même transaction tant que les contrôles de clés étrangères sont différés
+
+    dependencies = [
+        ('main', '0015_envoi_entreprise'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='envoi',
+            name='entreprise',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='envois', to='main.entreprise'),
+        ),
+        migrations.AddIndex(
+            model_name='envoi',
+            index=models.Index(fields=['entreprise', '-dateEnvoi', '-envoiId'], name='main_envoi_entrepr_7eff84_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='envoi',
+            index=models.Index(fields=['entreprise', 'statut', '-dateEnvoi'], name='main_envoi_entrepr_c2063c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='envoi',
+            index=models.Index(fields=['offre', 'statut', '-dateEnvoi'], name='main_envoi_offre_i_fbcb4a_idx'),
+        ),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 5.2.4 on 2026-10-17 09:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from datetime import date
+
+from django.conf import settings
+from django.db import migrations, models
+
+# partitionnement: la clé primaire doit inclure la clé de partition
+CREER_TABLE = """
+    CREATE TABLE main_envoievent (
+        id bigint GENERATED BY DEFAULT AS IDENTITY,
+        envoi_id integer NOT NULL,
+        entreprise_id integer NOT NULL,
+        auteur_id integer NULL,
+        ancien_statut varchar(20) NULL,
+        statut varchar(20) NOT NULL,
+        "dateEvenement" timestamp with time zone NOT NULL,
+        PRIMARY KEY (id, "dateEvenement")
+    ) PARTITION BY RANGE ("dateEvenement");
+    CREATE TABLE main_envoievent_defaut PARTITION OF main_envoievent DEFAULT;
+    CREATE INDEX envoievent_envoi_date_idx ON main_envoievent (envoi_id, "dateEvenement");
+    CREATE INDEX envoievent_entreprise_date_idx ON main_envoievent (entreprise_id, "dateEvenement");
+"""
+
+# historique connu: la création de chaque candidature (les changements passés sont perdus)
+REMPLIR_CREATIONS = """
+    INSERT INTO main_envoievent (envoi_id, entreprise_id, ancien_statut, statut, "dateEvenement")
+    SELECT "envoiId", entreprise_id, NULL, 'envoye', "dateEnvoi" FROM main_envoi
+"""
+
+MOIS_A_VENIR = 3
+
+
+def creer_partitions(apps, schema_editor):
+    """Partitions mensuelles du mois du premier envoi jusqu'à MOIS_A_VENIR mois après aujourd'hui."""
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SELECT min("dateEnvoi") FROM main_envoi')
+        premier = cursor.fetchone()[0]
+        aujourd_hui = django.utils.timezone.now().date()
+        mois = date(*(premier or aujourd_hui).timetuple()[:2], 1)
+        fin = date(aujourd_hui.year + (aujourd_hui.month + MOIS_A_VENIR) // 12, (aujourd_hui.month + MOIS_A_VENIR) % 12 + 1, 1)
+        while mois < fin:
+            suivant = date(mois.year + mois.month // 12, mois.month % 12 + 1, 1)
+            cursor.execute(
+                f"CREATE TABLE main_envoievent_{mois:%Y%m} PARTITION OF main_envoievent "
+                f"FOR VALUES FROM ('{mois:%Y-%m-%d}') TO ('{suivant:%Y-%m-%d}')"
+            )
+            mois = suivant
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0016_envoi_entreprise_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='EnvoiEvent',
+                    fields=[
+                        ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                        ('ancien_statut', models.CharField(blank=True, choices=[('envoye', 'Envoyé'), ('en_attente', 'En attente'), ('accepte', 'Accepté'), ('refuse', 'Refusé')], max_length=20, null=True)),
+                        ('statut', models.CharField(choices=[('envoye', 'Envoyé'), ('en_attente', 'En attente'), ('accepte', 'Accepté'), ('refuse', 'Refusé')], max_length=20)),
+                        ('dateEvenement', models.DateTimeField(default=django.utils.timezone.now)),
+                        ('auteur', models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                        ('entreprise', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='main.entreprise')),
+                        ('envoi', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='evenements', to='main.envoi')),
+                    ],
+                    options={
+                        'indexes': [models.Index(fields=['envoi', 'dateEvenement'], name='envoievent_envoi_date_idx'), models.Index(fields=['entreprise', 'dateEvenement'], name='envoievent_entreprise_date_idx')],
+                    },
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL(CREER_TABLE, "DROP TABLE main_envoievent"),
+                migrations.RunPython(creer_partitions, migrations.RunPython.noop),
+                migrations.RunSQL(REMPLIR_CREATIONS, migrations.RunSQL.noop),
+            ],
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:47
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0017_envoi_event'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='offre',
+            name='offre_visible_tri_sal_asc_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='offre',
+            name='offre_visible_tri_sal_desc_idx',
+        ),
+        migrations.AddIndex(
+            model_name='offre',
+            index=models.Index(django.db.models.functions.comparison.Coalesce('salaire_min', 'salaire_max', models.Value(2147483647)), models.OrderBy(models.F('dateCreation'), descending=True), models.OrderBy(models.F('offreId'), descending=True), condition=models.Q(('est_visible', True)), name='offre_visible_tri_sal_asc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='offre',
+            index=models.Index(django.db.models.functions.comparison.Coalesce('salaire_max', 'salaire_min', models.Value(-1)), models.F('dateCreation'), models.F('offreId'), condition=models.Q(('est_visible', True)), name='offre_visible_tri_sal_desc_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-17 10:20
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0018_offre_tri_salaire_sens'),
+    ]
+
+    operations = [
+        # version du catalogue d'offres (main/cache_catalogue.py): nextval est atomique entre processus
+        migrations.RunSQL(
+            # nextval initial: last_value est alors une version déjà attribuée
+            "CREATE SEQUENCE main_catalogue_version_seq; SELECT nextval('main_catalogue_version_seq');",
+            "DROP SEQUENCE main_catalogue_version_seq",
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-17 11:05
+
+from django.db import migrations, models
+
+# 0017 n'a reconstitué que les créations: le statut actuel d'une candidature déjà
+# traitée manquait à l'historique. Changement survenu entre dateEnvoi et l'activation
+# du journal: daté de dateEnvoi (borne inférieure) et marqué approximatif.
+REMPLIR_STATUTS_ACTUELS = """
+    INSERT INTO main_envoievent (envoi_id, entreprise_id, ancien_statut, statut, "dateEvenement", date_approximative)
+    SELECT e."envoiId", e.entreprise_id, 'envoye', e.statut, e."dateEnvoi", true
+    FROM main_envoi e
+    WHERE e.statut <> 'envoye'
+      AND NOT EXISTS (SELECT 1 FROM main_envoievent v WHERE v.envoi_id = e."envoiId" AND v.statut = e.statut)
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0019_catalogue_version_seq'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='envoievent',
+            name='date_approximative',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunSQL(REMPLIR_STATUTS_ACTUELS, "DELETE FROM main_envoievent WHERE date_approximative"),
+    ]
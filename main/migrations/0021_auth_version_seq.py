@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-17 14:30
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0020_envoievent_date_approximative'),
+    ]
+
+    operations = [
+        # versions des utilisateurs en cache (main/authentication.py): nextval est atomique entre processus
+        migrations.RunSQL(
+            # nextval initial: last_value est alors une version déjà attribuée
+            "CREATE SEQUENCE main_auth_version_seq; SELECT nextval('main_auth_version_seq');",
+            "DROP SEQUENCE main_auth_version_seq",
+        ),
+    ]
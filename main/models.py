@@ -1,9 +1,24 @@
 from django.db import models
+from django.db.models import F, Q, Value
+from django.db.models.functions import Coalesce
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
+from .search import (
+    OFFRE_CHAMPS_NORMALISES,
+    OFFRE_CHAMPS_RECHERCHE,
+    normaliser,
+    normaliser_tags,
+    offre_search_vector,
+)
+
 
 # =========================
 # User Manager
@@ -53,12 +68,18 @@ class Utilisateur(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
     dateInscription = models.DateTimeField(auto_now_add=True)
+    dateModification = models.DateTimeField(auto_now=True)
 
     objects = UtilisateurManager()
 
     USERNAME_FIELD = "username"
     REQUIRED_FIELDS = ["email"]
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["dateInscription", "id"]),
+        ]
+
     def __str__(self):
         return self.username
 
@@ -79,6 +100,24 @@ class Entreprise(models.Model):
 
     recevoirCandidatures = models.BooleanField(default=True)
 
+    dateModification = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["nomEntreprise", "entrepriseId"]),
+        ]
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.synchroniser_visibilite_offres()
+
+    def synchroniser_visibilite_offres(self):
+        """Répercute recevoirCandidatures sur Offre.est_visible (un seul UPDATE)."""
+        if self.recevoirCandidatures:
+            self.offres.filter(OFFRE_VISIBLE_SI_ENTREPRISE_ACTIVE, est_visible=False).update(est_visible=True)
+        else:
+            self.offres.filter(est_visible=True).update(est_visible=False)
+
     def __str__(self):
         return self.nomEntreprise
 
@@ -104,6 +143,13 @@ class CV(models.Model):
         ("portfolio", "Portfolio"),
     ]
 
+    EXTRACTION_CHOICES = [
+        ("en_attente", "En attente"),
+        ("terminee", "Terminée"),
+        ("echec", "Échec"),
+        ("non_supporte", "Non supporté"),
+    ]
+
     cvId = models.AutoField(primary_key=True)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="cvs")
 
@@ -111,7 +157,23 @@ class CV(models.Model):
     fichier = models.FileField(upload_to="cvs/")
     type = models.CharField(max_length=20, choices=TYPE_CHOICES, default="cv")
 
+    # texte brut extrait du fichier en arrière-plan (voir main/extraction.py)
+    texte = models.TextField(blank=True, default="", editable=False)
+    nb_pages = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    extraction_statut = models.CharField(
+        max_length=20, choices=EXTRACTION_CHOICES, default="en_attente", editable=False
+    )
+    # plein texte recruteur (GIN), mis à jour avec `texte`
+    search_vector = SearchVectorField(null=True, editable=False)
+
     dateCreation = models.DateTimeField(auto_now_add=True)
+    dateModification = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "dateCreation", "cvId"]),
+            GinIndex(fields=["search_vector"], name="cv_search_vector_gin"),
+        ]
 
     def __str__(self):
         return self.nom
@@ -137,6 +199,14 @@ class Langue(models.Model):
 # =========================
 # Offre
 # =========================
+# conditions propres à l'offre; est_visible exige en plus entreprise.recevoirCandidatures
+OFFRE_VISIBLE_SI_ENTREPRISE_ACTIVE = Q(estPubliee=True, recevoirCandidatures=True, estArchivee=False)
+OFFRE_CHAMPS_VISIBILITE = {"estPubliee", "recevoirCandidatures", "estArchivee", "entreprise"}
+# tri par salaire: les offres sans salaire passent en dernier (index ci-dessous et filters.trier_par_salaire)
+SALAIRE_ABSENT_ASC = 2147483647
+SALAIRE_ABSENT_DESC = -1
+
+
 class Offre(models.Model):
     TYPE_CONTRAT_CHOICES = [
         ("cdi", "CDI"),
@@ -199,6 +269,8 @@ class Offre(models.Model):
     avantages = models.TextField(null=True, blank=True)
 
     tags = models.CharField(max_length=255, null=True, blank=True)  # ex: "django,react,api,rest"
+    # tags découpés et normalisés (maintenu dans save), filtrables via index GIN
+    tags_norm = ArrayField(models.CharField(max_length=100), default=list, blank=True, editable=False)
 
     competences = models.ManyToManyField(Competence, blank=True)
     langues = models.ManyToManyField(Langue, blank=True)
@@ -217,9 +289,29 @@ class Offre(models.Model):
 
     dateLimite = models.DateField(null=True, blank=True)
     dateCreation = models.DateTimeField(auto_now_add=True)
+    dateModification = models.DateTimeField(auto_now=True)
+
+    # visible pour candidats: publiée + recevoir ON + non archivée + entreprise active
+    # (maintenu dans save et Entreprise.synchroniser_visibilite_offres)
+    est_visible = models.BooleanField(default=False, editable=False)
+
+    # recherche plein texte (maintenu dans save)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    # copies normalisées (minuscules, sans accents) pour les filtres sous-chaîne
+    domaine_norm = models.CharField(max_length=120, blank=True, default="", editable=False)
+    specialite_norm = models.CharField(max_length=120, blank=True, default="", editable=False)
+    ville_norm = models.CharField(max_length=100, blank=True, default="", editable=False)
+    pays_norm = models.CharField(max_length=100, blank=True, default="", editable=False)
 
     class Meta:
         indexes = [
+            GinIndex(fields=["search_vector"], name="offre_search_vector_gin"),
+            GinIndex(fields=["domaine_norm"], opclasses=["gin_trgm_ops"], name="offre_domaine_norm_trgm"),
+            GinIndex(fields=["specialite_norm"], opclasses=["gin_trgm_ops"], name="offre_specialite_norm_trgm"),
+            GinIndex(fields=["ville_norm"], opclasses=["gin_trgm_ops"], name="offre_ville_norm_trgm"),
+            GinIndex(fields=["pays_norm"], opclasses=["gin_trgm_ops"], name="offre_pays_norm_trgm"),
+            GinIndex(fields=["tags_norm"], name="offre_tags_norm_gin"),
             models.Index(fields=["domaine"]),
             models.Index(fields=["specialite"]),
             models.Index(fields=["ville"]),
@@ -227,9 +319,75 @@ class Offre(models.Model):
             models.Index(fields=["type_contrat"]),
             models.Index(fields=["mode_travail"]),
             models.Index(fields=["niveau"]),
-            models.Index(fields=["estPubliee", "recevoirCandidatures", "estArchivee"]),
+            # offres visibles, parcours par date (pagination keyset incluse)
+            models.Index(
+                fields=["dateCreation", "offreId"],
+                condition=Q(est_visible=True),
+                name="offre_visible_date_idx",
+            ),
+            # filtres d'intervalles salaire / expérience sur les offres visibles
+            models.Index(
+                fields=["salaire_min", "salaire_max"],
+                condition=Q(est_visible=True),
+                name="offre_visible_salaire_idx",
+            ),
+            models.Index(
+                fields=["experience_min", "experience_max"],
+                condition=Q(est_visible=True),
+                name="offre_visible_experience_idx",
+            ),
+            # tri par salaire: mêmes expressions et mêmes sens que filters.trier_par_salaire
+            # croissant: (salaire_tri, -dateCreation, -pk)
+            models.Index(
+                Coalesce("salaire_min", "salaire_max", Value(SALAIRE_ABSENT_ASC)),
+                F("dateCreation").desc(),
+                F("offreId").desc(),
+                condition=Q(est_visible=True),
+                name="offre_visible_tri_sal_asc_idx",
+            ),
+            # décroissant: (-salaire_tri, -dateCreation, -pk), index lu à l'envers
+            models.Index(
+                Coalesce("salaire_max", "salaire_min", Value(SALAIRE_ABSENT_DESC)),
+                "dateCreation",
+                "offreId",
+                condition=Q(est_visible=True),
+                name="offre_visible_tri_sal_desc_idx",
+            ),
+            # pagination keyset (dateCreation, pk)
+            models.Index(fields=["dateCreation", "offreId"]),
+            models.Index(fields=["entreprise", "dateCreation", "offreId"]),
         ]
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+
+        if update_fields is None or set(update_fields) & OFFRE_CHAMPS_VISIBILITE:
+            self.est_visible = (
+                self.estPubliee
+                and self.recevoirCandidatures
+                and not self.estArchivee
+                and self.entreprise.recevoirCandidatures
+            )
+            if update_fields is not None:
+                update_fields = set(update_fields) | {"est_visible"}
+
+        for champ, champ_norm in OFFRE_CHAMPS_NORMALISES.items():
+            setattr(self, champ_norm, normaliser(getattr(self, champ)))
+        self.tags_norm = normaliser_tags(self.tags)
+        if update_fields is not None:
+            update_fields = set(update_fields) | {
+                champ_norm for champ, champ_norm in OFFRE_CHAMPS_NORMALISES.items() if champ in update_fields
+            }
+            if "tags" in update_fields:
+                update_fields.add("tags_norm")
+            update_fields.add("dateModification")
+            kwargs["update_fields"] = update_fields
+
+        super().save(*args, **kwargs)
+        # recalcul du vecteur seulement si un champ texte a pu changer
+        if update_fields is None or update_fields & set(OFFRE_CHAMPS_RECHERCHE):
+            Offre.objects.filter(pk=self.pk).update(search_vector=offre_search_vector())
+
     def __str__(self):
         return f"{self.titre} - {self.entreprise.nomEntreprise}"
 
@@ -248,6 +406,10 @@ class Envoi(models.Model):
     envoiId = models.AutoField(primary_key=True)
     cv = models.ForeignKey(CV, on_delete=models.CASCADE, related_name="envois")
     offre = models.ForeignKey(Offre, on_delete=models.CASCADE, related_name="envois")
+    # = offre.entreprise (dénormalisé): boîte de réception de l'entreprise sans jointure par Offre
+    entreprise = models.ForeignKey(
+        Entreprise, on_delete=models.CASCADE, related_name="envois", editable=False, db_index=False
+    )
 
     # snapshot utile (historique)
     entreprise_nom_snapshot = models.CharField(max_length=150, null=True, blank=True)
@@ -261,20 +423,112 @@ class Envoi(models.Model):
 
     class Meta:
         indexes = [
-            models.Index(fields=["dateEnvoi"]),
+            models.Index(fields=["dateEnvoi", "envoiId"]),
             models.Index(fields=["statut"]),
             models.Index(fields=["cv", "offre", "dateEnvoi"]),
+            # boîte de réception entreprise: tri par date, filtre statut, filtre offre
+            models.Index(fields=["entreprise", "-dateEnvoi", "-envoiId"]),
+            models.Index(fields=["entreprise", "statut", "-dateEnvoi"]),
+            models.Index(fields=["offre", "statut", "-dateEnvoi"]),
         ]
 
     def save(self, *args, **kwargs):
         # remplir snapshot automatiquement à la création
         if not self.pk and self.offre_id:
-            self.entreprise_nom_snapshot = self.offre.entreprise.nomEntreprise
-            self.offre_titre_snapshot = self.offre.titre
-            self.offre_domaine_snapshot = self.offre.domaine
-            self.offre_ville_snapshot = self.offre.ville
-            self.offre_pays_snapshot = self.offre.pays
+            self.remplir_snapshot(self.offre)
         super().save(*args, **kwargs)
 
+    def remplir_snapshot(self, offre):
+        """Copie les champs affichés de l'offre (entreprise déjà chargée: bulk_create n'appelle pas save)."""
+        self.entreprise_id = offre.entreprise_id
+        self.entreprise_nom_snapshot = offre.entreprise.nomEntreprise
+        self.offre_titre_snapshot = offre.titre
+        self.offre_domaine_snapshot = offre.domaine
+        self.offre_ville_snapshot = offre.ville
+        self.offre_pays_snapshot = offre.pays
+
     def __str__(self):
         return f"{self.cv.nom} → {self.offre.titre}"
+
+
+# =========================
+# Clés d'idempotence (POST rejoués par les clients mobiles)
+# =========================
+class CleIdempotence(models.Model):
+    """Première réponse d'un POST portant l'en-tête Idempotency-Key (voir main/idempotence.py)."""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    cle = models.CharField(max_length=255)
+    # méthode + chemin + corps: une même clé réutilisée pour une autre requête est refusée
+    empreinte = models.CharField(max_length=64)
+
+    statut_http = models.PositiveSmallIntegerField(null=True, blank=True)
+    reponse = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    dateCreation = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "cle"], name="cle_idempotence_unique"),
+        ]
+        indexes = [
+            models.Index(fields=["dateCreation"]),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}:{self.cle}"
+
+
+# =========================
+# Délai de ré-envoi par (CV, offre)
+# =========================
+class EnvoiRelance(models.Model):
+    """Dernier envoi d'un CV à une offre et date du prochain envoi permis (voir main/relances.py)."""
+    cv = models.ForeignKey(CV, on_delete=models.CASCADE, related_name="+", db_index=False)  # couvert par l'index unique
+    offre = models.ForeignKey(Offre, on_delete=models.CASCADE, related_name="+")
+    dernier_envoi = models.DateTimeField()
+    prochain_envoi = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["cv", "offre"], name="envoi_relance_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.cv_id} → {self.offre_id} (≥ {self.prochain_envoi:%Y-%m-%d %H:%M})"
+
+
+# =========================
+# Historique des statuts (append-only)
+# =========================
+class EnvoiEvent(models.Model):
+    """
+    Un changement de statut d'un Envoi (création comprise), jamais modifié ni supprimé
+    (voir main/evenements.py). Table partitionnée par mois sur dateEvenement:
+    clé primaire (id, dateEvenement) en base, pas de clé étrangère.
+    """
+    id = models.BigAutoField(primary_key=True)
+    # sans contrainte: l'historique survit à la suppression de la candidature
+    envoi = models.ForeignKey(
+        Envoi, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name="evenements"
+    )
+    entreprise = models.ForeignKey(
+        Entreprise, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name="+"
+    )
+    auteur = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False,
+        null=True, blank=True, related_name="+",
+    )
+    ancien_statut = models.CharField(max_length=20, choices=Envoi.STATUT_CHOICES, null=True, blank=True)
+    statut = models.CharField(max_length=20, choices=Envoi.STATUT_CHOICES)
+    dateEvenement = models.DateTimeField(default=timezone.now)
+    # reconstitué après coup (migration 0020): changement survenu après dateEnvoi, date réelle inconnue
+    date_approximative = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # chronologie d'une candidature ; délais de réponse par entreprise
+            models.Index(fields=["envoi", "dateEvenement"], name="envoievent_envoi_date_idx"),
+            models.Index(fields=["entreprise", "dateEvenement"], name="envoievent_entreprise_date_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.envoi_id}: {self.ancien_statut or '-'} → {self.statut}"
@@ -0,0 +1,131 @@
+# main/pagination.py
+import base64
+import datetime
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
+
+
+def _json_default(valeur):
+    # isoformat complet: les microsecondes doivent survivre à l'aller-retour du curseur
+    if isinstance(valeur, (datetime.datetime, datetime.date)):
+        return valeur.isoformat()
+    raise TypeError(f"Valeur de curseur non sérialisable: {valeur!r}")
+
+
+def estimer_total(qs):
+    """
+    Nombre de lignes estimé par le planificateur PostgreSQL (EXPLAIN),
+    sans exécuter de COUNT(*).
+    """
+    sql, params = qs.order_by().query.sql_with_params()
+    with connections[qs.db].cursor() as cursor:
+        cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class KeysetPagination:
+    """
+    Pagination par curseur (keyset), opt-in: ?cursor= (vide pour la 1re page) ou ?page_size=.
+    `ordering` doit se terminer par la clé primaire pour garantir un ordre total,
+    ex: ("-dateCreation", "-pk"). Pas de COUNT(*): ?estimate=1 ajoute une estimation.
+    """
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def __init__(self, ordering):
+        self.ordering = tuple(ordering)
+        self.next_cursor = None
+        self.estimated_count = None
+
+    @classmethod
+    def is_requested(cls, request):
+        params = request.query_params
+        return cls.cursor_query_param in params or cls.page_size_query_param in params
+
+    def get_page_size(self, request):
+        default = api_settings.PAGE_SIZE or 20
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, default))
+        except (TypeError, ValueError):
+            return default
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, qs, request):
+        page_size = self.get_page_size(request)
+
+        if request.query_params.get("estimate") in ["1", "true"]:
+            self.estimated_count = estimer_total(qs)
+
+        qs = qs.order_by(*self.ordering)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            qs = qs.filter(self._apres(self._decoder(cursor, qs.model)))
+
+        items = list(qs[:page_size + 1])
+        if len(items) > page_size:
+            items = items[:page_size]
+            self.next_cursor = self._encoder(items[-1])
+        return items
+
+    def get_response_data(self, key, data):
+        payload = {key: data, "next_cursor": self.next_cursor, "has_more": self.next_cursor is not None}
+        if self.estimated_count is not None:
+            payload["estimated_count"] = self.estimated_count
+        return payload
+
+    # --- curseur
+
+    def _champs(self):
+        return [(o.lstrip("-"), o.startswith("-")) for o in self.ordering]
+
+    def _apres(self, valeurs):
+        """
+        (a, b, pk) après (va, vb, vpk) dans l'ordre de tri:
+        a < va OR (a = va AND b < vb) OR ... ; la première borne (a <= va)
+        est répétée pour que l'index serve d'intervalle de départ.
+        """
+        champs = self._champs()
+        condition = Q()
+        egalites = {}
+        for (nom, desc), valeur in zip(champs, valeurs):
+            condition |= Q(**egalites, **{f"{nom}__{'lt' if desc else 'gt'}": valeur})
+            egalites[nom] = valeur
+
+        premier, desc = champs[0]
+        return Q(**{f"{premier}__{'lte' if desc else 'gte'}": valeurs[0]}) & condition
+
+    def _encoder(self, obj):
+        valeurs = [getattr(obj, nom) for nom, _ in self._champs()]
+        brut = json.dumps(valeurs, default=_json_default, separators=(",", ":"))
+        return base64.urlsafe_b64encode(brut.encode()).decode().rstrip("=")
+
+    def _decoder(self, cursor, model):
+        try:
+            brut = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            valeurs = json.loads(brut)
+            champs = self._champs()
+            if not isinstance(valeurs, list) or len(valeurs) != len(champs):
+                raise ValueError
+            return [self._to_python(model, nom, v) for (nom, _), v in zip(champs, valeurs)]
+        except (ValueError, TypeError, UnicodeDecodeError):
+            raise ValidationError({self.cursor_query_param: "Curseur invalide."})
+
+    def _to_python(self, model, nom, valeur):
+        try:
+            field = model._meta.pk if nom == "pk" else model._meta.get_field(nom)
+        except FieldDoesNotExist:
+            # annotation (ex: rank) -> valeur JSON telle quelle
+            return valeur
+        try:
+            return field.to_python(valeur)
+        except DjangoValidationError:
+            raise ValueError(nom)
@@ -0,0 +1,341 @@
+# main/recommandation.py
+"""
+Recommandation d'offres pour un CV par similarité cosinus TF-IDF.
+
+- matrice creuse (CSR) des offres visibles: titre, poste, tags, compétences,
+  description, missions, profil_recherche ; lignes normalisées L2, le produit
+  scalaire est donc directement le cosinus
+- persistée dans settings.RECOMMANDATION_DIR (vectoriseur + matrice), rechargée
+  par chaque processus quand le fichier sur disque est plus récent ; au
+  chargement, les offres devenues visibles / invisibles depuis sont rattrapées
+- mise à jour incrémentale après commit (signaux_offres): l'ancienne ligne est
+  désactivée, la nouvelle est ajoutée à une petite matrice `delta` fusionnée
+  par paliers ; le vocabulaire reste celui de la dernière construction
+- aucune construction pendant une requête: la requête lit le dernier moteur
+  publié dans le processus ; chargement d'un fichier plus récent et
+  rattrapage (toutes les RATTRAPAGE secondes) tournent dans un thread de
+  fond (au plus un par processus). Tant qu'aucun moteur n'est prêt:
+  MoteurIndisponible (503)
+- reconstruction complète (vocabulaire compris) seulement par
+  `python manage.py construire_recommandations` (déploiement, cron) ; un
+  vocabulaire périmé (catalogue doublé depuis) est signalé dans les logs
+
+Les ids recommandés sont refiltrés en base (est_visible): une matrice en
+retard ne peut pas exposer une offre non visible.
+"""
+import logging
+import os
+import threading
+import time
+
+import joblib
+import numpy as np
+from django.conf import settings
+from django.db import connections
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from .filters import champs_texte_offres
+from .models import Offre
+from .search import normaliser
+from .signaux_offres import abonner
+
+# champ -> répétitions (pondération simple des termes du titre)
+CHAMPS_PONDERES = {
+    "titre": 3,
+    "poste": 3,
+    "tags": 2,
+    "competences": 2,
+    "description": 1,
+    "missions": 1,
+    "profil_recherche": 1,
+}
+
+MOTS_VIDES = [
+    "a", "au", "aux", "avec", "ce", "ces", "dans", "de", "des", "du", "elle", "en", "et",
+    "etre", "il", "ils", "je", "la", "le", "les", "leur", "lui", "ma", "mais", "me", "mes",
+    "moi", "mon", "ne", "nos", "notre", "nous", "on", "ou", "par", "pas", "pour", "qu",
+    "que", "qui", "sa", "se", "ses", "son", "sur", "ta", "te", "tes", "toi", "ton", "tu",
+    "un", "une", "vos", "votre", "vous", "est", "sont", "plus", "tout", "tous", "nbsp",
+    "the", "and", "of", "to", "in", "for", "with",
+]
+
+MAX_FEATURES = 50000
+MAX_DELTA = 500             # lignes ajoutées avant fusion dans la matrice principale
+MAX_INACTIFS_RATIO = 0.2    # compaction au-delà de 20% de lignes désactivées
+MAX_RECOMMANDATIONS = 50
+MIN_AJOUTS_RECONSTRUCTION = 50
+RATTRAPAGE = 60  # secondes
+
+FICHIER_VECTORISEUR = "vectoriseur.joblib"
+FICHIER_MATRICE = "matrice.npz"
+FICHIER_IDS = "offres.npy"
+
+logger = logging.getLogger(__name__)
+
+
+class MoteurIndisponible(Exception):
+    """Aucune matrice encore chargée dans le processus (jamais construite ou chargement en cours)."""
+
+
+def texte_offre(champs):
+    return " ".join(
+        " ".join([champs.get(nom) or ""] * poids) for nom, poids in CHAMPS_PONDERES.items()
+    )
+
+
+def creer_vectoriseur(n_offres):
+    """TfidfVectorizer (non entraîné) commun aux recommandations et aux offres similaires."""
+    return TfidfVectorizer(
+        preprocessor=normaliser,
+        stop_words=MOTS_VIDES,
+        sublinear_tf=True,
+        # termes présents dans presque toutes les offres: peu discriminants (petit catalogue: tout garder)
+        max_df=0.8 if n_offres >= 10 else 1.0,
+        max_features=MAX_FEATURES,
+        dtype=np.float32,
+    )
+
+
+def _dossier():
+    return getattr(settings, "RECOMMANDATION_DIR", os.path.join(settings.BASE_DIR, "var", "recommandation"))
+
+
+class MoteurRecommandation:
+    def __init__(self, vectoriseur, matrice, offre_ids):
+        self._lock = threading.RLock()
+        self.vectoriseur = vectoriseur
+        self.matrice = matrice.tocsr()                        # (n_offres, vocabulaire)
+        self.offre_ids = np.asarray(offre_ids, dtype=np.int64)
+        self.actifs = np.ones(len(self.offre_ids), dtype=bool)
+        self.delta = sparse.csr_matrix((0, self.matrice.shape[1]), dtype=self.matrice.dtype)
+        self.delta_ids = np.zeros(0, dtype=np.int64)
+        self.delta_actifs = np.zeros(0, dtype=bool)
+        self.lignes = {int(o): ("m", i) for i, o in enumerate(self.offre_ids)}  # id -> (matrice, ligne)
+        self.ajouts = 0  # lignes vectorisées avec un vocabulaire figé depuis le chargement
+
+    def __len__(self):
+        return len(self.lignes)
+
+    # --- construction / persistance
+
+    @classmethod
+    def construire(cls):
+        docs = champs_texte_offres(Offre.objects.filter(est_visible=True))
+        offre_ids = sorted(docs)
+        vectoriseur = creer_vectoriseur(len(offre_ids))
+        try:
+            matrice = vectoriseur.fit_transform([texte_offre(docs[o]) for o in offre_ids])
+        except ValueError:
+            # catalogue vide (ou sans aucun terme): vocabulaire minimal, moteur vide mais utilisable
+            offre_ids = []
+            vectoriseur.fit(["offre"])
+            matrice = sparse.csr_matrix((0, len(vectoriseur.vocabulary_)), dtype=np.float32)
+        return cls(vectoriseur, matrice, offre_ids)
+
+    def sauvegarder(self, dossier=None):
+        """Écrit vectoriseur, matrice et ids (fichiers temporaires puis os.replace)."""
+        dossier = dossier or _dossier()
+        os.makedirs(dossier, exist_ok=True)
+        with self._lock:
+            self._fusionner(compacter=True)
+            elements = [
+                (FICHIER_VECTORISEUR, lambda f: joblib.dump(self.vectoriseur, f)),
+                (FICHIER_MATRICE, lambda f: sparse.save_npz(f, self.matrice)),
+                (FICHIER_IDS, lambda f: np.save(f, self.offre_ids)),
+            ]
+            for nom, ecrire in elements:
+                tmp = os.path.join(dossier, f".{nom}.tmp")
+                with open(tmp, "wb") as f:
+                    ecrire(f)
+                os.replace(tmp, os.path.join(dossier, nom))
+
+    @classmethod
+    def charger(cls, dossier=None):
+        dossier = dossier or _dossier()
+        vectoriseur = joblib.load(os.path.join(dossier, FICHIER_VECTORISEUR))
+        matrice = sparse.load_npz(os.path.join(dossier, FICHIER_MATRICE))
+        offre_ids = np.load(os.path.join(dossier, FICHIER_IDS))
+        return cls(vectoriseur, matrice, offre_ids)
+
+    # --- mise à jour incrémentale
+
+    def rattraper(self):
+        """Aligne l'ensemble des offres sur est_visible (textes modifiés: à la prochaine reconstruction)."""
+        visibles = set(Offre.objects.filter(est_visible=True).values_list("pk", flat=True))
+        with self._lock:
+            connus = set(self.lignes)
+        nouveaux = visibles - connus
+        docs = champs_texte_offres(Offre.objects.filter(pk__in=nouveaux)) if nouveaux else {}
+        self.mettre_a_jour(docs, retirer_ids=connus - visibles)
+
+    def retirer(self, offre_id):
+        with self._lock:
+            emplacement = self.lignes.pop(offre_id, None)
+            if emplacement is None:
+                return
+            source, i = emplacement
+            (self.actifs if source == "m" else self.delta_actifs)[i] = False
+
+    def mettre_a_jour(self, docs, retirer_ids=()):
+        """docs: {offreId: champs} des offres visibles ; retirer_ids: offres à enlever d'abord."""
+        vecteurs = self.vectoriseur.transform([texte_offre(c) for c in docs.values()]) if docs else None
+        with self._lock:
+            for offre_id in (*retirer_ids, *docs):
+                self.retirer(offre_id)
+            if vecteurs is not None:
+                debut = len(self.delta_ids)
+                self.delta = sparse.vstack([self.delta, vecteurs], format="csr")
+                self.delta_ids = np.concatenate([self.delta_ids, np.fromiter(docs, dtype=np.int64)])
+                self.delta_actifs = np.concatenate([self.delta_actifs, np.ones(len(docs), dtype=bool)])
+                for i, offre_id in enumerate(docs):
+                    self.lignes[offre_id] = ("d", debut + i)
+                self.ajouts += len(docs)
+            inactifs = len(self.actifs) - len(self.lignes) + len(self.delta_ids)
+            if len(self.delta_ids) > MAX_DELTA or inactifs > MAX_INACTIFS_RATIO * max(len(self.actifs), 1):
+                self._fusionner(compacter=True)
+
+    def _fusionner(self, compacter=False):
+        """delta -> matrice principale ; compacter=True supprime les lignes désactivées."""
+        if len(self.delta_ids):
+            self.matrice = sparse.vstack([self.matrice, self.delta], format="csr")
+            self.offre_ids = np.concatenate([self.offre_ids, self.delta_ids])
+            self.actifs = np.concatenate([self.actifs, self.delta_actifs])
+            self.delta = sparse.csr_matrix((0, self.matrice.shape[1]), dtype=self.matrice.dtype)
+            self.delta_ids = np.zeros(0, dtype=np.int64)
+            self.delta_actifs = np.zeros(0, dtype=bool)
+        if compacter and not self.actifs.all():
+            self.matrice = self.matrice[self.actifs]
+            self.offre_ids = self.offre_ids[self.actifs]
+            self.actifs = np.ones(len(self.offre_ids), dtype=bool)
+        self.lignes = {int(o): ("m", i) for i, o in enumerate(self.offre_ids) if self.actifs[i]}
+
+    def vocabulaire_perime(self):
+        """Vrai quand le vocabulaire a été appris sur moins de la moitié des offres actuelles."""
+        return self.ajouts > max(MIN_AJOUTS_RECONSTRUCTION, len(self.lignes) - self.ajouts)
+
+    # --- recommandation
+
+    def recommander(self, texte, k=10, exclure=()):
+        """[(offreId, cosinus)] des k offres les plus proches de `texte`, score décroissant."""
+        requete = self.vectoriseur.transform([texte])
+        if not requete.nnz:
+            return []
+        with self._lock:
+            scores = np.concatenate([
+                (self.matrice @ requete.T).toarray().ravel(),
+                (self.delta @ requete.T).toarray().ravel(),
+            ])
+            ids = np.concatenate([self.offre_ids, self.delta_ids])
+            actifs = np.concatenate([self.actifs, self.delta_actifs])
+
+        scores[~actifs] = 0.0
+        if len(exclure):
+            scores[np.isin(ids, list(exclure))] = 0.0
+        candidats = np.flatnonzero(scores > 0)
+        if len(candidats) > k:
+            candidats = candidats[np.argpartition(-scores[candidats], k - 1)[:k]]
+        ordre = candidats[np.lexsort((-ids[candidats], -scores[candidats]))]
+        return [(int(ids[i]), float(scores[i])) for i in ordre]
+
+
+# ==========================
+# Moteur du processus
+# ==========================
+_moteur = None
+_charge_mtime = None
+_verifie_a = 0.0
+_perime_signale = False
+_publication_lock = threading.Lock()
+_maintenance_lock = threading.Lock()  # une seule tâche de fond par processus
+
+
+def _mtime_disque():
+    try:
+        return os.stat(os.path.join(_dossier(), FICHIER_IDS)).st_mtime
+    except OSError:
+        return None
+
+
+def _publier(moteur, mtime):
+    """Publie un moteur qui vient d'être rattrapé."""
+    global _moteur, _charge_mtime, _verifie_a, _perime_signale
+    with _publication_lock:
+        _moteur = moteur
+        _charge_mtime = mtime
+        _verifie_a = time.monotonic()
+        _perime_signale = False
+
+
+def reconstruire():
+    """Reconstruction complète (vocabulaire compris), publication sur disque puis dans le processus."""
+    nouveau = MoteurRecommandation.construire()
+    nouveau.sauvegarder()
+    nouveau.rattraper()  # offres publiées / retirées pendant la construction
+    _publier(nouveau, _mtime_disque())
+    return nouveau
+
+
+def _maintenance_due():
+    mtime = _mtime_disque()
+    if mtime is not None and mtime != _charge_mtime:
+        return True
+    return _moteur is not None and time.monotonic() - _verifie_a > RATTRAPAGE
+
+
+def _maintenir():
+    """Tâche de fond: chargement d'une matrice plus récente ou rattrapage."""
+    global _verifie_a, _perime_signale
+    try:
+        mtime = _mtime_disque()
+        if mtime is not None and mtime != _charge_mtime:
+            nouveau = MoteurRecommandation.charger()
+            nouveau.rattraper()
+            _publier(nouveau, mtime)
+        elif _moteur is not None:
+            _moteur.rattraper()
+        if _moteur is not None and _moteur.vocabulaire_perime() and not _perime_signale:
+            _perime_signale = True
+            logger.warning("Vocabulaire des recommandations périmé: lancer `manage.py construire_recommandations`")
+    except Exception:
+        logger.exception("Maintenance du moteur de recommandation impossible")
+    finally:
+        _verifie_a = time.monotonic()
+        connections.close_all()  # connexions de ce thread
+        _maintenance_lock.release()
+
+
+def planifier_maintenance():
+    """Lance la maintenance en arrière-plan si elle est due et qu'aucune n'est en cours."""
+    if _maintenance_due() and _maintenance_lock.acquire(blocking=False):
+        try:
+            threading.Thread(target=_maintenir, name="recommandation", daemon=True).start()
+        except Exception:
+            _maintenance_lock.release()
+            raise
+
+
+def moteur():
+    """
+    Dernier moteur publié dans le processus ; la requête ne construit ni ne
+    recharge rien elle-même (MoteurIndisponible tant qu'aucun n'est prêt).
+    """
+    planifier_maintenance()
+    m = _moteur
+    if m is None:
+        raise MoteurIndisponible()
+    return m
+
+
+def recommander_offres(texte, k=10, exclure=()):
+    return moteur().recommander(texte, k=k, exclure=exclure)
+
+
+def _rafraichir(qs_offres, retirer_ids=()):
+    m = _moteur
+    if m is None:
+        return  # pas encore chargé: le chargement rattrape l'état publié
+    m.mettre_a_jour(champs_texte_offres(qs_offres), retirer_ids=retirer_ids)
+
+
+abonner(_rafraichir, actif=lambda: _moteur is not None)
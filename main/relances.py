@@ -0,0 +1,99 @@
+# main/relances.py
+"""
+Délai de ré-envoi d'un CV à une même offre (Offre.relance_days).
+
+EnvoiRelance garde une ligne par (cv, offre): date du dernier envoi et date
+à partir de laquelle un nouvel envoi est permis.
+
+- reserver_envois(): un seul INSERT ... ON CONFLICT DO UPDATE ... WHERE
+  prochain_envoi <= maintenant RETURNING pour toutes les offres ; seules les
+  offres renvoyées peuvent être envoyées. L'upsert verrouille la ligne
+  jusqu'au commit: deux requêtes concurrentes (envois groupés compris) ne
+  passent pas toutes les deux, et le coût ne dépend plus de l'historique
+- prochains_envois(): simple lecture par l'index unique (dry_run, validation)
+- suppression d'un envoi: la ligne est recalculée à partir des envois restants
+  (rien à faire quand la suppression vient d'un CV, d'une offre ou de leur
+  propriétaire: la ligne est supprimée avec eux, par cascade)
+"""
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import Max, QuerySet
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Envoi, EnvoiRelance, Offre
+
+
+def delai_relance(offre):
+    return timedelta(days=offre.relance_days or 7)
+
+
+def message_delai(allowed_at):
+    return (
+        f"Vous avez déjà envoyé ce CV à cette offre. "
+        f"Ré-envoi possible à partir du {allowed_at.strftime('%Y-%m-%d %H:%M')}."
+    )
+
+
+def prochains_envois(cv_id, offre_ids):
+    """{offre_id: date du prochain envoi permis} des offres dont le délai court encore (lecture seule)."""
+    return dict(
+        EnvoiRelance.objects
+        .filter(cv_id=cv_id, offre_id__in=offre_ids, prochain_envoi__gt=timezone.now())
+        .values_list("offre_id", "prochain_envoi")
+    )
+
+
+def reserver_envois(cv_id, offres):
+    """
+    Réserve l'envoi du CV aux offres dont le délai est écoulé (ou jamais envoyées).
+    Retourne {offre_id: date du prochain envoi permis} des offres refusées.
+    À appeler dans la transaction qui crée les Envoi.
+    """
+    if not offres:
+        return {}
+    table = EnvoiRelance._meta.db_table
+    maintenant = timezone.now()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (cv_id, offre_id, dernier_envoi, prochain_envoi)
+            SELECT %s, v.offre_id, %s, %s + v.jours * interval '1 day'
+            FROM unnest(%s::integer[], %s::integer[]) AS v(offre_id, jours)
+            ON CONFLICT (cv_id, offre_id) DO UPDATE
+                SET dernier_envoi = EXCLUDED.dernier_envoi, prochain_envoi = EXCLUDED.prochain_envoi
+                WHERE {table}.prochain_envoi <= EXCLUDED.dernier_envoi
+            RETURNING offre_id
+            """,
+            [
+                cv_id, maintenant, maintenant,
+                [o.pk for o in offres], [delai_relance(o).days for o in offres],
+            ],
+        )
+        reservees = {offre_id for (offre_id,) in cursor.fetchall()}
+
+    refusees = [o.pk for o in offres if o.pk not in reservees]
+    if not refusees:
+        return {}
+    return dict(
+        EnvoiRelance.objects.filter(cv_id=cv_id, offre_id__in=refusees).values_list("offre_id", "prochain_envoi")
+    )
+
+
+def _suppression_d_envois(origin):
+    return origin is None or isinstance(origin, Envoi) or (isinstance(origin, QuerySet) and origin.model is Envoi)
+
+
+@receiver(post_delete, sender=Envoi)
+def envoi_supprime(sender, instance, origin=None, **kwargs):
+    if not _suppression_d_envois(origin):
+        return  # cascade depuis le CV / l'offre: EnvoiRelance supprimée aussi
+    dernier = Envoi.objects.filter(cv_id=instance.cv_id, offre_id=instance.offre_id).aggregate(d=Max("dateEnvoi"))["d"]
+    relances = EnvoiRelance.objects.filter(cv_id=instance.cv_id, offre_id=instance.offre_id)
+    if dernier is None:
+        relances.delete()
+    else:
+        jours = Offre.objects.filter(pk=instance.offre_id).values_list("relance_days", flat=True).first()
+        relances.update(dernier_envoi=dernier, prochain_envoi=dernier + timedelta(days=jours or 7))
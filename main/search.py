@@ -0,0 +1,103 @@
+# main/search.py
+import unicodedata
+
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast, Coalesce
+
+SEARCH_CONFIG = "french"
+
+# champs texte de Offre qui alimentent search_vector
+OFFRE_CHAMPS_RECHERCHE = ("titre", "poste", "tags", "description", "missions", "profil_recherche")
+
+# filtre (query param) -> colonne normalisée indexée en trigrammes
+OFFRE_CHAMPS_NORMALISES = {
+    "domaine": "domaine_norm",
+    "specialite": "specialite_norm",
+    "ville": "ville_norm",
+    "pays": "pays_norm",
+}
+
+
+def normaliser(texte):
+    """Minuscules, sans accents ni espaces superflus: "Béjaïa " -> "bejaia"."""
+    if not texte:
+        return ""
+    decompose = unicodedata.normalize("NFKD", texte)
+    sans_accents = "".join(c for c in decompose if not unicodedata.combining(c))
+    return " ".join(sans_accents.casefold().split())
+
+
+def normaliser_tags(tags):
+    """Liste de tags normalisés sans doublons: "Django, REST,django" -> ["django", "rest"]."""
+    if not tags:
+        return []
+    return list(dict.fromkeys(t for t in (normaliser(x) for x in tags.split(",")) if t))
+
+
+def filtrer_champs_normalises(qs, params, fuzzy=False):
+    """
+    Filtres sous-chaîne insensibles aux accents/casse sur les colonnes *_norm
+    (index GIN pg_trgm). fuzzy=True tolère aussi les fautes de frappe.
+    """
+    for param, champ in OFFRE_CHAMPS_NORMALISES.items():
+        valeur = normaliser(params.get(param))
+        if not valeur:
+            continue
+        condition = Q(**{f"{champ}__contains": valeur})
+        if fuzzy:
+            condition |= Q(**{f"{champ}__trigram_word_similar": valeur})
+        qs = qs.filter(condition)
+    return qs
+
+
+def offre_search_vector():
+    """
+    Vecteur pondéré stocké dans Offre.search_vector:
+    A = titre/poste, B = tags, C = textes descriptifs.
+    """
+    return (
+        SearchVector("titre", "poste", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("tags", weight="B", config=SEARCH_CONFIG)
+        + SearchVector("description", "missions", "profil_recherche", weight="C", config=SEARCH_CONFIG)
+    )
+
+
+def cv_search_vector():
+    """Vecteur stocké dans CV.search_vector: texte extrait du fichier."""
+    return SearchVector("texte", config=SEARCH_CONFIG)
+
+
+RECHERCHE_ORDERING = ("-rank", "-dateCreation", "-pk")
+
+
+def requete_recherche(q):
+    """`q` accepte la syntaxe websearch: "mots exacts", OR, -exclure."""
+    return SearchQuery(q, config=SEARCH_CONFIG, search_type="websearch")
+
+
+def annoter_pertinence(qs, q):
+    """
+    Ajoute `rank` à des offres déjà filtrées sur search_vector (index GIN),
+    triées par pertinence.
+    """
+    # rank en double precision: valeur exacte réutilisable dans un curseur de pagination
+    qs = qs.annotate(rank=Cast(SearchRank(F("search_vector"), requete_recherche(q)), FloatField()))
+    return qs.order_by(*RECHERCHE_ORDERING)
+
+
+def annoter_extrait(qs, q, source=None):
+    """
+    Ajoute `extrait`: passages avec les termes entre <mark> (par défaut
+    description d'une offre, sinon l'expression `source`).
+    """
+    return qs.annotate(
+        extrait=SearchHeadline(
+            source or Coalesce("description", "missions", "titre"),
+            requete_recherche(q),
+            config=SEARCH_CONFIG,
+            start_sel="<mark>",
+            stop_sel="</mark>",
+            max_fragments=2,
+        )
+    )
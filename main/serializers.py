@@ -1,22 +1,26 @@
 # main/serializers.py
-from datetime import date, timedelta
+from datetime import date
 
-from django.utils import timezone
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError as DjangoValidationError
 
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
 
 from .models import (
     Utilisateur,
     Entreprise,
     CV,
     Envoi,
+    EnvoiEvent,
     Offre,
     Competence,
     Langue,
 )
+from .extraction import planifier_extraction
+from .evenements import journaliser
+from .jetons import RefreshToken
+from .relances import message_delai, prochains_envois, reserver_envois
 
 
 # ========================
@@ -95,10 +99,15 @@ class UtilisateurSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         validated_data.pop("password_confirm", None)
         password = validated_data.pop("password")
+        # déjà haché hors de la requête (inscription asynchrone, main/hachage.py)
+        password_hash = validated_data.pop("password_hash", None)
 
         # Utiliser le manager si tu veux (create_user), sinon ok:
         user = Utilisateur(**validated_data)
-        user.set_password(password)
+        if password_hash:
+            user.password = password_hash
+        else:
+            user.set_password(password)
         user.is_active = True
         user.save()
         return user
@@ -224,8 +233,13 @@ class CVSerializer(serializers.ModelSerializer):
             "dateCreation",
             "user_username",
             "taille_fichier",
+            "nb_pages",
+            "extraction_statut",
+        ]
+        read_only_fields = [
+            "cvId", "dateCreation", "user", "user_username", "fichier_url", "taille_fichier",
+            "nb_pages", "extraction_statut",
         ]
-        read_only_fields = ["cvId", "dateCreation", "user", "user_username", "fichier_url", "taille_fichier"]
         extra_kwargs = {
             "nom": {"required": True},
             "type": {"required": True},
@@ -279,13 +293,22 @@ class CVSerializer(serializers.ModelSerializer):
         request = self.context.get("request")
         if request and request.user.is_authenticated:
             validated_data["user"] = request.user
-        return super().create(validated_data)
+        cv = super().create(validated_data)
+        planifier_extraction(cv)
+        return cv
+
+    def update(self, instance, validated_data):
+        nouveau_fichier = "fichier" in validated_data or validated_data.get("type", instance.type) != instance.type
+        cv = super().update(instance, validated_data)
+        if nouveau_fichier:
+            planifier_extraction(cv)
+        return cv
 
 
 class CVListSerializer(serializers.ModelSerializer):
     class Meta:
         model = CV
-        fields = ["cvId", "nom", "type", "dateCreation"]
+        fields = ["cvId", "nom", "type", "dateCreation", "extraction_statut"]
         read_only_fields = fields
 
 
@@ -424,9 +447,11 @@ class OffreSerializer(serializers.ModelSerializer):
 
 
 class OffreListSerializer(serializers.ModelSerializer):
-    """Version légère pour listes."""
+    """Version légère pour listes (compétences/langues: prefetch attendu)."""
     entreprise_nom = serializers.CharField(source="entreprise.nomEntreprise", read_only=True)
     entreprise_id = serializers.IntegerField(source="entreprise.entrepriseId", read_only=True)
+    competences = serializers.SlugRelatedField(many=True, read_only=True, slug_field="nom")
+    langues = serializers.SlugRelatedField(many=True, read_only=True, slug_field="nom")
 
     class Meta:
         model = Offre
@@ -451,9 +476,20 @@ class OffreListSerializer(serializers.ModelSerializer):
             "estArchivee",
             "entreprise_id",
             "entreprise_nom",
+            "competences",
+            "langues",
         ]
         read_only_fields = fields
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # annotations présentes uniquement en mode recherche (q=...)
+        if hasattr(instance, "rank"):
+            data["rank"] = round(instance.rank, 4)
+        if hasattr(instance, "extrait"):
+            data["extrait"] = instance.extrait
+        return data
+
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     @classmethod
@@ -465,11 +501,14 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         return token
 
 
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    # liste noire consultée via le filtre du processus (main/jetons.py)
+    token_class = RefreshToken
+
+
 # ========================
 # Envoi (CV -> Offre)
 # ========================
-from datetime import timedelta
-from django.utils import timezone
 from rest_framework import serializers
 
 from .models import CV, Offre, Envoi
@@ -536,6 +575,10 @@ class EnvoiSerializer(serializers.ModelSerializer):
         return value
 
     def validate_offre(self, value):
+        if value.est_visible:
+            return value
+
+        # non visible: message précis
         if not value.recevoirCandidatures:
             raise serializers.ValidationError("Cette offre ne reçoit pas de candidatures (bouton désactivé).")
 
@@ -564,28 +607,29 @@ class EnvoiSerializer(serializers.ModelSerializer):
         if not cv or not offre:
             return data
 
-        delay_days = getattr(offre, "relance_days", 7) or 7
-
-        last = Envoi.objects.filter(cv=cv, offre=offre).order_by("-dateEnvoi").first()
-        if last:
-            allowed_at = last.dateEnvoi + timedelta(days=delay_days)
-            if timezone.now() < allowed_at:
-                raise serializers.ValidationError(
-                    f"Vous avez déjà envoyé ce CV à cette offre. "
-                    f"Ré-envoi possible à partir du {allowed_at.strftime('%Y-%m-%d %H:%M')}."
-                )
+        allowed_at = prochains_envois(cv.pk, [offre.pk]).get(offre.pk)
+        if allowed_at:
+            raise serializers.ValidationError(message_delai(allowed_at))
 
         return data
 
     def create(self, validated_data):
+        # réservation atomique du délai: un envoi concurrent validé en même temps est refusé ici
+        refusees = reserver_envois(validated_data["cv"].pk, [validated_data["offre"]])
+        if refusees:
+            raise serializers.ValidationError(message_delai(refusees[validated_data["offre"].pk]))
         validated_data["statut"] = "envoye"
-        return Envoi.objects.create(**validated_data)
+        envoi = Envoi.objects.create(**validated_data)
+        request = self.context.get("request")
+        journaliser([(envoi.pk, envoi.entreprise_id, None, envoi.statut)], auteur=request.user if request else None)
+        return envoi
 
 
 class EnvoiListSerializer(serializers.ModelSerializer):
     cv_nom = serializers.CharField(source="cv.nom", read_only=True)
-    offre_titre = serializers.CharField(source="offre.titre", read_only=True)
-    entreprise_nom = serializers.CharField(source="offre.entreprise.nomEntreprise", read_only=True)
+    # copies faites à l'envoi: la liste ne joint ni Offre ni Entreprise
+    offre_titre = serializers.CharField(source="offre_titre_snapshot", read_only=True)
+    entreprise_nom = serializers.CharField(source="entreprise_nom_snapshot", read_only=True)
     candidat_nom = serializers.SerializerMethodField()
 
     class Meta:
@@ -599,6 +643,15 @@ class EnvoiListSerializer(serializers.ModelSerializer):
             return f"{user.prenom} {user.nom}"
         return user.username
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # annotations présentes uniquement en recherche dans les CV (q=...)
+        if hasattr(instance, "rank"):
+            data["rank"] = round(instance.rank, 4)
+        if hasattr(instance, "extrait"):
+            data["extrait"] = instance.extrait
+        return data
+
 
 class EnvoiStatutSerializer(serializers.ModelSerializer):
     class Meta:
@@ -610,3 +663,23 @@ class EnvoiStatutSerializer(serializers.ModelSerializer):
         if value not in valid_statuts:
             raise serializers.ValidationError(f"Statut invalide. Choix : {', '.join(valid_statuts)}")
         return value
+
+    def update(self, instance, validated_data):
+        ancien = instance.statut
+        instance = super().update(instance, validated_data)
+        if instance.statut != ancien:
+            request = self.context.get("request")
+            journaliser(
+                [(instance.pk, instance.entreprise_id, ancien, instance.statut)],
+                auteur=request.user if request else None,
+            )
+        return instance
+
+
+class EnvoiEventSerializer(serializers.ModelSerializer):
+    statut_display = serializers.CharField(source="get_statut_display", read_only=True)
+
+    class Meta:
+        model = EnvoiEvent
+        fields = ["id", "ancien_statut", "statut", "statut_display", "auteur", "dateEvenement", "date_approximative"]
+        read_only_fields = fields
@@ -0,0 +1,74 @@
+# main/signaux_offres.py
+"""
+Changements du catalogue d'offres visibles, notifiés après commit aux
+structures tenues en mémoire par processus (index de recherche,
+recommandations, offres similaires).
+
+    abonner(rafraichir, actif=lambda: ...)
+
+`rafraichir(qs_visibles, retirer_ids)` reçoit les offres à (ré)indexer,
+déjà restreintes aux visibles, et les ids à retirer d'abord. `actif()`
+évite tout travail (et tout on_commit) tant que la structure n'existe pas.
+"""
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Entreprise, Offre, OFFRE_VISIBLE_SI_ENTREPRISE_ACTIVE
+
+_abonnes = []
+
+
+def abonner(rafraichir, actif=lambda: True):
+    _abonnes.append((rafraichir, actif))
+    return rafraichir
+
+
+def _notifier(offres_visibles, retirer_ids):
+    """offres_visibles: callable évalué après commit -> queryset des offres à indexer."""
+    abonnes = [rafraichir for rafraichir, actif in _abonnes if actif()]
+    if not abonnes:
+        return
+
+    def appliquer():
+        ids = retirer_ids() if callable(retirer_ids) else retirer_ids
+        qs = offres_visibles()
+        for rafraichir in abonnes:
+            rafraichir(qs, ids)
+
+    transaction.on_commit(appliquer)
+
+
+@receiver(post_save, sender=Offre)
+def offre_enregistree(sender, instance, **kwargs):
+    offre_id = instance.pk
+    _notifier(lambda: Offre.objects.filter(pk=offre_id, est_visible=True), [offre_id])
+
+
+@receiver(post_delete, sender=Offre)
+def offre_supprimee(sender, instance, **kwargs):
+    _notifier(Offre.objects.none, [instance.pk])
+
+
+@receiver(m2m_changed, sender=Offre.competences.through)
+def competences_modifiees(sender, instance, action, pk_set=None, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if isinstance(instance, Offre):
+        offre_ids = [instance.pk]
+    elif pk_set is not None:
+        offre_ids = list(pk_set)
+    else:
+        # competence.offre_set.clear(): liste lue avant suppression
+        offre_ids = list(instance.offre_set.values_list("pk", flat=True))
+    _notifier(lambda: Offre.objects.filter(pk__in=offre_ids, est_visible=True), offre_ids)
+
+
+@receiver(post_save, sender=Entreprise)
+def entreprise_enregistree(sender, instance, created, **kwargs):
+    # post_save précède synchroniser_visibilite_offres: on applique la règle directement
+    if created:
+        return
+    offres = Offre.objects.filter(entreprise_id=instance.pk)
+    visibles = offres.filter(OFFRE_VISIBLE_SI_ENTREPRISE_ACTIVE) if instance.recevoirCandidatures else offres.none()
+    _notifier(lambda: visibles, lambda: list(offres.values_list("pk", flat=True)))
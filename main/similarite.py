@@ -0,0 +1,371 @@
+# main/similarite.py
+"""
+Index des plus proches voisins des offres visibles (GET /offres/<pk>/similaires/).
+
+- vecteur d'une offre: texte TF-IDF réduit par SVD (DIMENSIONS_TEXTE) +
+  attributs one-hot (contrat, mode, niveau, domaine, ville), normalisé L2:
+  le produit scalaire est le cosinus
+- moins de SEUIL_IVF offres: recherche exacte (produit matrice-vecteur NumPy)
+- au-delà: partition k-means (IVF), seules les NPROBE listes dont le
+  centroïde est le plus proche sont parcourues
+- mise à jour incrémentale après commit (signaux_offres): ajout en fin de
+  tableau + affectation au centroïde le plus proche, retrait par masque ;
+  reconstruction quand trop de lignes sont retirées ou que le catalogue a
+  doublé (SVD/centroïdes appris sur un autre catalogue)
+- les publications / archivages des autres workers sont rattrapés toutes
+  les RATTRAPAGE secondes (une requête sur les ids visibles)
+- aucune construction pendant une requête: `manage.py construire_similaires`
+  (déploiement, cron) construit l'index et le publie dans SIMILARITE_DIR ;
+  chaque processus sert le dernier index chargé, et chargement, rattrapage
+  et reconstruction tournent dans un thread de fond (au plus un par
+  processus). Tant qu'aucun index n'est prêt: IndexIndisponible (503)
+
+Les ids trouvés sont refiltrés en base (est_visible).
+"""
+import logging
+import math
+import os
+import threading
+import time
+from itertools import chain
+
+import joblib
+import numpy as np
+from django.conf import settings
+from django.db import connections
+from scipy import sparse
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import TruncatedSVD
+
+from .filters import champs_texte_offres
+from .models import Offre
+from .recommandation import creer_vectoriseur, texte_offre
+from .signaux_offres import abonner
+
+ATTRIBUTS = ("type_contrat", "mode_travail", "niveau", "domaine_norm", "ville_norm")
+POIDS_ATTRIBUT = 0.3
+DIMENSIONS_TEXTE = 128
+SEUIL_IVF = 20000
+NPROBE = 12
+MAX_RETIRES_RATIO = 0.3
+RATTRAPAGE = 60  # secondes
+MAX_SIMILAIRES = 50
+MAX_ECHANTILLON_KMEANS = 25000
+FICHIER_INDEX = "index_voisins.joblib"
+
+logger = logging.getLogger(__name__)
+
+
+class IndexIndisponible(Exception):
+    """Aucun index encore chargé dans le processus (construction en cours)."""
+
+
+def documents_offres(qs):
+    """{offreId: champs texte + attributs} (3 requêtes)."""
+    docs = champs_texte_offres(qs)
+    for attributs in qs.values("offreId", *ATTRIBUTS):
+        if attributs["offreId"] in docs:
+            docs[attributs["offreId"]].update(attributs)
+    return docs
+
+
+def _normaliser_lignes(m):
+    normes = np.linalg.norm(m, axis=1, keepdims=True)
+    normes[normes == 0] = 1.0
+    return m / normes
+
+
+class IndexVoisins:
+    def __init__(self, vectoriseur, svd, colonnes):
+        self._lock = threading.RLock()
+        self.vectoriseur = vectoriseur
+        self.svd = svd                 # None: vocabulaire assez petit pour rester dense
+        self.colonnes = colonnes       # (attribut, valeur) -> colonne
+        dim_texte = svd.n_components if svd is not None else len(vectoriseur.vocabulary_)
+        self.dim_texte = dim_texte
+        self.dimension = dim_texte + len(colonnes)
+
+        self.vecteurs = np.zeros((0, self.dimension), dtype=np.float32)  # capacité >= n
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.actifs = np.zeros(0, dtype=bool)
+        self.n = 0
+        self.lignes = {}               # offreId -> ligne
+        self.n_construction = 0
+
+        self.centroides = None         # IVF: (n_listes, dimension)
+        self.listes = None             # IVF: lignes par centroïde
+
+    def __len__(self):
+        return len(self.lignes)
+
+    # --- construction
+
+    @classmethod
+    def construire(cls):
+        docs = documents_offres(Offre.objects.filter(est_visible=True))
+        ids = sorted(docs)
+        vectoriseur = creer_vectoriseur(len(ids))
+        try:
+            tfidf = vectoriseur.fit_transform([texte_offre(docs[i]) for i in ids])
+        except ValueError:
+            vectoriseur.fit(["offre"])  # catalogue vide ou sans terme
+            tfidf = sparse.csr_matrix((len(ids), len(vectoriseur.vocabulary_)), dtype=np.float32)
+
+        svd = None
+        if tfidf.shape[1] > DIMENSIONS_TEXTE:
+            svd = TruncatedSVD(DIMENSIONS_TEXTE, algorithm="randomized", random_state=0).fit(tfidf)
+
+        valeurs = sorted({(a, docs[i][a]) for i in ids for a in ATTRIBUTS if docs[i].get(a)})
+        index = cls(vectoriseur, svd, {av: j for j, av in enumerate(valeurs)})
+        index._ajouter(ids, index._vectoriser(tfidf, [docs[i] for i in ids]))
+        index.n_construction = len(ids)
+        if len(ids) >= SEUIL_IVF:
+            index._partitionner()
+        return index
+
+    def sauvegarder(self, dossier):
+        """Écrit l'index (fichier temporaire puis os.replace: les autres processus le rechargent)."""
+        os.makedirs(dossier, exist_ok=True)
+        tmp = os.path.join(dossier, f".{FICHIER_INDEX}.tmp")
+        with self._lock:
+            joblib.dump(self, tmp)
+        os.replace(tmp, os.path.join(dossier, FICHIER_INDEX))
+
+    @classmethod
+    def charger(cls, dossier):
+        return joblib.load(os.path.join(dossier, FICHIER_INDEX))
+
+    def __getstate__(self):
+        etat = self.__dict__.copy()
+        del etat["_lock"]
+        return etat
+
+    def __setstate__(self, etat):
+        self.__dict__.update(etat)
+        self._lock = threading.RLock()
+
+    def _vectoriser(self, tfidf, docs):
+        texte = self.svd.transform(tfidf) if self.svd is not None else tfidf.toarray()
+        attributs = np.zeros((len(docs), len(self.colonnes)), dtype=np.float32)
+        for ligne, doc in enumerate(docs):
+            for a in ATTRIBUTS:
+                j = self.colonnes.get((a, doc.get(a)))
+                if j is not None:
+                    attributs[ligne, j] = POIDS_ATTRIBUT
+        vecteurs = np.hstack([_normaliser_lignes(texte.astype(np.float32)), attributs])
+        return _normaliser_lignes(vecteurs).astype(np.float32)
+
+    def vectoriser(self, docs):
+        """docs: [champs] -> (len(docs), dimension)."""
+        return self._vectoriser(self.vectoriseur.transform([texte_offre(d) for d in docs]), docs)
+
+    def _partitionner(self):
+        """k-means (appris sur un échantillon) des lignes actives: ~2·sqrt(n) listes."""
+        with self._lock:
+            lignes = np.flatnonzero(self.actifs[:self.n])
+            n_listes = max(1, min(int(2 * math.sqrt(len(lignes))), len(lignes)))
+            echantillon = lignes
+            if len(lignes) > MAX_ECHANTILLON_KMEANS:
+                echantillon = np.random.default_rng(0).choice(lignes, MAX_ECHANTILLON_KMEANS, replace=False)
+            kmeans = MiniBatchKMeans(n_clusters=n_listes, n_init=1, batch_size=4096, random_state=0)
+            kmeans.fit(self.vecteurs[echantillon])
+            self.centroides = _normaliser_lignes(kmeans.cluster_centers_).astype(np.float32)
+            affectations = kmeans.predict(self.vecteurs[lignes])
+            self.listes = [[] for _ in range(n_listes)]
+            for ligne, liste in zip(lignes.tolist(), affectations.tolist()):
+                self.listes[liste].append(ligne)
+
+    # --- mise à jour incrémentale
+
+    def _ajouter(self, ids, vecteurs):
+        with self._lock:
+            for offre_id in ids:
+                self.retirer(offre_id)
+            fin = self.n + len(ids)
+            if fin > len(self.vecteurs):
+                capacite = max(fin, 2 * len(self.vecteurs), 64)
+                self.vecteurs = np.resize(self.vecteurs, (capacite, self.dimension))
+                self.ids = np.resize(self.ids, capacite)
+                self.actifs = np.resize(self.actifs, capacite)
+            self.vecteurs[self.n:fin] = vecteurs
+            self.ids[self.n:fin] = ids
+            self.actifs[self.n:fin] = True
+            if self.centroides is not None:
+                for ligne, liste in zip(range(self.n, fin), np.argmax(vecteurs @ self.centroides.T, axis=1).tolist()):
+                    self.listes[liste].append(ligne)
+            for ligne, offre_id in enumerate(ids, start=self.n):
+                self.lignes[int(offre_id)] = ligne
+            self.n = fin
+
+    def mettre_a_jour(self, docs, retirer_ids=()):
+        """docs: {offreId: champs} des offres visibles ; retirer_ids: offres à enlever d'abord."""
+        vecteurs = self.vectoriser(list(docs.values())) if docs else None
+        with self._lock:
+            for offre_id in retirer_ids:
+                self.retirer(offre_id)
+            if vecteurs is not None:
+                self._ajouter(list(docs), vecteurs)
+
+    def retirer(self, offre_id):
+        with self._lock:
+            ligne = self.lignes.pop(offre_id, None)
+            if ligne is not None:
+                self.actifs[ligne] = False
+
+    def rattraper(self):
+        """Aligne l'ensemble des offres sur est_visible (écritures des autres workers)."""
+        visibles = set(Offre.objects.filter(est_visible=True).values_list("pk", flat=True))
+        with self._lock:
+            connus = set(self.lignes)
+        nouveaux = visibles - connus
+        docs = documents_offres(Offre.objects.filter(pk__in=nouveaux)) if nouveaux else {}
+        self.mettre_a_jour(docs, retirer_ids=connus - visibles)
+
+    def a_reconstruire(self):
+        retires = self.n - len(self.lignes)
+        return (
+            retires > MAX_RETIRES_RATIO * max(self.n, 1)
+            or len(self.lignes) > 2 * max(self.n_construction, SEUIL_IVF // 20)
+            or (self.centroides is None and len(self.lignes) >= SEUIL_IVF)
+        )
+
+    # --- recherche
+
+    def voisins(self, vecteur, k=10, exclure=None):
+        """[(offreId, cosinus)] des k offres les plus proches de `vecteur`."""
+        with self._lock:
+            if self.centroides is None:
+                candidats = slice(0, self.n)
+            else:
+                nprobe = min(NPROBE, len(self.centroides))
+                proches = np.argpartition(-(self.centroides @ vecteur), nprobe - 1)[:nprobe]
+                candidats = np.fromiter(chain.from_iterable(self.listes[c] for c in proches), dtype=np.int64)
+            scores = self.vecteurs[candidats] @ vecteur
+            ids = self.ids[candidats]
+            masque = ~self.actifs[candidats]
+
+        masque |= ~(scores > 0)
+        if exclure is not None:
+            masque |= ids == exclure
+        scores[masque] = -np.inf
+        k = min(k, int((~masque).sum()))
+        if k <= 0:
+            return []
+        meilleurs = np.argpartition(-scores, k - 1)[:k]
+        meilleurs = meilleurs[np.lexsort((-ids[meilleurs], -scores[meilleurs]))]
+        return [(int(ids[i]), float(scores[i])) for i in meilleurs]
+
+    def similaires(self, offre, k=10):
+        """Voisins d'une offre: son vecteur indexé, sinon calculé (offre non visible)."""
+        with self._lock:
+            ligne = self.lignes.get(offre.pk)
+            vecteur = self.vecteurs[ligne].copy() if ligne is not None else None
+        if vecteur is None:
+            docs = documents_offres(Offre.objects.filter(pk=offre.pk))
+            if not docs:
+                return []
+            vecteur = self.vectoriser([docs[offre.pk]])[0]
+        return self.voisins(vecteur, k=k, exclure=offre.pk)
+
+
+# ==========================
+# Index du processus
+# ==========================
+_index = None
+_charge_mtime = None
+_verifie_a = 0.0
+_publication_lock = threading.Lock()
+_maintenance_lock = threading.Lock()  # une seule tâche de fond par processus
+
+
+def _dossier():
+    return getattr(settings, "SIMILARITE_DIR", os.path.join(settings.BASE_DIR, "var", "similarite"))
+
+
+def _mtime_disque():
+    try:
+        return os.stat(os.path.join(_dossier(), FICHIER_INDEX)).st_mtime
+    except OSError:
+        return None
+
+
+def _publier(index, mtime):
+    global _index, _charge_mtime
+    with _publication_lock:
+        _index = index
+        _charge_mtime = mtime
+
+
+def reconstruire():
+    """Construction complète (SVD, k-means), publication sur disque puis dans le processus."""
+    index = IndexVoisins.construire()
+    index.sauvegarder(_dossier())
+    index.rattraper()  # offres publiées / retirées pendant la construction
+    _publier(index, _mtime_disque())
+    return index
+
+
+def _maintenance_due():
+    mtime = _mtime_disque()
+    if mtime is not None and mtime != _charge_mtime:
+        return True
+    if _index is None or _index.a_reconstruire():
+        return True
+    return time.monotonic() - _verifie_a > RATTRAPAGE
+
+
+def _maintenir():
+    """Tâche de fond: chargement d'un index plus récent, reconstruction ou rattrapage."""
+    global _verifie_a
+    try:
+        mtime = _mtime_disque()
+        if mtime is not None and mtime != _charge_mtime:
+            index = IndexVoisins.charger(_dossier())
+            index.rattraper()
+            _publier(index, mtime)
+        elif _index is None or _index.a_reconstruire():
+            reconstruire()
+        else:
+            _index.rattraper()
+    except Exception:
+        logger.exception("Maintenance de l'index des offres similaires impossible")
+    finally:
+        _verifie_a = time.monotonic()
+        connections.close_all()  # connexions de ce thread
+        _maintenance_lock.release()
+
+
+def planifier_maintenance():
+    """Lance la maintenance en arrière-plan si elle est due et qu'aucune n'est en cours."""
+    if _maintenance_due() and _maintenance_lock.acquire(blocking=False):
+        try:
+            threading.Thread(target=_maintenir, name="similarite", daemon=True).start()
+        except Exception:
+            _maintenance_lock.release()
+            raise
+
+
+def index_voisins():
+    """
+    Dernier index publié dans le processus ; la requête ne construit ni ne
+    recharge rien elle-même (IndexIndisponible tant qu'aucun n'est prêt).
+    """
+    planifier_maintenance()
+    index = _index
+    if index is None:
+        raise IndexIndisponible()
+    return index
+
+
+def offres_similaires(offre, k=10):
+    return index_voisins().similaires(offre, k=k)
+
+
+def _rafraichir(qs_offres, retirer_ids=()):
+    index = _index
+    if index is None:
+        return  # pas encore chargé: le chargement rattrape l'état publié
+    index.mettre_a_jour(documents_offres(qs_offres), retirer_ids=retirer_ids)
+
+
+abonner(_rafraichir, actif=lambda: _index is not None)
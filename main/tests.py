@@ -1,3 +1,709 @@
-from django.test import TestCase
+import asyncio
+import time
+from datetime import datetime, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache, caches
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken
+
+from backend import cache as cache_deux_niveaux
+from backend.cache import CacheDeuxNiveaux
+
+from . import index_memoire, recommandation
+from .authentication import CachedJWTAuthentication, version_utilisateur
+from .cache_catalogue import CLE_VERSION, invalider_catalogue, version_catalogue
+from .filters import filtrer_envois, filtrer_offres
+from .index_memoire import IndexInverse, classer_par_index
+from .hachage import PoolHachage
+from .jetons import ListeNoire
+from .recommandation import MoteurIndisponible, MoteurRecommandation, creer_vectoriseur, texte_offre
+from .models import CV, Competence, Envoi, EnvoiEvent, EnvoiRelance, Offre, Utilisateur
+from .relances import message_delai, reserver_envois
+
+
+def creer_entreprise(username="acme"):
+    return Utilisateur.objects.create_user(username, f"{username}@exemple.dz", "x", type="entreprise")
+
+
+def creer_candidat(username="candidat"):
+    return Utilisateur.objects.create_user(username, f"{username}@exemple.dz", "x", type="candidat")
+
+
+def creer_cv(candidat):
+    return CV.objects.create(user=candidat, nom="CV", type="cv", fichier="cvs/cv.pdf")
+
+
+def client_api(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def creer_offre(entreprise, titre="Développeur Django", **champs):
+    return Offre.objects.create(
+        entreprise=entreprise, titre=titre, domaine="Informatique", ville="Alger",
+        type_contrat="cdi", mode_travail="site", estPubliee=True, recevoirCandidatures=True, **champs,
+    )
+
+
+# ==========================
+# Index inversé en mémoire
+# ==========================
+class IndexInverseTests(SimpleTestCase):
+    def setUp(self):
+        self.index = IndexInverse()
+        for i in range(1, 6):
+            self.index.ajouter(i, {"titre": "développeur python", "description": "python " * i})
+
+    def test_classement_bm25(self):
+        ids = [doc_id for doc_id, _ in self.index.rechercher("python")]
+        self.assertEqual(ids, [5, 4, 3, 2, 1])
+
+    def test_limite(self):
+        self.assertEqual(len(self.index.rechercher("python", limite=3)), 3)
+
+    def test_prefixe(self):
+        self.assertEqual(len(self.index.rechercher("dev*")), 5)
+        self.assertEqual(self.index.rechercher("java"), [])
+
+    def test_classer_par_index_signale_la_troncature(self):
+        with mock.patch.object(index_memoire, "MAX_RESULTATS", 3):
+            _, tronque = classer_par_index(Offre.objects.all(), "python", self.index)
+            self.assertTrue(tronque)
+            _, tronque = classer_par_index(Offre.objects.all(), "python développeur", self.index)
+            self.assertTrue(tronque)
+        _, tronque = classer_par_index(Offre.objects.all(), "python", self.index)
+        self.assertFalse(tronque)
+
+    def test_index_perime_servi_pendant_la_reconstruction(self):
+        with mock.patch.object(index_memoire, "_index", self.index), \
+                mock.patch.object(index_memoire, "_construit_a", 0.0), \
+                mock.patch.object(index_memoire.threading, "Thread") as thread, \
+                mock.patch.object(index_memoire, "construire_index") as construire:
+            self.assertIs(index_memoire.index_offres(), self.index)
+            self.assertIs(index_memoire.index_offres(), self.index)  # construction déjà en cours
+            index_memoire._maintenance_lock.release()  # pris pour le thread (simulé)
+        thread.assert_called_once()
+        self.assertIs(thread.call_args.kwargs["target"], index_memoire._reconstruire)
+        construire.assert_not_called()
+
+
+# ==========================
+# Recommandations (TF-IDF)
+# ==========================
+class RecommandationTests(SimpleTestCase):
+    def setUp(self):
+        offres = {
+            1: {"titre": "Développeur Python", "description": "Django API REST PostgreSQL"},
+            2: {"titre": "Comptable", "description": "Bilan fiscalité paie"},
+            3: {"titre": "Développeur Java", "description": "Spring API REST"},
+            4: {"titre": "Data engineer Python", "description": "Spark Airflow"},
+        }
+        vectoriseur = creer_vectoriseur(len(offres))
+        matrice = vectoriseur.fit_transform([texte_offre(c) for c in offres.values()])
+        self.moteur = MoteurRecommandation(vectoriseur, matrice, list(offres))
+
+    def test_classement(self):
+        resultats = self.moteur.recommander("Développeur Python Django API REST")
+        self.assertEqual([offre_id for offre_id, _ in resultats], [1, 3, 4])
+        scores = [score for _, score in resultats]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_k_et_exclusions(self):
+        self.assertEqual(self.moteur.recommander("Développeur Python Django API REST", k=1)[0][0], 1)
+        resultats = self.moteur.recommander("Développeur Python Django API REST", exclure={1})
+        self.assertEqual([offre_id for offre_id, _ in resultats], [3, 4])
+
+    def test_offre_retiree(self):
+        self.moteur.retirer(1)
+        self.assertNotIn(1, [o for o, _ in self.moteur.recommander("Développeur Python Django")])
+
+    def test_aucune_construction_pendant_la_requete(self):
+        with mock.patch.object(recommandation, "_moteur", None), \
+                mock.patch.object(recommandation, "planifier_maintenance") as planifier, \
+                mock.patch.object(MoteurRecommandation, "construire") as construire:
+            with self.assertRaises(MoteurIndisponible):
+                recommandation.recommander_offres("Python")
+        planifier.assert_called_once()
+        construire.assert_not_called()
+
+
+# ==========================
+# Filtres d'offres
+# ==========================
+class FiltreCompetencesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        entreprise = creer_entreprise().entreprise
+        cls.python = Competence.objects.create(nom="Python")
+        cls.sql = Competence.objects.create(nom="SQL")
+        cls.complete = creer_offre(entreprise, "Backend")
+        cls.complete.competences.add(cls.python, cls.sql)
+        cls.partielle = creer_offre(entreprise, "Données")
+        cls.partielle.competences.add(cls.sql)
+
+    def filtrer(self, competences, mode=None):
+        params = {"competences": competences}
+        if mode:
+            params["competences_mode"] = mode
+        return set(filtrer_offres(params).values_list("pk", flat=True))
+
+    def test_any(self):
+        self.assertEqual(self.filtrer("python,sql"), {self.complete.pk, self.partielle.pk})
+
+    def test_all(self):
+        self.assertEqual(self.filtrer(f"python,{self.sql.pk}", "all"), {self.complete.pk})
+
+    def test_all_meme_competence_par_id_et_par_nom(self):
+        self.assertEqual(self.filtrer(f"sql,{self.sql.pk}", "all"), {self.complete.pk, self.partielle.pk})
+
+    def test_all_nom_inconnu(self):
+        self.assertEqual(self.filtrer("python,cobol", "all"), set())
+
+
+# ==========================
+# Filtres de candidatures
+# ==========================
+class FiltreEnvoisTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.utilisateur = creer_entreprise()
+        offre = creer_offre(cls.utilisateur.entreprise)
+        amine = creer_candidat("amine")
+        Utilisateur.objects.filter(pk=amine.pk).update(prenom="Amine", nom="Benali")
+        autre = creer_candidat("autre")
+        Utilisateur.objects.filter(pk=autre.pk).update(prenom="Amine", nom="Saidi")
+        cls.minuit = Envoi.objects.create(cv=creer_cv(amine), offre=offre, statut="envoye")
+        cls.midi = Envoi.objects.create(cv=creer_cv(autre), offre=offre, statut="accepte")
+        cls.lendemain = Envoi.objects.create(cv=creer_cv(autre), offre=offre, statut="envoye")
+        jour = timezone.make_aware(datetime(2026, 10, 1))
+        for envoi, date in [(cls.minuit, jour), (cls.midi, jour + timedelta(hours=12)), (cls.lendemain, jour + timedelta(days=1))]:
+            Envoi.objects.filter(pk=envoi.pk).update(dateEnvoi=date)
+
+    def filtrer(self, **params):
+        return set(filtrer_envois(Envoi.objects.all(), params).values_list("pk", flat=True))
+
+    def test_statut_inconnu(self):
+        with self.assertRaises(ValidationError):
+            self.filtrer(statut="envoye,perdu")
+        reponse = client_api(self.utilisateur).get("/envois/", {"statut": "perdu"})
+        self.assertEqual(reponse.status_code, 400)
+
+    def test_statuts(self):
+        self.assertEqual(self.filtrer(statut="accepte"), {self.midi.pk})
+
+    def test_date_max_journee_entiere(self):
+        self.assertEqual(self.filtrer(date_max="2026-10-01"), {self.minuit.pk, self.midi.pk})
+
+    def test_date_max_date_heure_incluse(self):
+        self.assertEqual(self.filtrer(date_max="2026-10-01T12:00:00"), {self.minuit.pk, self.midi.pk})
+        self.assertEqual(self.filtrer(date_max="2026-10-01T11:59:59"), {self.minuit.pk})
+
+    def test_date_invalide(self):
+        for valeur in ["2026-13-45", "hier"]:
+            with self.assertRaises(ValidationError):
+                self.filtrer(date_max=valeur)
+
+    def test_candidat_plusieurs_mots(self):
+        self.assertEqual(self.filtrer(candidat="amine"), {self.minuit.pk, self.midi.pk, self.lendemain.pk})
+        self.assertEqual(self.filtrer(candidat="Amine  benali"), {self.minuit.pk})
+
+    def test_boite_de_reception_sans_jointure_offre(self):
+        with CaptureQueriesContext(connection) as requetes:
+            reponse = client_api(self.utilisateur).get("/envois/")
+        self.assertEqual(reponse.json()["count"], 3)
+        self.assertEqual(reponse.json()["envois"][0]["offre_titre"], "Développeur Django")
+        self.assertEqual(reponse.json()["envois"][0]["entreprise_nom"], self.utilisateur.entreprise.nomEntreprise)
+        liste = [q["sql"] for q in requetes.captured_queries if 'FROM "main_envoi"' in q["sql"]]
+        self.assertEqual(len(liste), 1)
+        self.assertNotIn('"main_offre"', liste[0])
+
+
+# ==========================
+# Version du catalogue (caches d'offres)
+# ==========================
+class VersionCatalogueTests(TestCase):
+    def setUp(self):
+        cache.delete(CLE_VERSION)  # cache partagé: copie éventuelle d'une autre base
+
+    def test_invalidation_incremente(self):
+        avant = version_catalogue()
+        invalider_catalogue()
+        invalider_catalogue()
+        self.assertEqual(version_catalogue(), avant + 2)
+
+    def test_version_evincee_relue_dans_la_sequence(self):
+        invalider_catalogue()
+        version = version_catalogue()
+        cache.delete(CLE_VERSION)
+        self.assertEqual(version_catalogue(), version)
+
+
+# ==========================
+# Liste noire des refresh tokens
+# ==========================
+class ListeNoireTests(TestCase):
+    def mettre_en_liste_noire(self, id, jti):
+        jeton = OutstandingToken.objects.create(
+            id=id, jti=jti, token=jti, expires_at=timezone.now() + timedelta(days=1)
+        )
+        BlacklistedToken.objects.create(id=id, token=jeton)
+
+    def test_ligne_commitee_apres_reconstruction(self):
+        self.mettre_en_liste_noire(900002, "jti-lu")
+        liste = ListeNoire()
+        liste.synchroniser(forcer=True)
+        # id inférieur au dernier lu, mais commité après la reconstruction
+        self.mettre_en_liste_noire(900001, "jti-tardif")
+        liste.synchroniser(forcer=True)
+        self.assertTrue(liste.peut_contenir("jti-lu"))
+        self.assertTrue(liste.peut_contenir("jti-tardif"))
+
+
+# ==========================
+# Authentification JWT (utilisateur en cache)
+# ==========================
+CACHES_TEST = {
+    "default": {
+        "BACKEND": "backend.cache.CacheDeuxNiveaux",
+        "LOCATION": "default",
+        "OPTIONS": {"L2": "partage"},
+    },
+    "partage": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "auth-tests"},
+}
+
+
+@override_settings(CACHES=CACHES_TEST)
+class AuthentificationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = creer_entreprise()
+
+    def setUp(self):
+        cache.clear()
+        self.auth = CachedJWTAuthentication()
+        self.jeton = AccessToken.for_user(self.user)
+
+    def authentifier(self):
+        return self.auth.get_user(self.jeton)
+
+    def test_servi_par_le_cache_sans_hash(self):
+        self.authentifier()
+        with self.assertNumQueries(0):
+            user = self.authentifier()
+        self.assertEqual(user.entreprise.nomEntreprise, self.user.entreprise.nomEntreprise)
+        self.assertIn("password", user.get_deferred_fields())
+        entree = cache.get(f"auth:utilisateur:{self.user.pk}:v{version_utilisateur(self.user.pk)}")
+        self.assertNotIn(self.user.password, repr(entree))
+
+    def test_enregistrement_invalide(self):
+        self.authentifier()
+        version = version_utilisateur(self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.nom = "Benali"
+            self.user.save()
+        self.assertNotEqual(version_utilisateur(self.user.pk), version)
+        self.assertEqual(self.authentifier().nom, "Benali")
+
+    def test_desactivation(self):
+        self.authentifier()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authentifier()
+
+    def test_modification_entreprise(self):
+        self.authentifier()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.entreprise.nomEntreprise = "Nouveau nom"
+            self.user.entreprise.save()
+        self.assertEqual(self.authentifier().entreprise.nomEntreprise, "Nouveau nom")
+
+    def test_enregistrement_depuis_le_cache_garde_le_mot_de_passe(self):
+        self.authentifier()
+        user = self.authentifier()
+        user.nom = "Benali"
+        user.save()
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password("x"))
+
+
+# ==========================
+# Requêtes conditionnelles (ETag)
+# ==========================
+class RequetesConditionnellesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.utilisateur = creer_entreprise()
+        cls.offre = creer_offre(cls.utilisateur.entreprise)
+
+    def setUp(self):
+        self.client = client_api(self.utilisateur)
+        self.url = f"/offres/{self.offre.pk}/"
+
+    def etag(self):
+        return self.client.get(self.url)["ETag"]
+
+    def test_if_none_match(self):
+        reponse = self.client.get(self.url, HTTP_IF_NONE_MATCH=self.etag())
+        self.assertEqual(reponse.status_code, 304)
+        self.assertEqual(reponse.content, b"")
+
+    def test_if_match_perime(self):
+        etag = self.etag()
+        self.assertEqual(self.client.patch(self.url, {"titre": "Premier"}, format="json", HTTP_IF_MATCH=etag).status_code, 200)
+        reponse = self.client.patch(self.url, {"titre": "Second"}, format="json", HTTP_IF_MATCH=etag)
+        self.assertEqual(reponse.status_code, 412)
+        self.offre.refresh_from_db()
+        self.assertEqual(self.offre.titre, "Premier")
+
+    def test_if_match_a_jour(self):
+        etag = self.etag()
+        reponse = self.client.patch(self.url, {"titre": "Nouveau"}, format="json", HTTP_IF_MATCH=etag)
+        self.assertEqual(reponse.status_code, 200)
+        self.assertNotEqual(reponse["ETag"], etag)
+        self.assertEqual(reponse["ETag"], self.etag())
+
+    def test_non_proprietaire_avant_precondition(self):
+        autre = client_api(creer_entreprise("autre"))
+        reponse = autre.patch(self.url, {"titre": "Pris"}, format="json", HTTP_IF_MATCH='"perime"')
+        self.assertEqual(reponse.status_code, 403)
+
+    def test_renommage_entreprise_change_l_etag_de_l_offre(self):
+        etag = self.etag()
+        reponse = self.client.patch(
+            f"/entreprises/{self.utilisateur.entreprise.pk}/", {"nomEntreprise": "Nouveau nom"}, format="json"
+        )
+        self.assertEqual(reponse.status_code, 200)
+        self.assertNotEqual(self.etag(), etag)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+# ==========================
+# Cache à deux niveaux
+# ==========================
+@override_settings(CACHES={**CACHES_TEST, "l2_test": {
+    "BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "l2-tests",
+}})
+class CacheDeuxNiveauxTests(SimpleTestCase):
+    def setUp(self):
+        caches["l2_test"].clear()
+
+    def creer(self, **options):
+        # état L1 partagé par nom de cache: un nom par test
+        return CacheDeuxNiveaux(self.id(), {"OPTIONS": {"L2": "l2_test", **options}})
+
+    def test_eviction_lru(self):
+        c = self.creer(L1_MAX_ENTRIES=2)
+        c.set("a", 1)
+        c.set("b", 2)
+        c.get("a")  # "a" devient la plus récente
+        c.set("c", 3)
+        self.assertEqual(c.statistiques()["l1_evictions"], 1)
+        self.assertEqual(c.statistiques()["l1_entrees"], 2)
+        self.assertEqual(c.get("a"), 1)
+        self.assertEqual(c.get("b"), 2)  # relue dans L2
+        self.assertEqual(c.statistiques()["l2_hits"], 1)
+
+    def test_expiration_l1(self):
+        c = self.creer(L1_TIMEOUT=5)
+        with mock.patch.object(cache_deux_niveaux, "time") as horloge:
+            horloge.time.side_effect = time.time
+            horloge.monotonic.return_value = 1000.0
+            c.set("cle", "ancienne")
+            caches["l2_test"].set("cle", "nouvelle")  # écrite par un autre worker
+            horloge.monotonic.return_value = 1004.0
+            self.assertEqual(c.get("cle"), "ancienne")
+            horloge.monotonic.return_value = 1006.0
+            self.assertEqual(c.get("cle"), "nouvelle")
+
+    def test_duree_l1(self):
+        c = self.creer(L1_TIMEOUT=5)
+        self.assertEqual(c._duree_l1(0), 0)
+        self.assertEqual(c._duree_l1(None), 5)
+        self.assertEqual(c._duree_l1(60), 5)
+        self.assertAlmostEqual(c._duree_l1(2), 2, delta=0.1)
+        c.set("jamais", 1, timeout=0)
+        self.assertEqual(c.statistiques()["l1_entrees"], 0)
+        c.set("permanent", 1, timeout=None)
+        self.assertEqual(c.statistiques()["l1_entrees"], 1)
+
+    def test_incr_et_delete_retirent_la_copie_l1(self):
+        c = self.creer()
+        c.set("n", 1)
+        self.assertEqual(c.get("n"), 1)
+        self.assertEqual(c.incr("n"), 2)
+        self.assertEqual(c.get("n"), 2)
+        c.delete("n")
+        self.assertIsNone(c.get("n"))
+
+    def test_statistiques(self):
+        c = self.creer()
+        c.get("absente")
+        caches["l2_test"].set("l2", "valeur")
+        c.get("l2")
+        c.get("l2")
+        stats = c.statistiques()
+        self.assertEqual(
+            {nom: stats[nom] for nom in ("l1_hits", "l1_misses", "l2_hits", "l2_misses", "l1_entrees")},
+            {"l1_hits": 1, "l1_misses": 2, "l2_hits": 1, "l2_misses": 1, "l1_entrees": 1},
+        )
+        self.assertEqual(stats["l2_backend"], "LocMemCache")
+
+
+# ==========================
+# Pool de hachage
+# ==========================
+class PoolHachageTests(SimpleTestCase):
+    def test_attente_annulee_quitte_la_file(self):
+        async def scenario():
+            pool = PoolHachage(1, 10)
+            en_cours = asyncio.ensure_future(pool.executer(time.sleep, 0.2))
+            await asyncio.sleep(0.05)
+            annulee = asyncio.ensure_future(pool.executer(time.sleep, 0.2))
+            await asyncio.sleep(0.01)
+            self.assertEqual((pool.en_attente, pool.en_cours), (1, 1))
+            annulee.cancel()
+            await en_cours
+            await asyncio.sleep(0.01)
+            return pool
+
+        pool = asyncio.run(scenario())
+        self.assertEqual((pool.en_attente, pool.en_cours), (0, 0))
+        self.assertEqual(pool.statistiques()["termines"], 1)
+
+
+# ==========================
+# Envoi groupé de candidatures
+# ==========================
+class EnvoiGroupeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.entreprise = creer_entreprise().entreprise
+        cls.offres = [creer_offre(cls.entreprise, f"Offre {i}") for i in range(3)]
+        cls.candidat = creer_candidat()
+        cls.cv = creer_cv(cls.candidat)
+
+    def setUp(self):
+        self.client = client_api(self.candidat)
+
+    def envoyer(self, offres, **extra):
+        corps = {"cv_id": self.cv.pk, "offre_ids": [o.pk for o in offres], **extra}
+        return self.client.post("/envois/", corps, format="json")
+
+    def test_envoi_groupe(self):
+        reponse = self.envoyer(self.offres)
+        self.assertEqual(reponse.status_code, 201)
+        self.assertEqual(reponse.json()["created_count"], 3)
+        self.assertEqual(
+            set(Envoi.objects.filter(cv=self.cv).values_list("offre_id", flat=True)),
+            {o.pk for o in self.offres},
+        )
+
+    def test_renvoi_pendant_le_delai(self):
+        self.envoyer(self.offres[:1])
+        corps = self.envoyer(self.offres[:2]).json()
+        self.assertEqual((corps["created_count"], corps["refused_count"]), (1, 1))
+        refus = corps["refusees"][0]
+        self.assertEqual(refus["offreId"], self.offres[0].pk)
+        allowed_at = EnvoiRelance.objects.get(cv=self.cv, offre=self.offres[0]).prochain_envoi
+        self.assertEqual(refus["errors"]["non_field_errors"], [message_delai(allowed_at)])
+
+    def test_dry_run(self):
+        self.envoyer(self.offres[:1])
+        reponse = self.envoyer(self.offres, dry_run=True)
+        self.assertEqual(reponse.status_code, 200)
+        corps = reponse.json()
+        self.assertTrue(corps["dry_run"])
+        self.assertEqual(corps["accepted_count"], 2)
+        self.assertEqual(corps["offres_acceptees"], [o.pk for o in self.offres[1:]])
+        self.assertEqual(corps["refused_count"], 1)
+        self.assertEqual(Envoi.objects.filter(cv=self.cv).count(), 1)
+
+
+# ==========================
+# Délai de ré-envoi (upsert conditionnel)
+# ==========================
+class ReservationEnvoiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.offre = creer_offre(creer_entreprise().entreprise, relance_days=3)
+        cls.cv = creer_cv(creer_candidat())
+
+    def envoyer(self):
+        refusees = reserver_envois(self.cv.pk, [self.offre])
+        if not refusees:
+            return Envoi.objects.create(cv=self.cv, offre=self.offre, statut="envoye")
+        return refusees
+
+    def test_seconde_reservation_refusee(self):
+        self.assertIsInstance(self.envoyer(), Envoi)
+        refusees = self.envoyer()
+        prochain = EnvoiRelance.objects.get(cv=self.cv, offre=self.offre).prochain_envoi
+        self.assertEqual(refusees, {self.offre.pk: prochain})
+        self.assertAlmostEqual(prochain - timezone.now(), timedelta(days=3), delta=timedelta(minutes=1))
+
+    def test_delai_ecoule(self):
+        self.envoyer()
+        EnvoiRelance.objects.filter(cv=self.cv).update(prochain_envoi=timezone.now() - timedelta(seconds=1))
+        self.assertIsInstance(self.envoyer(), Envoi)
+
+    def test_suppression_recalcule_depuis_les_envois_restants(self):
+        premier = self.envoyer()
+        Envoi.objects.filter(pk=premier.pk).update(dateEnvoi=timezone.now() - timedelta(days=10))
+        EnvoiRelance.objects.filter(cv=self.cv).update(prochain_envoi=timezone.now() - timedelta(seconds=1))
+        self.envoyer().delete()
+        prochain = EnvoiRelance.objects.get(cv=self.cv).prochain_envoi
+        self.assertAlmostEqual(prochain, timezone.now() - timedelta(days=7), delta=timedelta(minutes=1))
+
+    def test_suppression_du_cv_sans_recalcul(self):
+        for _ in range(3):
+            Envoi.objects.create(cv=self.cv, offre=self.offre, statut="envoye")
+        reserver_envois(self.cv.pk, [self.offre])
+        with CaptureQueriesContext(connection) as requetes:
+            self.cv.delete()
+        self.assertFalse([q for q in requetes.captured_queries if "MAX(" in q["sql"]])
+        self.assertFalse(EnvoiRelance.objects.filter(cv_id=self.cv.pk).exists())
+
+    def test_reessai_apres_suppression(self):
+        self.envoyer().delete()
+        self.assertFalse(EnvoiRelance.objects.filter(cv=self.cv).exists())
+        self.assertIsInstance(self.envoyer(), Envoi)
+
+
+# ==========================
+# Statut groupé (entreprise)
+# ==========================
+class EnvoiStatutGroupeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.utilisateur = creer_entreprise()
+        offre = creer_offre(cls.utilisateur.entreprise)
+        autre = creer_offre(creer_entreprise("autre").entreprise)
+        cv = creer_cv(creer_candidat())
+        cls.envoye = Envoi.objects.create(cv=cv, offre=offre, statut="envoye")
+        cls.refuse = Envoi.objects.create(cv=cv, offre=offre, statut="refuse")
+        cls.etranger = Envoi.objects.create(cv=cv, offre=autre, statut="envoye")
+
+    def test_resultat_par_id(self):
+        ids = [self.envoye.pk, self.refuse.pk, self.etranger.pk, 999999]
+        reponse = client_api(self.utilisateur).patch(
+            "/entreprise/envois/statut/", {"envoi_ids": ids, "statut": "refuse"}, format="json"
+        )
+        self.assertEqual(reponse.status_code, 200)
+        self.assertEqual(reponse.json()["modifies_count"], 1)
+        self.assertEqual(
+            [r["resultat"] for r in reponse.json()["resultats"]],
+            ["modifie", "inchange", "interdit", "introuvable"],
+        )
+        self.assertEqual(
+            dict(Envoi.objects.filter(pk__in=ids).values_list("pk", "statut")),
+            {self.envoye.pk: "refuse", self.refuse.pk: "refuse", self.etranger.pk: "envoye"},
+        )
+
+    def test_ids_invalides(self):
+        reponse = client_api(self.utilisateur).patch(
+            "/entreprise/envois/statut/",
+            {"envoi_ids": [self.envoye.pk, "abc", None, str(self.envoye.pk)], "statut": "refuse"},
+            format="json",
+        )
+        self.assertEqual(reponse.status_code, 200)
+        self.assertEqual(
+            reponse.json()["resultats"],
+            [
+                {"envoiId": self.envoye.pk, "resultat": "modifie"},
+                {"envoiId": "abc", "resultat": "invalide"},
+                {"envoiId": None, "resultat": "invalide"},
+            ],
+        )
+
+    def test_verrous_dans_l_ordre_des_pk(self):
+        ids = [self.refuse.pk, self.envoye.pk]
+        with CaptureQueriesContext(connection) as requetes:
+            client_api(self.utilisateur).patch(
+                "/entreprise/envois/statut/", {"envoi_ids": ids, "statut": "accepte"}, format="json"
+            )
+        verrou = next(q["sql"] for q in requetes.captured_queries if "FOR UPDATE" in q["sql"])
+        self.assertRegex(verrou, r"ORDER BY (1|\"main_envoi\"\.\"envoiId\") ASC FOR UPDATE")
+
+    def test_statut_invalide(self):
+        reponse = client_api(self.utilisateur).patch(
+            "/entreprise/envois/statut/", {"envoi_ids": [self.envoye.pk], "statut": "inconnu"}, format="json"
+        )
+        self.assertEqual(reponse.status_code, 400)
+
+
+# ==========================
+# Historique des statuts
+# ==========================
+class EnvoiHistoriqueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.candidat = creer_candidat()
+        cls.envoi = Envoi.objects.create(
+            cv=creer_cv(cls.candidat), offre=creer_offre(creer_entreprise().entreprise), statut="accepte"
+        )
+
+    def journal(self, date_approximative):
+        for ancien, statut in [(None, "envoye"), ("envoye", "accepte")]:
+            EnvoiEvent.objects.create(
+                envoi=self.envoi, entreprise_id=self.envoi.entreprise_id, ancien_statut=ancien, statut=statut,
+                dateEvenement=self.envoi.dateEnvoi + timedelta(hours=0 if ancien is None else 5),
+                date_approximative=date_approximative and ancien is not None,
+            )
+        return client_api(self.candidat).get(f"/envois/{self.envoi.pk}/historique/").json()
+
+    def test_delai_premiere_reponse(self):
+        self.assertEqual(self.journal(False)["delai_premiere_reponse"], 5 * 3600)
+
+    def test_reponse_datee_approximativement(self):
+        corps = self.journal(True)
+        self.assertIsNone(corps["delai_premiere_reponse"])
+        self.assertEqual([e["date_approximative"] for e in corps["evenements"]], [False, True])
+
+
+# ==========================
+# Idempotency-Key
+# ==========================
+class IdempotenceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.entreprise = creer_entreprise().entreprise
+        cls.offres = [creer_offre(cls.entreprise, f"Offre {i}") for i in range(2)]
+        cls.candidat = creer_candidat()
+        cls.cv = creer_cv(cls.candidat)
+
+    def setUp(self):
+        self.client = client_api(self.candidat)
+
+    def envoyer(self, corps, cle="cle-1"):
+        return self.client.post("/envois/", corps, format="json", HTTP_IDEMPOTENCY_KEY=cle)
+
+    def test_rejeu(self):
+        corps = {"cv_id": self.cv.pk, "offre_ids": [o.pk for o in self.offres]}
+        premiere = self.envoyer(corps)
+        self.assertEqual(premiere.status_code, 201)
+        rejeu = self.envoyer(corps)
+        self.assertEqual(rejeu.status_code, 201)
+        self.assertEqual(rejeu["Idempotent-Replayed"], "true")
+        self.assertEqual(rejeu.json(), premiere.json())
+        self.assertEqual(Envoi.objects.filter(cv=self.cv).count(), 2)
+
+    def test_meme_cle_autre_corps(self):
+        self.envoyer({"cv_id": self.cv.pk, "offre_ids": [self.offres[0].pk]})
+        reponse = self.envoyer({"cv_id": self.cv.pk, "offre_ids": [self.offres[1].pk]})
+        self.assertEqual(reponse.status_code, 422)
+        self.assertEqual(Envoi.objects.filter(cv=self.cv).count(), 1)
+
+    def test_corps_tableau(self):
+        reponse = self.envoyer([self.offres[0].pk])
+        self.assertEqual(reponse.status_code, 400)
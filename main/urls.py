@@ -2,7 +2,7 @@
 from django.urls import path
 from .views import (
     # Utilisateur
-    UtilisateurListCreate,
+    utilisateurs,
     UtilisateurDetail,
 
     # Entreprise
@@ -12,19 +12,29 @@ from .views import (
     # CV
     CVListCreate,
     CVDetail,
+    CVRecommandations,
 
     # Offres
     OffreList,
+    OffreFacettes,
+    OffreTags,
+    OffreHistogrammes,
     OffreEntrepriseListCreate,
     OffreDetail,
+    OffreSimilaires,
     OffreToggleRecevoir,
 
     # Envoi
     EnvoiListCreate,
     EnvoiDetail,
+    EnvoiHistorique,
+    EnvoiRechercheCV,
+    EnvoiStatutGroupe,
 
     # Statistiques
     DashboardStats,
+    CacheStats,
+    HachageStats,
 )
 
 app_name = "main"
@@ -33,7 +43,7 @@ urlpatterns = [
     # ==========================
     # Utilisateurs
     # ==========================
-    path("utilisateurs/", UtilisateurListCreate.as_view(), name="utilisateur-list-create"),
+    path("utilisateurs/", utilisateurs, name="utilisateur-list-create"),
     path("utilisateurs/<int:pk>/", UtilisateurDetail.as_view(), name="utilisateur-detail"),
 
     # ==========================
@@ -47,16 +57,26 @@ urlpatterns = [
     # ==========================
     path("cvs/", CVListCreate.as_view(), name="cv-list-create"),
     path("cvs/<int:pk>/", CVDetail.as_view(), name="cv-detail"),
+    # Offres recommandées pour un CV (similarité TF-IDF)
+    path("cvs/<int:pk>/recommandations/", CVRecommandations.as_view(), name="cv-recommandations"),
 
     # ==========================
     # Offres
     # ==========================
     # Public (candidats): listes + filtres query params
     path("offres/", OffreList.as_view(), name="offre-list"),
+    # Public: comptes par facette pour les filtres courants
+    path("offres/facettes/", OffreFacettes.as_view(), name="offre-facettes"),
+    # Public: nuage de tags avec comptes
+    path("offres/tags/", OffreTags.as_view(), name="offre-tags"),
+    # Public: histogrammes salaire / expérience
+    path("offres/histogrammes/", OffreHistogrammes.as_view(), name="offre-histogrammes"),
     # Entreprise: mes offres (GET) + créer (POST)
     path("entreprise/offres/", OffreEntrepriseListCreate.as_view(), name="offre-entreprise-list-create"),
     # Détails / update / archive
     path("offres/<int:pk>/", OffreDetail.as_view(), name="offre-detail"),
+    # Offres similaires (plus proches voisins)
+    path("offres/<int:pk>/similaires/", OffreSimilaires.as_view(), name="offre-similaires"),
     # Toggle bouton recevoir candidatures
     path("offres/<int:pk>/toggle-recevoir/", OffreToggleRecevoir.as_view(), name="offre-toggle-recevoir"),
 
@@ -65,10 +85,21 @@ urlpatterns = [
     # ==========================
     path("envois/", EnvoiListCreate.as_view(), name="envoi-list-create"),
     path("envois/<int:pk>/", EnvoiDetail.as_view(), name="envoi-detail"),
+    path("envois/<int:pk>/historique/", EnvoiHistorique.as_view(), name="envoi-historique"),
+    # Entreprise: recherche plein texte dans les CV des candidatures reçues
+    path("entreprise/envois/recherche/", EnvoiRechercheCV.as_view(), name="envoi-recherche-cv"),
+    path("entreprise/envois/statut/", EnvoiStatutGroupe.as_view(), name="envoi-statut-groupe"),
 
     # ==========================
     # Dashboard Stats
     # ==========================
     path("dashboard/stats/", DashboardStats.as_view(), name="dashboard-stats"),
+    path("auth/hachage/stats/", HachageStats.as_view(), name="hachage-stats"),
+
+    # ==========================
+    # Cache (admin)
+    # ==========================
+    # compteurs hits / misses par niveau
+    path("cache/stats/", CacheStats.as_view(), name="cache-stats"),
     
 ]
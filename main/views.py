@@ -1,16 +1,45 @@
 # main/views.py
+import json
+import os
+
+from asgiref.sync import sync_to_async
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from rest_framework.parsers import MultiPartParser, FormParser
-from rest_framework.exceptions import PermissionDenied, ValidationError
-from rest_framework_simplejwt.views import TokenObtainPairView
-
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
+from rest_framework.fields import Field
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.contrib.auth.models import update_last_login
+from django.core.cache import cache, caches
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404
-from django.db import IntegrityError
-from django.db.models import Q
-
-from .models import Utilisateur, Entreprise, CV, Envoi, Offre
+from django.db import IntegrityError, transaction
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from django.db.models import F, FloatField, Prefetch, Q
+from django.db.models.functions import Cast
+from django.contrib.postgres.search import SearchRank
+
+from .models import Utilisateur, Entreprise, CV, Envoi, EnvoiEvent, Offre, Competence, Langue
+from .cache_catalogue import cle_catalogue
+from .conditionnel import RequetesConditionnelles
+from .evenements import journaliser
+from .facettes import facettes_offres, histogrammes_offres, nuage_tags
+from .filters import cle_filtres, filtrer_envois, filtrer_offres, trier_par_salaire
+from .hachage import PoolSature, pool_hachage
+from .idempotence import RequetesIdempotentes
+from .index_memoire import MAX_RESULTATS, backend_actif as index_memoire_actif, classer_par_index, index_offres
+from .pagination import KeysetPagination
+from .recommandation import MAX_RECOMMANDATIONS, MoteurIndisponible, recommander_offres
+from .relances import message_delai, prochains_envois, reserver_envois
+from .similarite import MAX_SIMILAIRES, IndexIndisponible, offres_similaires
+from .search import RECHERCHE_ORDERING, annoter_extrait, annoter_pertinence, requete_recherche
 from .serializers import (
     UtilisateurSerializer,
     UtilisateurReadSerializer,
@@ -22,6 +51,7 @@ from .serializers import (
     EnvoiSerializer,
     EnvoiListSerializer,
     EnvoiStatutSerializer,
+    EnvoiEventSerializer,
     CustomTokenObtainPairSerializer,
 )
 
@@ -39,50 +69,49 @@ class IsCandidat(permissions.BasePermission):
         return request.user.is_authenticated and request.user.type == "candidat"
 
 
-class CustomTokenObtainPairView(TokenObtainPairView):
-    serializer_class = CustomTokenObtainPairSerializer
+def offres_classees(resultats, k):
+    """
+    [(offreId, score)] -> les k premières offres encore visibles en base, dans
+    l'ordre, avec `rank` = score (prêtes pour OffreListSerializer).
+    """
+    scores = dict(resultats)
+    offres = {
+        o.pk: o
+        for o in Offre.objects.filter(pk__in=scores, est_visible=True)
+        .select_related("entreprise")
+        .defer("search_vector")
+        .prefetch_related(
+            Prefetch("competences", queryset=Competence.objects.only("id", "nom")),
+            Prefetch("langues", queryset=Langue.objects.only("id", "nom")),
+        )
+    }
+    page = [offres[offre_id] for offre_id, _ in resultats if offre_id in offres][:k]
+    for offre in page:
+        offre.rank = scores[offre.pk]
+    return page
 
 
 # ==========================
 # Utilisateur APIView
 # ==========================
-class UtilisateurListCreate(APIView):
-    parser_classes = [MultiPartParser, FormParser]
-
-    def get_permissions(self):
-        if self.request.method == "GET":
-            return [permissions.IsAdminUser()]
-        return [permissions.AllowAny()]
+class UtilisateurList(APIView):
+    """GET (admin): liste des utilisateurs ; l'inscription (POST) est la vue asynchrone `utilisateurs`."""
+    permission_classes = [permissions.IsAdminUser]
 
     def get(self, request):
-        utilisateurs = Utilisateur.objects.all().order_by("-dateInscription")
-        serializer = UtilisateurReadSerializer(utilisateurs, many=True)
-        return Response({"count": utilisateurs.count(), "utilisateurs": serializer.data}, status=status.HTTP_200_OK)
+        utilisateurs = Utilisateur.objects.all()
 
-    def post(self, request):
-        serializer = UtilisateurSerializer(data=request.data, context={"request": request})
-        if serializer.is_valid():
-            try:
-                user = serializer.save()
-                return Response(
-                    {"message": "Inscription réussie", "user": UtilisateurReadSerializer(user).data},
-                    status=status.HTTP_201_CREATED,
-                )
-            except IntegrityError:
-                return Response(
-                    {"error": "Erreur d'intégrité", "details": "Username ou email déjà utilisé"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-            except Exception as e:
-                return Response(
-                    {"error": "Erreur création", "details": str(e)},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                )
+        if KeysetPagination.is_requested(request):
+            paginator = KeysetPagination(("-dateInscription", "-pk"))
+            page = paginator.paginate_queryset(utilisateurs, request)
+            serializer = UtilisateurReadSerializer(page, many=True)
+            return Response(paginator.get_response_data("utilisateurs", serializer.data), status=status.HTTP_200_OK)
 
-        return Response({"error": "Données invalides", "details": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = UtilisateurReadSerializer(utilisateurs.order_by("-dateInscription"), many=True)
+        return Response({"count": len(serializer.data), "utilisateurs": serializer.data}, status=status.HTTP_200_OK)
 
 
-class UtilisateurDetail(APIView):
+class UtilisateurDetail(RequetesConditionnelles, APIView):
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
 
@@ -92,12 +121,23 @@ class UtilisateurDetail(APIView):
             raise PermissionDenied("Vous ne pouvez accéder qu'à votre propre profil")
         return user
 
+    def queryset_version(self, request, pk):
+        if pk != request.user.pk and not request.user.is_staff:
+            return Utilisateur.objects.none()
+        return Utilisateur.objects.filter(pk=pk)
+
     def get(self, request, pk):
+        non_modifie = self.non_modifie(request, pk)
+        if non_modifie is not None:
+            return non_modifie
         user = self.get_object(pk, request)
         return Response(UtilisateurReadSerializer(user).data, status=status.HTTP_200_OK)
 
     def put(self, request, pk):
         user = self.get_object(pk, request)
+        echec = self.precondition_echouee(request, pk, user)
+        if echec is not None:
+            return echec
         serializer = UtilisateurSerializer(user, data=request.data, partial=False, context={"request": request})
         if serializer.is_valid():
             serializer.save()
@@ -109,6 +149,9 @@ class UtilisateurDetail(APIView):
 
     def patch(self, request, pk):
         user = self.get_object(pk, request)
+        echec = self.precondition_echouee(request, pk, user)
+        if echec is not None:
+            return echec
         serializer = UtilisateurSerializer(user, data=request.data, partial=True, context={"request": request})
         if serializer.is_valid():
             serializer.save()
@@ -125,6 +168,145 @@ class UtilisateurDetail(APIView):
         return Response({"message": "Compte désactivé"}, status=status.HTTP_200_OK)
 
 
+# ==========================
+# Connexion / inscription asynchrones (ASGI)
+# ==========================
+# Le hachage PBKDF2 part dans le pool borné de main/hachage.py: une rafale de
+# connexions n'immobilise plus le worker. Les accès base passent par des
+# blocs synchrones courts (ATOMIC_REQUESTS ne s'applique pas aux vues async).
+def _reponse_saturee():
+    reponse = JsonResponse(
+        {"error": "Service saturé", "details": "Trop de connexions simultanées, réessayez dans quelques secondes."},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+    reponse["Retry-After"] = "2"
+    return reponse
+
+
+def _lire_donnees(request, json_accepte=True):
+    """Corps de la requête (dict / QueryDict avec fichiers) ; None si le type n'est pas géré."""
+    if json_accepte and request.content_type == "application/json":
+        try:
+            donnees = json.loads(request.body or b"{}")
+        except ValueError:
+            return None
+        return donnees if isinstance(donnees, dict) else None
+    if request.content_type in ("multipart/form-data", "application/x-www-form-urlencoded"):
+        donnees = request.POST.copy()
+        donnees.update(request.FILES)
+        return donnees
+    return None
+
+
+def _emettre_jetons(user):
+    with transaction.atomic():
+        token = CustomTokenObtainPairSerializer.get_token(user)
+        if jwt_settings.UPDATE_LAST_LOGIN:
+            update_last_login(None, user)
+    return {"refresh": str(token), "access": str(token.access_token)}
+
+
+def _creer_utilisateur(serializer, password_hash):
+    with transaction.atomic():
+        return serializer.save(password_hash=password_hash)
+
+
+@csrf_exempt
+@require_POST
+@transaction.non_atomic_requests
+async def connexion(request):
+    """POST /api/accessToken/ : même contrat que TokenObtainPairView (CustomTokenObtainPairSerializer)."""
+    donnees = _lire_donnees(request)
+    if donnees is None:
+        return JsonResponse({"detail": "Corps de requête invalide (JSON ou formulaire attendu)."}, status=status.HTTP_400_BAD_REQUEST)
+    erreurs = {
+        champ: [str(Field.default_error_messages["required"])]
+        for champ in (Utilisateur.USERNAME_FIELD, "password")
+        if not donnees.get(champ)
+    }
+    if erreurs:
+        return JsonResponse(erreurs, status=status.HTTP_400_BAD_REQUEST)
+
+    password = donnees["password"]
+    user = await Utilisateur.objects.filter(**{Utilisateur.USERNAME_FIELD: donnees[Utilisateur.USERNAME_FIELD]}).afirst()
+    pool = pool_hachage()
+    try:
+        if user is None:
+            # même durée qu'un compte existant (cf. ModelBackend.authenticate)
+            await pool.executer(make_password, password)
+            valide = False
+        else:
+            a_rehacher = []
+            valide = await pool.executer(check_password, password, user.password, a_rehacher.append)
+            if valide and a_rehacher:
+                user.password = await pool.executer(make_password, password)
+                await user.asave(update_fields=["password"])
+    except PoolSature:
+        return _reponse_saturee()
+
+    if not valide or not jwt_settings.USER_AUTHENTICATION_RULE(user):
+        reponse = JsonResponse(
+            {"detail": str(CustomTokenObtainPairSerializer.default_error_messages["no_active_account"])},
+            status=status.HTTP_401_UNAUTHORIZED,
+        )
+        reponse["WWW-Authenticate"] = '%s realm="api"' % jwt_settings.AUTH_HEADER_TYPES[0]
+        return reponse
+
+    return JsonResponse(await sync_to_async(_emettre_jetons)(user), status=status.HTTP_200_OK)
+
+
+async def _inscription(request):
+    donnees = _lire_donnees(request, json_accepte=False)
+    if donnees is None:
+        return JsonResponse(
+            {"detail": f'Unsupported media type "{request.content_type}" in request.'},
+            status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        )
+    serializer = UtilisateurSerializer(data=donnees, context={"request": request})
+    if not await sync_to_async(serializer.is_valid)():
+        return JsonResponse({"error": "Données invalides", "details": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        password_hash = await pool_hachage().executer(make_password, serializer.validated_data["password"])
+    except PoolSature:
+        return _reponse_saturee()
+
+    try:
+        user = await sync_to_async(_creer_utilisateur)(serializer, password_hash)
+    except IntegrityError:
+        return JsonResponse(
+            {"error": "Erreur d'intégrité", "details": "Username ou email déjà utilisé"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    except Exception as e:
+        return JsonResponse({"error": "Erreur création", "details": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    return JsonResponse(
+        {"message": "Inscription réussie", "user": UtilisateurReadSerializer(user).data},
+        status=status.HTTP_201_CREATED,
+    )
+
+
+_utilisateur_list = UtilisateurList.as_view()
+
+
+@csrf_exempt
+@transaction.non_atomic_requests
+async def utilisateurs(request):
+    """POST: inscription asynchrone ; autres méthodes (liste admin): UtilisateurList."""
+    if request.method == "POST":
+        return await _inscription(request)
+    return await sync_to_async(transaction.atomic(_utilisateur_list))(request)
+
+
+class HachageStats(APIView):
+    """GET (admin): file et temps du pool de hachage des mots de passe, pour le worker qui répond."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response({"pid": os.getpid(), "hachage": pool_hachage().statistiques()}, status=status.HTTP_200_OK)
+
+
 # ==========================
 # Entreprise APIView
 # ==========================
@@ -136,10 +318,16 @@ class EntrepriseListCreate(APIView):
             Entreprise.objects
             .filter(recevoirCandidatures=True)
             .select_related("user")
-            .order_by("nomEntreprise")
         )
-        serializer = EntrepriseSerializer(entreprises, many=True, context={"request": request})
-        return Response({"count": entreprises.count(), "entreprises": serializer.data}, status=status.HTTP_200_OK)
+
+        if KeysetPagination.is_requested(request):
+            paginator = KeysetPagination(("nomEntreprise", "pk"))
+            page = paginator.paginate_queryset(entreprises, request)
+            serializer = EntrepriseSerializer(page, many=True, context={"request": request})
+            return Response(paginator.get_response_data("entreprises", serializer.data), status=status.HTTP_200_OK)
+
+        serializer = EntrepriseSerializer(entreprises.order_by("nomEntreprise"), many=True, context={"request": request})
+        return Response({"count": len(serializer.data), "entreprises": serializer.data}, status=status.HTTP_200_OK)
 
     def post(self, request):
         if request.user.type != "entreprise":
@@ -169,13 +357,21 @@ class EntrepriseListCreate(APIView):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class EntrepriseDetail(APIView):
+class EntrepriseDetail(RequetesConditionnelles, APIView):
     permission_classes = [permissions.IsAuthenticated]
+    # username / email du compte affichés
+    champs_version = ("dateModification", "user__dateModification")
 
     def get_object(self, pk):
         return get_object_or_404(Entreprise, pk=pk)
 
+    def queryset_version(self, request, pk):
+        return Entreprise.objects.filter(pk=pk)
+
     def get(self, request, pk):
+        non_modifie = self.non_modifie(request, pk)
+        if non_modifie is not None:
+            return non_modifie
         entreprise = self.get_object(pk)
         return Response(EntrepriseSerializer(entreprise, context={"request": request}).data, status=status.HTTP_200_OK)
 
@@ -183,6 +379,9 @@ class EntrepriseDetail(APIView):
         entreprise = self.get_object(pk)
         if entreprise.user != request.user:
             raise PermissionDenied("Vous ne pouvez modifier que votre propre entreprise")
+        echec = self.precondition_echouee(request, pk, entreprise)
+        if echec is not None:
+            return echec
 
         serializer = EntrepriseSerializer(entreprise, data=request.data, partial=False, context={"request": request})
         if serializer.is_valid():
@@ -197,6 +396,9 @@ class EntrepriseDetail(APIView):
         entreprise = self.get_object(pk)
         if entreprise.user != request.user:
             raise PermissionDenied("Vous ne pouvez modifier que votre propre entreprise")
+        echec = self.precondition_echouee(request, pk, entreprise)
+        if echec is not None:
+            return echec
 
         serializer = EntrepriseSerializer(entreprise, data=request.data, partial=True, context={"request": request})
         if serializer.is_valid():
@@ -220,18 +422,28 @@ class EntrepriseDetail(APIView):
 # ==========================
 # CV APIView
 # ==========================
-class CVListCreate(APIView):
+class CVListCreate(RequetesIdempotentes, APIView):
     permission_classes = [permissions.IsAuthenticated, IsCandidat]
     parser_classes = [MultiPartParser, FormParser]
 
     def get(self, request):
-        cvs = CV.objects.filter(user=request.user).order_by("-dateCreation")
-        return Response(
-            {"count": cvs.count(), "cvs": CVListSerializer(cvs, many=True).data},
-            status=status.HTTP_200_OK
-        )
+        cvs = CV.objects.filter(user=request.user)
+
+        if KeysetPagination.is_requested(request):
+            paginator = KeysetPagination(("-dateCreation", "-pk"))
+            page = paginator.paginate_queryset(cvs, request)
+            return Response(
+                paginator.get_response_data("cvs", CVListSerializer(page, many=True).data),
+                status=status.HTTP_200_OK
+            )
+
+        data = CVListSerializer(cvs.order_by("-dateCreation"), many=True).data
+        return Response({"count": len(data), "cvs": data}, status=status.HTTP_200_OK)
 
     def post(self, request):
+        rejeu = self.rejouer_idempotent(request)
+        if rejeu is not None:
+            return rejeu
         serializer = CVSerializer(data=request.data, context={"request": request})
         if serializer.is_valid():
             cv = serializer.save()
@@ -242,19 +454,29 @@ class CVListCreate(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class CVDetail(APIView):
+class CVDetail(RequetesConditionnelles, APIView):
     permission_classes = [permissions.IsAuthenticated, IsCandidat]
     parser_classes = [MultiPartParser, FormParser]
+    champs_version = ("dateModification", "user__dateModification")
 
     def get_object(self, pk, request):
         return get_object_or_404(CV, pk=pk, user=request.user)
 
+    def queryset_version(self, request, pk):
+        return CV.objects.filter(pk=pk, user=request.user)
+
     def get(self, request, pk):
+        non_modifie = self.non_modifie(request, pk)
+        if non_modifie is not None:
+            return non_modifie
         cv = self.get_object(pk, request)
         return Response(CVSerializer(cv, context={"request": request}).data, status=status.HTTP_200_OK)
 
     def put(self, request, pk):
         cv = self.get_object(pk, request)
+        echec = self.precondition_echouee(request, pk, cv)
+        if echec is not None:
+            return echec
         serializer = CVSerializer(cv, data=request.data, partial=False, context={"request": request})
         if serializer.is_valid():
             serializer.save()
@@ -263,6 +485,9 @@ class CVDetail(APIView):
 
     def patch(self, request, pk):
         cv = self.get_object(pk, request)
+        echec = self.precondition_echouee(request, pk, cv)
+        if echec is not None:
+            return echec
         serializer = CVSerializer(cv, data=request.data, partial=True, context={"request": request})
         if serializer.is_valid():
             serializer.save()
@@ -276,6 +501,40 @@ class CVDetail(APIView):
         return Response({"message": f'CV "{cv_nom}" supprimé'}, status=status.HTTP_200_OK)
 
 
+class CVRecommandations(APIView):
+    """
+    GET: offres visibles les plus proches du texte du CV (cosinus TF-IDF),
+    hors offres déjà candidatées avec ce CV. ?k= (défaut 10, max 50)
+    """
+    permission_classes = [permissions.IsAuthenticated, IsCandidat]
+
+    def get(self, request, pk):
+        cv = get_object_or_404(CV, pk=pk, user=request.user)
+        try:
+            k = min(max(int(request.query_params.get("k", 10)), 1), MAX_RECOMMANDATIONS)
+        except (TypeError, ValueError):
+            raise ValidationError({"k": "Entier attendu."})
+
+        if not cv.texte:
+            return Response(
+                {"count": 0, "offres": [], "message": "Texte du CV non disponible."},
+                status=status.HTTP_200_OK
+            )
+
+        deja_envoyees = Envoi.objects.filter(cv=cv).values_list("offre_id", flat=True)
+        # marge: quelques offres peuvent ne plus être visibles en base
+        try:
+            resultats = recommander_offres(cv.texte, k=k * 2, exclure=set(deja_envoyees))
+        except MoteurIndisponible:
+            return Response(
+                {"error": "Moteur de recommandation en cours de chargement, réessayez plus tard."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "10"},
+            )
+        data = OffreListSerializer(offres_classees(resultats, k), many=True).data
+        return Response({"count": len(data), "offres": data}, status=status.HTTP_200_OK)
+
+
 # ==========================
 # OFFRES APIViews
 # ==========================
@@ -283,50 +542,129 @@ class OffreList(APIView):
     """
     GET: Offres visibles pour candidats (estPubliee=True + recevoirCandidatures=True + pas archivée)
     + filtres query params
+
+    Réponse JSON mise en cache (octets) par paramètres normalisés et version du
+    catalogue: une recherche populaire est servie sans ORM ni sérialisation.
     """
     permission_classes = [permissions.IsAuthenticated]
+    # params hors filtres qui changent la réponse
+    params_presentation = ("tri", "extraits", "cursor", "page_size", "estimate")
+    cache_timeout = 120  # secondes (clés versionnées: libère seulement la mémoire)
+    cache_max_octets = 2 * 1024 * 1024
 
     def get(self, request):
-        qs = Offre.objects.filter(
-            estPubliee=True,
-            recevoirCandidatures=True,
-            estArchivee=False,
-            entreprise__recevoirCandidatures=True,
-        ).select_related("entreprise")
-
-        domaine = request.query_params.get("domaine")
-        specialite = request.query_params.get("specialite")
-        ville = request.query_params.get("ville")
-        pays = request.query_params.get("pays")
-        type_contrat = request.query_params.get("type_contrat")
-        mode_travail = request.query_params.get("mode_travail")
-        q = request.query_params.get("q")
-
-        if domaine:
-            qs = qs.filter(domaine__icontains=domaine)
-        if specialite:
-            qs = qs.filter(specialite__icontains=specialite)
-        if ville:
-            qs = qs.filter(ville__icontains=ville)
-        if pays:
-            qs = qs.filter(pays__icontains=pays)
-        if type_contrat:
-            qs = qs.filter(type_contrat=type_contrat)
-        if mode_travail:
-            qs = qs.filter(mode_travail=mode_travail)
-        if q:
-            qs = qs.filter(
-                Q(titre__icontains=q) |
-                Q(poste__icontains=q) |
-                Q(description__icontains=q) |
-                Q(missions__icontains=q) |
-                Q(profil_recherche__icontains=q) |
-                Q(tags__icontains=q)
+        key = cle_catalogue("offres:liste", cle_filtres(request.query_params, autres=self.params_presentation))
+        corps = cache.get(key)
+        if corps is None:
+            corps = JSONRenderer().render(self.donnees(request))
+            if len(corps) <= self.cache_max_octets:
+                cache.set(key, corps, self.cache_timeout)
+        return HttpResponse(corps, content_type="application/json")
+
+    def donnees(self, request):
+        params = request.query_params
+        q = params.get("q")
+        # index du processus pas encore construit: recherche plein texte en base
+        index = index_offres() if q and index_memoire_actif() else None
+        memoire = index is not None
+
+        qs = (
+            filtrer_offres(params, plein_texte=not memoire)
+            .select_related("entreprise")
+            .defer("search_vector")
+            .prefetch_related(
+                Prefetch("competences", queryset=Competence.objects.only("id", "nom")),
+                Prefetch("langues", queryset=Langue.objects.only("id", "nom")),
             )
+        )
+
+        tronque = False
+        if memoire:
+            # index inversé du processus (BM25), les autres filtres restent en base
+            qs, tronque = classer_par_index(qs, q, index)
+            ordering = ("-rank", "-pk")
+        elif q:
+            # recherche plein texte: tri par pertinence
+            qs = annoter_pertinence(qs, q)
+            ordering = RECHERCHE_ORDERING
+        else:
+            ordering = ("-dateCreation", "-pk")
 
-        qs = qs.order_by("-dateCreation")
-        serializer = OffreListSerializer(qs, many=True, context={"request": request})
-        return Response({"count": qs.count(), "offres": serializer.data}, status=status.HTTP_200_OK)
+        # tri=salaire (croissant) / tri=-salaire (décroissant) remplace l'ordre par défaut
+        tri = params.get("tri")
+        if tri in ["salaire", "-salaire"]:
+            qs, ordering = trier_par_salaire(qs, desc=tri == "-salaire")
+
+        # extraits=1: passages surlignés
+        if q and params.get("extraits") in ["1", "true"]:
+            qs = annoter_extrait(qs, q)
+
+        paginator = None
+        if KeysetPagination.is_requested(request):
+            paginator = KeysetPagination(ordering)
+            offres = paginator.paginate_queryset(qs, request)
+        else:
+            offres = list(qs.order_by(*ordering))
+
+        serializer = OffreListSerializer(offres, many=True, context={"request": request})
+        if paginator:
+            donnees = paginator.get_response_data("offres", serializer.data)
+        else:
+            donnees = {"count": len(serializer.data), "offres": serializer.data}
+        if tronque:
+            donnees.update(tronque=True, max_resultats=MAX_RESULTATS)
+        return donnees
+
+
+class OffreFacettes(APIView):
+    """
+    GET: comptes par type_contrat / mode_travail / niveau / etude_min / ville / domaine
+    pour les mêmes filtres que OffreList (une seule requête GROUPING SETS, en cache)
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        return Response(facettes_offres(request.query_params), status=status.HTTP_200_OK)
+
+
+class OffreTags(APIView):
+    """
+    GET: nuage de tags (tag + nombre d'offres) pour les mêmes filtres que OffreList
+    ?limite= (défaut 50, max 200)
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        try:
+            limite = min(max(int(request.query_params.get("limite", 50)), 1), 200)
+        except (TypeError, ValueError):
+            raise ValidationError({"limite": "Entier attendu."})
+        return Response(nuage_tags(request.query_params, limite), status=status.HTTP_200_OK)
+
+
+class OffreHistogrammes(APIView):
+    """
+    GET: répartition par tranches des salaires (par devise) et de l'expérience
+    pour les mêmes filtres que OffreList. ?pas_salaire= (défaut 20000), ?pas_experience= (défaut 1)
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def _pas(self, request, nom, defaut):
+        try:
+            pas = int(request.query_params.get(nom, defaut))
+        except (TypeError, ValueError):
+            raise ValidationError({nom: "Entier attendu."})
+        if pas < 1:
+            raise ValidationError({nom: "Doit être supérieur à 0."})
+        return pas
+
+    def get(self, request):
+        pas_salaire = self._pas(request, "pas_salaire", 20000)
+        pas_experience = self._pas(request, "pas_experience", 1)
+        return Response(
+            histogrammes_offres(request.query_params, pas_salaire, pas_experience),
+            status=status.HTTP_200_OK
+        )
 
 
 class OffreEntrepriseListCreate(APIView):
@@ -337,9 +675,21 @@ class OffreEntrepriseListCreate(APIView):
     permission_classes = [permissions.IsAuthenticated, IsEntreprise]
 
     def get(self, request):
-        qs = Offre.objects.filter(entreprise=request.user.entreprise).order_by("-dateCreation")
-        serializer = OffreSerializer(qs, many=True, context={"request": request})
-        return Response({"count": qs.count(), "offres": serializer.data}, status=status.HTTP_200_OK)
+        qs = (
+            Offre.objects
+            .filter(entreprise=request.user.entreprise)
+            .select_related("entreprise")
+            .prefetch_related("competences", "langues")
+        )
+
+        if KeysetPagination.is_requested(request):
+            paginator = KeysetPagination(("-dateCreation", "-pk"))
+            page = paginator.paginate_queryset(qs, request)
+            serializer = OffreSerializer(page, many=True, context={"request": request})
+            return Response(paginator.get_response_data("offres", serializer.data), status=status.HTTP_200_OK)
+
+        serializer = OffreSerializer(qs.order_by("-dateCreation"), many=True, context={"request": request})
+        return Response({"count": len(serializer.data), "offres": serializer.data}, status=status.HTTP_200_OK)
 
     def post(self, request):
         serializer = OffreSerializer(data=request.data, context={"request": request})
@@ -352,13 +702,49 @@ class OffreEntrepriseListCreate(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class OffreDetail(APIView):
+class OffreSimilaires(APIView):
     """
-    GET: détails offre
-    PATCH/PUT: modifier (propriétaire entreprise)
+    GET: offres visibles les plus proches (texte + attributs), index des voisins
+    en mémoire. Même accès que le détail. ?k= (défaut 10, max 50)
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        offre = get_object_or_404(Offre.objects.select_related("entreprise"), pk=pk)
+        proprietaire = request.user.type == "entreprise" and offre.entreprise.user_id == request.user.pk
+        if not proprietaire and not offre.est_visible:
+            raise PermissionDenied("Offre non accessible.")
+        try:
+            k = min(max(int(request.query_params.get("k", 10)), 1), MAX_SIMILAIRES)
+        except (TypeError, ValueError):
+            raise ValidationError({"k": "Entier attendu."})
+
+        # marge: quelques offres peuvent ne plus être visibles en base
+        try:
+            resultats = offres_similaires(offre, k=k * 2)
+        except IndexIndisponible:
+            return Response(
+                {"error": "Index des offres similaires en cours de construction, réessayez plus tard."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "10"},
+            )
+        data = OffreListSerializer(offres_classees(resultats, k), many=True).data
+        return Response({"count": len(data), "offres": data}, status=status.HTTP_200_OK)
+
+
+class OffreDetail(RequetesConditionnelles, APIView):
+    """
+    GET: détails offre (ETag / Last-Modified, 304)
+    PATCH/PUT: modifier (propriétaire entreprise), If-Match -> 412 si modifiée entre-temps
     DELETE: archive (pro)
     """
     permission_classes = [permissions.IsAuthenticated]
+    # nom de l'entreprise affiché
+    champs_version = ("dateModification", "entreprise__dateModification")
+
+    def queryset_version(self, request, pk):
+        # mêmes règles d'accès que get(): visible, ou offre de l'entreprise connectée
+        return Offre.objects.filter(Q(est_visible=True) | Q(entreprise__user=request.user), pk=pk)
 
     def get_object(self, pk):
         return get_object_or_404(Offre.objects.select_related("entreprise"), pk=pk)
@@ -370,14 +756,12 @@ class OffreDetail(APIView):
             raise PermissionDenied("Vous ne pouvez modifier que vos offres")
 
     def _is_visible_to_candidates(self, offre):
-        return (
-            offre.estPubliee
-            and offre.recevoirCandidatures
-            and not offre.estArchivee
-            and offre.entreprise.recevoirCandidatures
-        )
+        return offre.est_visible
 
     def get(self, request, pk):
+        non_modifie = self.non_modifie(request, pk)
+        if non_modifie is not None:
+            return non_modifie
         offre = self.get_object(pk)
 
         # owner entreprise: OK
@@ -394,6 +778,9 @@ class OffreDetail(APIView):
     def patch(self, request, pk):
         offre = self.get_object(pk)
         self._must_own(request, offre)
+        echec = self.precondition_echouee(request, pk, offre)
+        if echec is not None:
+            return echec
 
         serializer = OffreSerializer(offre, data=request.data, partial=True, context={"request": request})
         if serializer.is_valid():
@@ -404,6 +791,9 @@ class OffreDetail(APIView):
     def put(self, request, pk):
         offre = self.get_object(pk)
         self._must_own(request, offre)
+        echec = self.precondition_echouee(request, pk, offre)
+        if echec is not None:
+            return echec
 
         serializer = OffreSerializer(offre, data=request.data, partial=False, context={"request": request})
         if serializer.is_valid():
@@ -468,7 +858,7 @@ class OffreToggleRecevoir(APIView):
 # ==========================
 # ENVOIS APIViews
 # ==========================
-class EnvoiListCreate(APIView):
+class EnvoiListCreate(RequetesIdempotentes, APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
@@ -477,20 +867,32 @@ class EnvoiListCreate(APIView):
         if user.type == "candidat":
             qs = Envoi.objects.filter(cv__user=user)
         elif user.type == "entreprise":
-            qs = Envoi.objects.filter(offre__entreprise=user.entreprise)
+            qs = Envoi.objects.filter(entreprise_id=user.entreprise.pk)
         elif user.is_staff:
             qs = Envoi.objects.all()
         else:
             return Response({"error": "Accès refusé"}, status=status.HTTP_403_FORBIDDEN)
 
-        qs = qs.select_related("cv", "cv__user", "offre", "offre__entreprise").order_by("-dateEnvoi")
-        serializer = EnvoiListSerializer(qs, many=True, context={"request": request})
-        return Response({"count": qs.count(), "envois": serializer.data}, status=status.HTTP_200_OK)
+        qs = filtrer_envois(qs, request.query_params)
+        qs = qs.select_related("cv", "cv__user").defer("cv__texte", "cv__search_vector")
+
+        if KeysetPagination.is_requested(request):
+            paginator = KeysetPagination(("-dateEnvoi", "-pk"))
+            page = paginator.paginate_queryset(qs, request)
+            serializer = EnvoiListSerializer(page, many=True, context={"request": request})
+            return Response(paginator.get_response_data("envois", serializer.data), status=status.HTTP_200_OK)
+
+        serializer = EnvoiListSerializer(qs.order_by("-dateEnvoi"), many=True, context={"request": request})
+        return Response({"count": len(serializer.data), "envois": serializer.data}, status=status.HTTP_200_OK)
 
     def post(self, request):
         if request.user.type != "candidat":
             return Response({"error": "Action réservée aux candidats"}, status=status.HTTP_403_FORBIDDEN)
 
+        rejeu = self.rejouer_idempotent(request)
+        if rejeu is not None:
+            return rejeu
+
         cv_id = request.data.get("cv_id")
         offre_ids = request.data.get("offre_ids", [])
 
@@ -515,18 +917,23 @@ class EnvoiListCreate(APIView):
         if len(cleaned_ids) > 100:
             return Response({"error": "Trop d'offres (max 100)"}, status=status.HTTP_400_BAD_REQUEST)
 
-        cv = get_object_or_404(CV, cvId=cv_id, user=request.user)
+        dry_run = str(request.data.get("dry_run", "")).lower() in ["1", "true"]
+
+        cv = get_object_or_404(CV.objects.only("cvId", "nom", "user_id"), cvId=cv_id, user=request.user)
 
         # offres valides : publiées + recevoir ON + non archivée + entreprise autorise globalement
-        offres = Offre.objects.filter(
-            offreId__in=cleaned_ids,
-            estPubliee=True,
-            recevoirCandidatures=True,
-            estArchivee=False,
-            entreprise__recevoirCandidatures=True,
-        ).select_related("entreprise").distinct()
-
-        if not offres.exists():
+        offres = {
+            o.offreId: o
+            for o in Offre.objects.filter(offreId__in=cleaned_ids, est_visible=True)
+            .select_related("entreprise")
+            .only(
+                "offreId", "titre", "domaine", "ville", "pays", "relance_days",
+                "entreprise__entrepriseId", "entreprise__nomEntreprise",
+            )
+        }
+        offres = [offres[i] for i in cleaned_ids if i in offres]
+
+        if not offres:
             return Response(
                 {
                     "success": False,
@@ -539,28 +946,53 @@ class EnvoiListCreate(APIView):
                 status=status.HTTP_200_OK
             )
 
-        created_ids = []
+        # dry_run: simple lecture ; sinon réservation atomique du délai (upsert conditionnel)
+        if dry_run:
+            delais = prochains_envois(cv.cvId, [o.offreId for o in offres])
+        else:
+            delais = reserver_envois(cv.cvId, offres)
+
+        nouveaux = []
         refused = []
 
         for offre in offres:
-            payload = {"cv": cv.cvId, "offre": offre.offreId}
-            ser = EnvoiSerializer(data=payload, context={"request": request})
-            if ser.is_valid():
-                envoi = ser.save()
-                created_ids.append(envoi.envoiId)
-            else:
+            allowed_at = delais.get(offre.offreId)
+            if allowed_at:
                 refused.append(
                     {
                         "offre": offre.titre,
                         "offreId": offre.offreId,
                         "entreprise": offre.entreprise.nomEntreprise,
-                        "errors": ser.errors,
+                        "errors": {"non_field_errors": [message_delai(allowed_at)]},
                     }
                 )
+                continue
+            envoi = Envoi(cv=cv, offre=offre, statut="envoye")
+            envoi.remplir_snapshot(offre)
+            nouveaux.append(envoi)
 
-        created_count = len(created_ids)
         refused_count = len(refused)
 
+        if dry_run:
+            return Response(
+                {
+                    "success": bool(nouveaux),
+                    "dry_run": True,
+                    "message": f"{len(nouveaux)} candidatures possibles, {refused_count} refusées.",
+                    "created_count": 0,
+                    "accepted_count": len(nouveaux),
+                    "refused_count": refused_count,
+                    "offres_acceptees": [e.offre_id for e in nouveaux],
+                    "refusees": refused if refused else None,
+                    "details": {"cv": cv.nom, "offres_total": len(offres)},
+                },
+                status=status.HTTP_200_OK
+            )
+
+        created_ids = [e.envoiId for e in Envoi.objects.bulk_create(nouveaux)]
+        journaliser([(e.envoiId, e.entreprise_id, None, e.statut) for e in nouveaux], auteur=request.user)
+        created_count = len(created_ids)
+
         if created_count == 0:
             return Response(
                 {
@@ -570,7 +1002,7 @@ class EnvoiListCreate(APIView):
                     "refused_count": refused_count,
                     "envois_ids": created_ids,
                     "refusees": refused if refused else None,
-                    "details": {"cv": cv.nom, "offres_total": offres.count()},
+                    "details": {"cv": cv.nom, "offres_total": len(offres)},
                 },
                 status=status.HTTP_200_OK
             )
@@ -583,12 +1015,58 @@ class EnvoiListCreate(APIView):
                 "refused_count": refused_count,
                 "envois_ids": created_ids,
                 "refusees": refused if refused else None,
-                "details": {"cv": cv.nom, "offres_total": offres.count()},
+                "details": {"cv": cv.nom, "offres_total": len(offres)},
             },
             status=status.HTTP_201_CREATED
         )
 
 
+class EnvoiRechercheCV(APIView):
+    """
+    GET (entreprise): candidatures reçues dont le texte du CV correspond à ?q=
+    (syntaxe websearch), par pertinence. ?offre= restreint à une offre,
+    ?extraits=1 ajoute les passages trouvés. Pagination par curseur.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsEntreprise]
+    ordering = ("-rank", "-dateEnvoi", "-pk")
+
+    def get(self, request):
+        q = (request.query_params.get("q") or "").strip()
+        if not q:
+            raise ValidationError({"q": "Paramètre requis."})
+
+        requete = requete_recherche(q)
+        qs = (
+            Envoi.objects
+            .filter(entreprise__user=request.user, cv__search_vector=requete)
+            .annotate(rank=Cast(SearchRank(F("cv__search_vector"), requete), FloatField()))
+            .select_related("cv", "cv__user")
+            .defer("cv__texte", "cv__search_vector")
+        )
+
+        offre_id = request.query_params.get("offre")
+        if offre_id:
+            try:
+                qs = qs.filter(offre_id=int(offre_id))
+            except (TypeError, ValueError):
+                raise ValidationError({"offre": "Entier attendu."})
+
+        paginator = KeysetPagination(self.ordering)
+        page = paginator.paginate_queryset(qs, request)
+
+        if request.query_params.get("extraits") in ["1", "true"]:
+            # calculé sur la seule page: ts_headline relit tout le texte du CV
+            extraits = dict(
+                annoter_extrait(Envoi.objects.filter(pk__in=[e.pk for e in page]), q, source=F("cv__texte"))
+                .values_list("pk", "extrait")
+            )
+            for envoi in page:
+                envoi.extrait = extraits.get(envoi.pk)
+
+        serializer = EnvoiListSerializer(page, many=True, context={"request": request})
+        return Response(paginator.get_response_data("envois", serializer.data), status=status.HTTP_200_OK)
+
+
 class EnvoiDetail(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -643,6 +1121,137 @@ class EnvoiDetail(APIView):
         return Response({"message": f"Candidature supprimée: {envoi_info}"}, status=status.HTTP_200_OK)
 
 
+class EnvoiHistorique(APIView):
+    """
+    GET: chronologie des statuts d'une candidature (EnvoiEvent), du plus ancien
+    au plus récent, + délai avant la première réponse de l'entreprise (null si
+    cette réponse n'a qu'une date approximative, antérieure à l'historique).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        envoi = (
+            Envoi.objects.filter(pk=pk)
+            .values("dateEnvoi", "entreprise_id", "entreprise__user_id", "cv__user_id")
+            .first()
+        )
+        if envoi is None:
+            raise NotFound("Candidature introuvable")
+
+        if request.user.type == "candidat":
+            if envoi["cv__user_id"] != request.user.pk:
+                raise PermissionDenied("Vous ne pouvez voir que vos propres candidatures")
+        elif request.user.type == "entreprise":
+            if envoi["entreprise__user_id"] != request.user.pk:
+                raise PermissionDenied("Vous ne pouvez voir que les candidatures de vos offres")
+        elif not request.user.is_staff:
+            raise PermissionDenied("Permission refusée")
+
+        # borne sur dateEnvoi: les partitions des mois antérieurs ne sont pas lues
+        evenements = list(
+            EnvoiEvent.objects
+            .filter(envoi_id=pk, dateEvenement__gte=envoi["dateEnvoi"])
+            .order_by("dateEvenement", "id")
+        )
+        reponse = next((e for e in evenements if e.statut != "envoye"), None)
+        return Response(
+            {
+                "envoiId": pk,
+                "dateEnvoi": envoi["dateEnvoi"],
+                "delai_premiere_reponse": (
+                    (reponse.dateEvenement - envoi["dateEnvoi"]).total_seconds()
+                    if reponse and not reponse.date_approximative else None
+                ),
+                "evenements": EnvoiEventSerializer(evenements, many=True).data,
+            },
+            status=status.HTTP_200_OK
+        )
+
+
+class EnvoiStatutGroupe(APIView):
+    """
+    PATCH (entreprise): {"envoi_ids": [...], "statut": "refuse"} -> même statut
+    pour toutes les candidatures listées, en un seul UPDATE. Résultat par id:
+    modifie / inchange (déjà à ce statut) / interdit (autre entreprise) /
+    introuvable / invalide (pas un entier).
+    """
+    permission_classes = [permissions.IsAuthenticated, IsEntreprise]
+    max_envois = 500
+
+    def patch(self, request):
+        statut_ser = EnvoiStatutSerializer(data={"statut": request.data.get("statut")})
+        if not statut_ser.is_valid():
+            return Response(statut_ser.errors, status=status.HTTP_400_BAD_REQUEST)
+        statut = statut_ser.validated_data["statut"]
+
+        envoi_ids = request.data.get("envoi_ids", [])
+        if not isinstance(envoi_ids, list) or len(envoi_ids) == 0:
+            return Response({"error": "Aucune candidature sélectionnée"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # (valeur soumise, entier ou None si invalide), dans l'ordre, doublons retirés
+        soumis, vus = [], set()
+        for x in envoi_ids:
+            try:
+                pk = int(x)
+            except (TypeError, ValueError):
+                soumis.append((x, None))
+                continue
+            if pk not in vus:
+                vus.add(pk)
+                soumis.append((pk, pk))
+        cleaned_ids = [pk for _, pk in soumis if pk is not None]
+
+        if len(cleaned_ids) == 0:
+            return Response({"error": "Liste de candidatures invalide"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(cleaned_ids) > self.max_envois:
+            return Response({"error": f"Trop de candidatures (max {self.max_envois})"}, status=status.HTTP_400_BAD_REQUEST)
+
+        entreprise_id = request.user.entreprise.pk
+
+        # propriété + statut actuel, lignes verrouillées jusqu'à la fin de la transaction
+        # (dans l'ordre des pk: deux PATCH groupés concurrents ne s'interbloquent pas)
+        actuels = dict(
+            Envoi.objects.select_for_update()
+            .filter(pk__in=cleaned_ids, entreprise_id=entreprise_id)
+            .order_by("pk")
+            .values_list("pk", "statut")
+        )
+        a_modifier = [pk for pk, ancien in actuels.items() if ancien != statut]
+        if a_modifier:
+            Envoi.objects.filter(pk__in=a_modifier).update(statut=statut)
+            journaliser([(pk, entreprise_id, actuels[pk], statut) for pk in a_modifier], auteur=request.user)
+
+        absents = [pk for pk in cleaned_ids if pk not in actuels]
+        existants = set(Envoi.objects.filter(pk__in=absents).values_list("pk", flat=True)) if absents else set()
+
+        modifies = set(a_modifier)
+        resultats = []
+        for valeur, pk in soumis:
+            if pk is None:
+                resultats.append({"envoiId": valeur, "resultat": "invalide"})
+                continue
+            if pk in modifies:
+                resultat = "modifie"
+            elif pk in actuels:
+                resultat = "inchange"
+            elif pk in existants:
+                resultat = "interdit"
+            else:
+                resultat = "introuvable"
+            resultats.append({"envoiId": pk, "resultat": resultat})
+
+        return Response(
+            {
+                "message": f"{len(modifies)} candidatures mises à jour: {dict(Envoi.STATUT_CHOICES)[statut]}",
+                "statut": statut,
+                "modifies_count": len(modifies),
+                "resultats": resultats,
+            },
+            status=status.HTTP_200_OK
+        )
+
+
 # ==========================
 # Dashboard Stats
 # ==========================
@@ -672,7 +1281,7 @@ class DashboardStats(APIView):
             if not hasattr(user, "entreprise"):
                 return Response({"error": "Profil entreprise non trouvé"}, status=status.HTTP_404_NOT_FOUND)
 
-            envois = Envoi.objects.filter(offre__entreprise=user.entreprise)
+            envois = Envoi.objects.filter(entreprise_id=user.entreprise.pk)
 
             stats = {
                 "total_offres": Offre.objects.filter(entreprise=user.entreprise).count(),
@@ -703,3 +1312,19 @@ class DashboardStats(APIView):
             return 0
         reponses = envois.filter(statut__in=["en_attente", "accepte", "refuse"]).count()
         return round((reponses / total) * 100, 2)
+
+
+# ==========================
+# Cache (admin)
+# ==========================
+class CacheStats(APIView):
+    """GET (admin): compteurs hits / misses par niveau du cache, pour le worker qui répond."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        stats = {
+            alias: caches[alias].statistiques()
+            for alias in settings.CACHES
+            if hasattr(caches[alias], "statistiques")
+        }
+        return Response({"pid": os.getpid(), "caches": stats}, status=status.HTTP_200_OK)